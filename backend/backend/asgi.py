@@ -8,9 +8,19 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
 import os
+import threading
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Прогрев до первого запроса; безопасен для gunicorn --preload (см. courses/warmup.py)
+from courses.warmup import warmup  # noqa: E402
+
+# uvicorn импортирует приложение уже внутри event loop, где синхронный ORM запрещён,
+# поэтому прогрев идёт в отдельном потоке
+_warmup_thread = threading.Thread(target=warmup, name='warmup')
+_warmup_thread.start()
+_warmup_thread.join()
@@ -19,6 +19,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым: профиль запроса охватывает все остальные middleware
+    'courses.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -62,6 +64,10 @@ DATABASES = {
         'PASSWORD': '1234',
         'HOST': '127.0.0.1',
         'PORT': '5432',
+        # Постоянные соединения: воркер открывает соединение сразу после fork
+        # (courses/warmup.py) и переиспользует его между запросами
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -75,6 +81,10 @@ USE_TZ = True
 
 STATIC_URL = '/static/'  # ← ОБЯЗАТЕЛЬНО!
 
+# Локальное файловое хранилище (сертификаты и т.п.)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
@@ -87,7 +97,7 @@ REST_FRAMEWORK = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'courses.authentication.TokenUserAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -95,10 +105,126 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Число доверенных прокси перед Django. 0 — IP клиента берётся из REMOTE_ADDR,
+    # а X-Forwarded-For, который клиент подставляет сам, игнорируется; за одним
+    # обратным прокси (nginx) — 1
+    'NUM_PROXIES': 0,
 }
 
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-}
\ No newline at end of file
+}
+
+# Очередь проверки решений: срок аренды и максимальный размер пачки
+GRADING_LEASE_SECONDS = 15 * 60
+GRADING_BATCH_MAX = 50
+
+# Сертификаты: публичный адрес файлов и время жизни кэша проверки (сек)
+CERTIFICATE_BASE_URL = 'http://127.0.0.1:8000/media/certificates/'
+CERTIFICATE_CACHE_TIMEOUT = 24 * 60 * 60
+CERTIFICATE_MISS_CACHE_TIMEOUT = 60
+
+# Фоновые задачи (courses/jobs.py, manage.py run_jobs)
+JOBS_CONCURRENCY = 4
+JOBS_POLL_INTERVAL = 1.0
+JOBS_LOCK_TIMEOUT = 5 * 60
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_BASE_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
+
+# Сколько последних отзывов встраивается в карточку курса
+COURSE_RECENT_RATINGS = 5
+
+# HTTP-кэширование публичного каталога (сек) и адрес для PURGE по Surrogate-Key
+CATALOG_CACHE_MAX_AGE = 60
+CATALOG_CACHE_S_MAXAGE = 600
+SURROGATE_PURGE_URL = None  # например 'http://127.0.0.1:6081/'
+
+# Ограничение частоты login/register (token bucket): (ёмкость, токенов в секунду)
+AUTH_THROTTLE_RATES = {
+    'auth_ip': (20, 20 / 60),
+    'auth_email': (5, 5 / 60),
+}
+# LocalTokenBucketStore — в памяти одного процесса;
+# CacheTokenBucketStore — в общем кэше AUTH_THROTTLE_CACHE для нескольких воркеров
+AUTH_THROTTLE_STORE = 'courses.throttling.LocalTokenBucketStore'
+AUTH_THROTTLE_CACHE = 'default'
+
+# Пакетные эндпоинты (courses/batch/, lessons/batch/, instructors/batch/)
+BATCH_MAX_ITEMS = 50
+
+# Heartbeat'ы просмотра уроков (courses/heartbeats.py):
+# при падении процесса теряется не больше HEARTBEAT_FLUSH_INTERVAL секунд прогресса
+HEARTBEAT_FLUSH_INTERVAL = 5
+HEARTBEAT_FLUSH_BATCH = 1000
+HEARTBEAT_MAX_KEYS = 20000
+HEARTBEAT_ACCESS_TTL = 300
+
+# Секционирование payments/submissions по месяцам (manage.py partitions)
+PARTITION_MONTHS_AHEAD = 3
+PARTITION_ARCHIVE_SCHEMA = 'partition_archive'
+
+# Прогрев воркера при загрузке wsgi/asgi (courses/warmup.py)
+WARMUP_ENABLED = True
+WARMUP_URLS = ['/api/v1/courses/']
+
+# Админка: до этого числа строк (по оценке планировщика) считается точный COUNT(*)
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Карта доступа к урокам (courses.access): кэш и время жизни, сек.
+# С несколькими воркерами нужен общий кэш, иначе отзыв доступа виден только по истечении срока
+LESSON_ACCESS_CACHE = 'default'
+LESSON_ACCESS_CACHE_TIMEOUT = 300
+
+# Подсказки при наборе (courses.typeahead): индекс в памяти каждого процесса
+TYPEAHEAD_LIMIT = 8
+TYPEAHEAD_MAX_LIMIT = 20
+# Префиксы с большим числом ключей (короткие) кэшируются до следующего изменения индекса
+TYPEAHEAD_SCAN_LIMIT = 300
+# Как часто сверять версию в общем кэше и как часто пересобирать ради популярности, сек.
+TYPEAHEAD_SYNC_INTERVAL = 10
+TYPEAHEAD_REBUILD_INTERVAL = 15 * 60
+TYPEAHEAD_CACHE = 'default'
+
+# Профилирование запроса по требованию администратора (courses.profiling):
+# токен из POST /api/v1/profiling/token/ живёт PROFILING_TOKEN_MAX_AGE сек.
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+PROFILING_SAMPLE_INTERVAL = 0.001
+PROFILING_KEEP = 100
+
+# Каталог с фасетами (courses/catalog.py). Корзины цены и длительности задаются
+# нижними границами: [0, 1) — бесплатные, последняя корзина без верхней границы
+CATALOG_PRICE_BUCKETS = [0, 1, 1000, 3000, 10000]
+CATALOG_DURATION_BUCKETS = [0, 2, 5, 10, 20]
+CATALOG_RATING_THRESHOLDS = [4.5, 4, 3.5, 3]
+# Сколько преподавателей показывать в фасете (выбранные показываются всегда)
+CATALOG_FACET_LIMIT = 20
+CATALOG_MAX_FILTER_VALUES = 50
+CATALOG_MAX_PAGE_SIZE = 100
+# Фасеты и общее число найденных курсов для одного набора фильтров, сек.
+CATALOG_FACETS_CACHE = 'default'
+CATALOG_FACETS_TIMEOUT = 60
+
+# Рейтинг студентов курса (courses/leaderboard.py): размер top-N по умолчанию и предел ?limit=
+LEADERBOARD_SIZE = 10
+LEADERBOARD_MAX_SIZE = 100
+
+# Уведомления (courses/notifications.py): строк рассылки по курсу на одну транзакцию,
+# кэш числа непрочитанных (сек.) и предел ids в POST /notifications/read/
+NOTIFICATIONS_FANOUT_CHUNK = 5000
+NOTIFICATIONS_CACHE = 'default'
+NOTIFICATIONS_UNREAD_TIMEOUT = 10 * 60
+NOTIFICATIONS_READ_MAX = 500
+
+# Скомпилированные документы курсов (courses/documents.py): курсов на одну пересборку
+COURSE_DOCUMENTS_BATCH = 200
+
+# Версия токенов пользователя (claim ver) кэшируется, чтобы запрос с JWT
+# не читал строку users; блокировка и logout-all сбрасывают кэш после коммита.
+# С несколькими воркерами нужен общий кэш, иначе отозванный access-токен
+# принимают другие воркеры до истечения срока (refresh сверяется с базой всегда)
+TOKEN_VERSION_CACHE = 'default'
+TOKEN_VERSION_CACHE_TIMEOUT = 60
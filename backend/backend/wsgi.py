@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Прогрев до первого запроса; безопасен для gunicorn --preload (см. courses/warmup.py)
+from courses.warmup import warmup  # noqa: E402
+
+warmup()
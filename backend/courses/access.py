@@ -0,0 +1,81 @@
+# courses/access.py
+# Доступ к урокам по кэшированной карте пользователя: курсы с активной записью
+# и для каждого модуля — до какой позиции уроки открыты. Проверка урока после
+# загрузки карты не ходит в базу.
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Enrollment, Submission
+
+
+def access_cache_key(user_id):
+    return f'lesson-access:{user_id}'
+
+
+def build_access_map(user_id):
+    """(id курсов с активной записью, {id модуля: последний открытый order_num}).
+
+    Заблокированный урок открыт, если проверенных решений в его модуле
+    не меньше, чем уроков перед ним.
+    """
+    course_ids = frozenset(
+        Enrollment.objects.filter(user_id=user_id, status='active').values_list('course_id', flat=True)
+    )
+    graded = (
+        Submission.objects
+        .filter(user_id=user_id, is_graded=True)
+        .values('assignment__lesson__module_id')
+        .annotate(n=Count('id'))
+        .values_list('assignment__lesson__module_id', 'n')
+    )
+    return course_ids, {module_id: n + 1 for module_id, n in graded}
+
+
+def invalidate_access(*user_ids):
+    # После коммита: иначе параллельный запрос успеет закэшировать старое состояние
+    keys = [access_cache_key(user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: caches[settings.LESSON_ACCESS_CACHE].delete_many(keys))
+
+
+class LessonAccess:
+    """Проверка доступа пользователя к урокам.
+
+    Уроки должны быть загружены с select_related('module'). Отказ по карте из
+    кэша перепроверяется по базе один раз: запись на курс или оценка в другом
+    воркере могли ещё не сбросить локальный кэш.
+    """
+
+    NOT_ENROLLED = "Вы не записаны на этот курс"
+    LOCKED = "Сначала завершите предыдущие уроки"
+
+    def __init__(self, user):
+        self.user_id = user.id
+        self.cache = caches[settings.LESSON_ACCESS_CACHE]
+        data = self.cache.get(access_cache_key(self.user_id))
+        self.fresh = data is None
+        if data is None:
+            data = self.rebuild()
+        self.course_ids, self.unlocked = data
+
+    def rebuild(self):
+        data = build_access_map(self.user_id)
+        self.cache.set(access_cache_key(self.user_id), data, settings.LESSON_ACCESS_CACHE_TIMEOUT)
+        return data
+
+    def check(self, lesson):
+        if lesson.module.course_id not in self.course_ids:
+            return self.NOT_ENROLLED
+        if lesson.is_locked and lesson.order_num > self.unlocked.get(lesson.module_id, 1):
+            return self.LOCKED
+        return None
+
+    def error(self, lesson):
+        error = self.check(lesson)
+        if error and not self.fresh:
+            self.course_ids, self.unlocked = self.rebuild()
+            self.fresh = True
+            error = self.check(lesson)
+        return error
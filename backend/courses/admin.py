@@ -1,13 +1,37 @@
 # courses/admin.py
 from django.contrib import admin
+from .admin_tools import AutocompleteFilter, LargeTableAdminMixin, value_filter
 from .models import (
     User, Role, UserRole, Category, Course, Module, Lesson,
     Payment, Enrollment, Rating, Assignment, Submission, Certificate, Comment
 )
 
 
+class SoftDeleteAdminMixin:
+    # Менеджер по умолчанию скрывает удалённые строки, а в админке они нужны
+    def get_queryset(self, request):
+        qs = self.model.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            qs = qs.order_by(*ordering)
+        return qs
+
+
+PaymentStatusFilter = value_filter('status', 'статус', [
+    ('pending', 'pending'), ('completed', 'completed'), ('failed', 'failed'), ('refunded', 'refunded'),
+])
+CurrencyFilter = value_filter('currency', 'валюта', [('RUB', 'RUB'), ('USD', 'USD'), ('EUR', 'EUR')])
+PaymentMethodFilter = value_filter('payment_method', 'способ оплаты', [
+    ('bank_card', 'bank_card'), ('sbp', 'sbp'), ('wallet', 'wallet'),
+])
+EnrollmentStatusFilter = value_filter('status', 'статус', [
+    ('active', 'active'), ('completed', 'completed'), ('dropped', 'dropped'),
+])
+RatingValueFilter = value_filter('rating', 'оценка', [(str(i), '★' * i) for i in range(1, 6)])
+
+
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['id', 'email', 'first_name', 'last_name', 'phone', 'is_active']
     list_filter = ['is_active']
     search_fields = ['email', 'first_name', 'last_name']
@@ -21,8 +45,9 @@ class RoleAdmin(admin.ModelAdmin):
 
 
 @admin.register(UserRole)
-class UserRoleAdmin(admin.ModelAdmin):
+class UserRoleAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['user', 'role']
+    list_select_related = ['user', 'role']
     list_filter = ['role']
     autocomplete_fields = ['user']
 
@@ -30,108 +55,119 @@ class UserRoleAdmin(admin.ModelAdmin):
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'slug', 'parent']
+    list_select_related = ['parent']
     prepopulated_fields = {'slug': ('name',)}
     search_fields = ['name']
 
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(SoftDeleteAdminMixin, LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'id', 'title', 'slug', 'instructor', 'category',
         'price', 'is_published', 'is_deleted', 'duration_hours'
     ]
-    list_filter = ['is_published', 'is_deleted', 'category', 'instructor']
-    search_fields = ['title', 'description', 'short_desc']
+    list_select_related = ['instructor', 'category']
+    list_filter = ['is_published', 'is_deleted', 'category', ('instructor', AutocompleteFilter)]
+    search_fields = ['title', 'short_desc']
     prepopulated_fields = {'slug': ('title',)}
     autocomplete_fields = ['instructor']
     ordering = ['id']
 
 
 @admin.register(Module)
-class ModuleAdmin(admin.ModelAdmin):
+class ModuleAdmin(SoftDeleteAdminMixin, LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['id', 'title', 'course', 'order_num', 'is_deleted']
-    list_filter = ['is_deleted', 'course']
+    list_select_related = ['course']
+    list_filter = ['is_deleted', ('course', AutocompleteFilter)]
     search_fields = ['title']
     autocomplete_fields = ['course']
-    ordering = ['course', 'order_num']
+    ordering = ['course_id', 'order_num']
 
 
 @admin.register(Lesson)
-class LessonAdmin(admin.ModelAdmin):
+class LessonAdmin(SoftDeleteAdminMixin, LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'id', 'title', 'module', 'order_num',
         'is_deleted', 'is_locked', 'duration_min'
     ]
-    list_filter = ['is_deleted', 'is_locked', 'module__course']
-    search_fields = ['title', 'content']
+    list_select_related = ['module']
+    list_filter = ['is_deleted', 'is_locked', ('module__course', AutocompleteFilter)]
+    search_fields = ['title']
     autocomplete_fields = ['module']
-    ordering = ['module', 'order_num']
+    ordering = ['module_id', 'order_num']
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'id', 'user', 'course', 'amount', 'currency',
         'payment_method', 'status', 'paid_at'
     ]
-    list_filter = ['status', 'currency', 'payment_method', 'course']
-    search_fields = ['transaction_id']
+    list_select_related = ['user', 'course']
+    list_filter = [PaymentStatusFilter, CurrencyFilter, PaymentMethodFilter, ('course', AutocompleteFilter)]
+    search_fields = ['=transaction_id']
     autocomplete_fields = ['user', 'course']
     ordering = ['-paid_at']
 
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
+class EnrollmentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'id', 'user', 'course', 'payment',
         'progress_pct', 'status', 'enrolled_at'
     ]
-    list_filter = ['status', 'course']
+    list_select_related = ['user', 'course', 'payment']
+    list_filter = [EnrollmentStatusFilter, ('course', AutocompleteFilter)]
     autocomplete_fields = ['user', 'course', 'payment']
     ordering = ['-enrolled_at']
 
 
 @admin.register(Rating)
-class RatingAdmin(admin.ModelAdmin):
+class RatingAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['id', 'user', 'course', 'rating', 'created_at']
-    list_filter = ['rating', 'course']
+    list_select_related = ['user', 'course']
+    list_filter = [RatingValueFilter, ('course', AutocompleteFilter)]
     autocomplete_fields = ['user', 'course']
     ordering = ['-created_at']
 
 
 @admin.register(Assignment)
-class AssignmentAdmin(admin.ModelAdmin):
+class AssignmentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['id', 'title', 'lesson', 'max_score', 'is_required']
-    list_filter = ['is_required', 'lesson__module__course']
-    search_fields = ['title', 'description']
+    list_select_related = ['lesson']
+    list_filter = ['is_required', ('lesson__module__course', AutocompleteFilter)]
+    search_fields = ['title']
     autocomplete_fields = ['lesson']
 
 
 @admin.register(Submission)
-class SubmissionAdmin(admin.ModelAdmin):
+class SubmissionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'id', 'assignment', 'user', 'score',
         'is_graded', 'submitted_at'
     ]
-    list_filter = ['is_graded', 'assignment__lesson__module__course']
+    list_select_related = ['assignment', 'user']
+    list_filter = ['is_graded', ('assignment__lesson__module__course', AutocompleteFilter)]
     autocomplete_fields = ['assignment', 'user']
     ordering = ['-submitted_at']
 
 
 @admin.register(Certificate)
-class CertificateAdmin(admin.ModelAdmin):
+class CertificateAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['id', 'user', 'course', 'issued_at', 'verification_code']
-    list_filter = ['course']
+    list_select_related = ['user', 'course']
+    list_filter = [('course', AutocompleteFilter)]
     autocomplete_fields = ['user', 'course']
     ordering = ['-issued_at']
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(SoftDeleteAdminMixin, LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'id', 'user', 'course', 'lesson', 'created_at', 'is_deleted'
     ]
-    list_filter = ['is_deleted', 'course']
+    list_select_related = ['user', 'course', 'lesson']
+    list_filter = ['is_deleted', ('course', AutocompleteFilter)]
     search_fields = ['content']
     autocomplete_fields = ['user', 'course', 'lesson']
     ordering = ['-created_at']
\ No newline at end of file
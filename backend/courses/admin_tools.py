@@ -0,0 +1,120 @@
+# courses/admin_tools.py
+# Админка на больших таблицах: оценка числа строк вместо COUNT(*) и фильтр по
+# связанной модели через autocomplete вместо списка всех её строк.
+import json
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.urls import reverse
+from django.utils.functional import cached_property
+
+
+def estimated_count(queryset):
+    """Число строк по статистике планировщика: без фильтров — reltuples таблицы
+    (с секциями), с фильтрами — оценка строк плана запроса."""
+    if not queryset.query.where:
+        table = queryset.model._meta.db_table
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT COALESCE(SUM(GREATEST(reltuples, 0)), 0)::bigint FROM pg_class
+                WHERE oid = to_regclass(%s)
+                   OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(%s))
+                """,
+                [table, table]
+            )
+            return cursor.fetchone()[0]
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    # Точный COUNT(*) только там, где он заведомо дешёвый
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate < settings.ADMIN_EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """Фильтр по внешнему ключу с поиском через admin autocomplete.
+
+    Варианты не загружаются: в боковую панель попадает только выбранный объект.
+    У админки связанной модели должны быть search_fields.
+    """
+    template = 'admin/courses/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        # Источник для autocomplete — модель, которой принадлежит последний FK пути
+        self.source = field.model._meta
+        self.field_name = field.name
+        self.autocomplete_url = reverse(f'{model_admin.admin_site.name}:autocomplete')
+        self.selected = self.selected_object(field)
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def selected_object(self, field):
+        if not self.lookup_val:
+            return None
+        try:
+            return field.remote_field.model._base_manager.filter(
+                **{field.target_field.name: self.lookup_val}
+            ).first()
+        except (ValueError, ValidationError):
+            return None
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.selected,
+            'value': self.lookup_val,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+        }
+
+    @staticmethod
+    def media():
+        return AutocompleteSelect(None, None).media + forms.Media(js=['courses/admin/autocomplete_filter.js'])
+
+
+class LargeTableAdminMixin:
+    """Для таблиц на миллионы строк: оценочный счётчик и без второго COUNT(*)
+    по всей таблице при включённых фильтрах."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        if any(isinstance(item, tuple) and issubclass(item[1], AutocompleteFilter) for item in self.list_filter):
+            media += AutocompleteFilter.media()
+        return media
+
+
+def value_filter(field_name, title, values):
+    """Фильтр по фиксированному списку значений: AllValuesFieldListFilter
+    строит его через SELECT DISTINCT по всей таблице."""
+
+    class ValueFilter(admin.SimpleListFilter):
+        parameter_name = field_name
+
+        def lookups(self, request, model_admin):
+            return values
+
+        def queryset(self, request, queryset):
+            if self.value():
+                return queryset.filter(**{field_name: self.value()})
+            return queryset
+
+    ValueFilter.title = title
+    return ValueFilter
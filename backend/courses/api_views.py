@@ -3,10 +3,10 @@ from .models import Course
 from .serializers import CourseSerializer
 
 class CourseListView(generics.ListAPIView):
-    queryset = Course.objects.filter(is_published=True, is_deleted=False)
+    queryset = Course.objects.filter(is_published=True)
     serializer_class = CourseSerializer
 
 class CourseDetailView(generics.RetrieveAPIView):
-    queryset = Course.objects.filter(is_published=True, is_deleted=False)
+    queryset = Course.objects.filter(is_published=True)
     serializer_class = CourseSerializer
     lookup_field = 'slug'
\ No newline at end of file
@@ -0,0 +1,87 @@
+# courses/authentication.py
+# JWT без запроса к users на каждый запрос: request.user собирается из
+# проверенных claims (user_id, email, roles) как TokenUser, остальные поля
+# строки читаются лениво, если они нужны вьюхе. Отзыв токенов — по версии:
+# claim ver сверяется с users.token_version, которая кэшируется на
+# TOKEN_VERSION_CACHE_TIMEOUT секунд; revoke_tokens() поднимает версию.
+# Сброс кэша виден всем воркерам только при общем TOKEN_VERSION_CACHE;
+# обновление токена читает версию и is_active из базы в обход кэша.
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import TokenUser, User
+
+TOKEN_VERSION_CLAIM = 'ver'
+_missing = object()
+
+
+def token_version_key(user_id):
+    return f'token-version:{user_id}'
+
+
+def stored_token_version(user_id):
+    return User.objects.filter(id=user_id, is_active=True).values_list('token_version', flat=True).first()
+
+
+def current_token_version(user_id):
+    """Версия токенов пользователя или None, если он удалён или заблокирован."""
+    cache = caches[settings.TOKEN_VERSION_CACHE]
+    version = cache.get(token_version_key(user_id), _missing)
+    if version is _missing:
+        version = stored_token_version(user_id)
+        cache.set(token_version_key(user_id), version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def forget_token_version(user_id):
+    # После коммита: иначе параллельный запрос закэширует старую версию
+    key = token_version_key(user_id)
+    transaction.on_commit(lambda: caches[settings.TOKEN_VERSION_CACHE].delete(key))
+
+
+def revoke_tokens(user_id):
+    """Отзывает все выданные пользователю access- и refresh-токены."""
+    User.objects.filter(id=user_id).update(token_version=F('token_version') + 1)
+    forget_token_version(user_id)
+
+
+def token_user_id(token):
+    try:
+        return int(token[api_settings.USER_ID_CLAIM])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidToken("В токене нет id пользователя")
+
+
+def check_token_version(token, use_cache=True):
+    """id пользователя из токена; AuthenticationFailed, если токен отозван.
+
+    use_cache=False читает версию из базы: кэш другого процесса мог не узнать
+    о блокировке или logout-all.
+    """
+    user_id = token_user_id(token)
+    version = current_token_version(user_id) if use_cache else stored_token_version(user_id)
+    if version is None:
+        raise AuthenticationFailed("Пользователь не найден или заблокирован", code='user_inactive')
+    if token.get(TOKEN_VERSION_CLAIM) != version:
+        raise AuthenticationFailed("Токен отозван, войдите заново", code='token_revoked')
+    return user_id
+
+
+class TokenUserAuthentication(JWTAuthentication):
+    """JWTAuthentication, которая не читает строку пользователя."""
+
+    def get_user(self, validated_token):
+        user_id = check_token_version(validated_token)
+        email = validated_token.get('email')
+        if email is None:
+            user = TokenUser.from_db(DEFAULT_DB_ALIAS, ['id'], [user_id])
+        else:
+            user = TokenUser.from_db(DEFAULT_DB_ALIAS, ['id', 'email'], [user_id, email])
+        user.roles = tuple(validated_token.get('roles', ()))
+        return user
@@ -0,0 +1,257 @@
+# courses/catalog.py
+# Каталог с фасетами: цена, длительность (корзины), минимальный рейтинг,
+# категории и преподаватели. Счётчики всех фасетов — один проход по
+# опубликованным курсам: для каждой строки отмечается, какие фильтры она не
+# прошла, дальше GROUPING SETS по измерениям. В группе измерения считаются
+# строки, прошедшие все фильтры, кроме фильтра этого же измерения: выбранная
+# категория не обнуляет счётчики остальных категорий. Итог и счётчики по
+# рейтингу складываются из групп по цене (у каждого курса ровно одна корзина
+# цены), поэтому все группы хешируются и сортировка не нужна.
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from .models import Course
+
+# Значения ?ordering= и соответствующий ORDER BY
+ORDERINGS = {
+    '-created_at': 'c.created_at DESC, c.id DESC',
+    'price': 'c.price, c.id',
+    '-price': 'c.price DESC, c.id DESC',
+    '-rating': 's.rating_avg DESC NULLS LAST, c.id DESC',
+    '-ratings_count': 'COALESCE(s.ratings_count, 0) DESC, c.id DESC',
+}
+
+DIMENSIONS = ('category', 'instructor', 'price', 'duration', 'rating')
+FILTER_PARAMS = ('category', 'instructor', 'price_min', 'price_max', 'duration', 'rating_min')
+# Измерения GROUPING SETS; у каждого бит в GROUPING() равен 0 только в его группе
+GROUPED = ('category_id', 'instructor_id', 'price_bucket', 'duration_bucket')
+ALL_BITS = (1 << len(GROUPED)) - 1
+GROUP_OF = {ALL_BITS ^ (1 << (len(GROUPED) - 1 - i)): column for i, column in enumerate(GROUPED)}
+
+BASE_SQL = """
+FROM courses c
+LEFT JOIN course_rating_stats s ON s.course_id = c.id
+WHERE c.is_published = true AND c.is_deleted = false
+"""
+
+FACETS_SQL = """
+WITH base AS (
+    SELECT c.category_id, c.instructor_id,
+           width_bucket(c.price, %(price_bounds)s::numeric[]) AS price_bucket,
+           width_bucket(c.duration_hours, %(duration_bounds)s::int[]) AS duration_bucket,
+           s.rating_avg,
+           {misses}
+    {base}
+),
+facets AS (
+    SELECT GROUPING({grouped}) AS grouping_id, {grouped},
+           COUNT(*) FILTER (WHERE miss_category + miss_instructor + miss_price + miss_duration + miss_rating = 0) AS matched,
+           {without},
+           {ratings}
+    FROM base
+    -- Строка, не прошедшая два фильтра, не попадает ни в один счётчик
+    WHERE miss_category + miss_instructor + miss_price + miss_duration + miss_rating <= 1
+    GROUP BY GROUPING SETS ((category_id), (instructor_id), (price_bucket), (duration_bucket))
+)
+-- Имена подзапросом по первичному ключу: хеш всей таблицы users дороже
+SELECT f.*,
+       (SELECT name FROM categories WHERE id = f.category_id) AS category_name,
+       (SELECT concat_ws(' ', first_name, last_name) FROM users WHERE id = f.instructor_id) AS instructor_name
+FROM facets f
+"""
+
+
+def bucket_ranges(bounds):
+    """[0, 2, 5] -> [(0, 2), (2, 5), (5, None)]: корзины [min, max)."""
+    return list(zip(bounds, list(bounds[1:]) + [None]))
+
+
+def filter_conditions(filters):
+    """{измерение: (SQL-условие, параметры)} для заданных фильтров."""
+    conditions = {}
+    if filters.get('category'):
+        conditions['category'] = ('c.category_id = ANY(%(category)s)', {'category': filters['category']})
+    if filters.get('instructor'):
+        conditions['instructor'] = ('c.instructor_id = ANY(%(instructor)s)', {'instructor': filters['instructor']})
+
+    price = []
+    if filters.get('price_min') is not None:
+        price.append('c.price >= %(price_min)s')
+    if filters.get('price_max') is not None:
+        price.append('c.price < %(price_max)s')
+    if price:
+        conditions['price'] = (
+            ' AND '.join(price),
+            {'price_min': filters.get('price_min'), 'price_max': filters.get('price_max')},
+        )
+
+    if filters.get('duration'):
+        # Диапазоны, а не width_bucket: так работает индекс по duration_hours
+        ranges, params = [], {}
+        for i, lower in enumerate(filters['duration']):
+            upper = dict(bucket_ranges(settings.CATALOG_DURATION_BUCKETS))[lower]
+            params[f'duration_{i}_min'] = lower
+            if upper is None:
+                ranges.append(f'c.duration_hours >= %(duration_{i}_min)s')
+            else:
+                params[f'duration_{i}_max'] = upper
+                ranges.append(f'(c.duration_hours >= %(duration_{i}_min)s AND c.duration_hours < %(duration_{i}_max)s)')
+        conditions['duration'] = ('(' + ' OR '.join(ranges) + ')', params)
+
+    if filters.get('rating_min') is not None:
+        conditions['rating'] = ('s.rating_avg >= %(rating_min)s', {'rating_min': filters['rating_min']})
+    return conditions
+
+
+def catalog_facets(conditions, selected):
+    params = {
+        'price_bounds': list(settings.CATALOG_PRICE_BUCKETS),
+        'duration_bounds': list(settings.CATALOG_DURATION_BUCKETS),
+    }
+    misses = []
+    for dimension in DIMENSIONS:
+        if dimension in conditions:
+            sql, condition_params = conditions[dimension]
+            params.update(condition_params)
+            misses.append(f'(NOT COALESCE({sql}, false))::int AS miss_{dimension}')
+        else:
+            misses.append(f'0 AS miss_{dimension}')
+
+    others = {
+        dimension: ' + '.join(f'miss_{other}' for other in DIMENSIONS if other != dimension)
+        for dimension in DIMENSIONS
+    }
+    without = [
+        f'COUNT(*) FILTER (WHERE {others[dimension]} = 0) AS without_{dimension}'
+        for dimension in ('category', 'instructor', 'price', 'duration')
+    ]
+    ratings = []
+    for i, threshold in enumerate(settings.CATALOG_RATING_THRESHOLDS):
+        params[f'rating_threshold_{i}'] = threshold
+        ratings.append(
+            f"COUNT(*) FILTER (WHERE {others['rating']} = 0 AND rating_avg >= %(rating_threshold_{i})s) AS rating_{i}"
+        )
+
+    sql = FACETS_SQL.format(
+        base=BASE_SQL,
+        misses=',\n           '.join(misses),
+        grouped=', '.join(GROUPED),
+        without=',\n           '.join(without),
+        ratings=',\n           '.join(ratings),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col.name for col in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    return build_facets(rows, selected)
+
+
+def build_facets(rows, selected):
+    grouped = {column: [] for column in GROUPED}
+    for row in rows:
+        grouped[GROUP_OF[row['grouping_id']]].append(row)
+    by_price = grouped['price_bucket']
+
+    categories = [
+        {'id': row['category_id'], 'name': row['category_name'], 'count': row['without_category']}
+        for row in grouped['category_id']
+        if row['without_category'] or row['category_id'] in selected['category']
+    ]
+    instructors = [
+        {'id': row['instructor_id'], 'name': row['instructor_name'], 'count': row['without_instructor']}
+        for row in grouped['instructor_id']
+        if row['without_instructor'] or row['instructor_id'] in selected['instructor']
+    ]
+    # Преподавателей тысячи: в фасет попадают самые частые и выбранные
+    instructors.sort(key=lambda item: (-item['count'], item['id']))
+    instructors = [
+        item for i, item in enumerate(instructors)
+        if i < settings.CATALOG_FACET_LIMIT or item['id'] in selected['instructor']
+    ]
+    categories.sort(key=lambda item: (-item['count'], item['name']))
+
+    return {
+        'total': sum(row['matched'] for row in by_price),
+        'facets': {
+            'category': categories,
+            'instructor': instructors,
+            'price': bucket_facet(grouped['price_bucket'], 'price', settings.CATALOG_PRICE_BUCKETS),
+            'duration': bucket_facet(grouped['duration_bucket'], 'duration', settings.CATALOG_DURATION_BUCKETS),
+            'rating': [
+                {'min': threshold, 'count': sum(row[f'rating_{i}'] for row in by_price)}
+                for i, threshold in enumerate(settings.CATALOG_RATING_THRESHOLDS)
+            ],
+        },
+    }
+
+
+def bucket_facet(rows, dimension, bounds):
+    # width_bucket: 1..len(bounds) — номер корзины, 0 и NULL — вне корзин
+    counts = {row[f'{dimension}_bucket']: row[f'without_{dimension}'] for row in rows}
+    return [
+        {'min': lower, 'max': upper, 'count': counts.get(i, 0)}
+        for i, (lower, upper) in enumerate(bucket_ranges(bounds), 1)
+    ]
+
+
+def catalog_page_ids(conditions, ordering, limit, offset):
+    params = {'limit': limit, 'offset': offset}
+    where = []
+    for sql, condition_params in conditions.values():
+        where.append(f'AND {sql}')
+        params.update(condition_params)
+    sql = f"SELECT c.id {BASE_SQL} {' '.join(where)} ORDER BY {ORDERINGS[ordering]} LIMIT %(limit)s OFFSET %(offset)s"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def facets_cache_key(filters):
+    # Порядок значений не важен: category=1,2 и category=2,1 — один ключ
+    parts = []
+    for name in FILTER_PARAMS:
+        value = filters.get(name)
+        parts.append(f'{name}={sorted(value) if isinstance(value, list) else value}')
+    return 'catalog-facets:' + hashlib.md5('&'.join(parts).encode()).hexdigest()
+
+
+def catalog_page(filters, ordering, limit, offset):
+    """(курсы страницы в порядке ordering, всего найдено, фасеты).
+
+    Фасеты и общее число кэшируются на CATALOG_FACETS_TIMEOUT секунд: листание
+    страниц и смена сортировки стоят двух коротких запросов.
+    """
+    conditions = filter_conditions(filters)
+    cache = caches[settings.CATALOG_FACETS_CACHE]
+    key = facets_cache_key(filters)
+    facets = cache.get(key)
+    if facets is None:
+        selected = {
+            'category': set(filters.get('category') or ()),
+            'instructor': set(filters.get('instructor') or ()),
+        }
+        facets = catalog_facets(conditions, selected)
+        cache.set(key, facets, settings.CATALOG_FACETS_TIMEOUT)
+    ids = catalog_page_ids(conditions, ordering, limit, offset) if facets['total'] > offset else []
+    courses = Course.objects.filter(id__in=ids).select_related('instructor', 'category').annotate(
+        average_rating=F('rating_stats__rating_avg'),
+        ratings_count=Coalesce(F('rating_stats__ratings_count'), 0),
+    )
+    by_id = {course.id: course for course in courses}
+    return [by_id[course_id] for course_id in ids if course_id in by_id], facets['total'], facets['facets']
+
+
+def rebuild_rating_stats():
+    """Пересчитывает course_rating_stats целиком (после загрузки с отключённым триггером)."""
+    with connection.cursor() as cursor:
+        cursor.execute("TRUNCATE course_rating_stats")
+        cursor.execute(
+            "INSERT INTO course_rating_stats (course_id, ratings_count, ratings_sum) "
+            "SELECT course_id, COUNT(*), SUM(rating) FROM ratings GROUP BY course_id"
+        )
+        return cursor.rowcount
@@ -0,0 +1,133 @@
+# courses/certificates.py
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+
+from .models import Certificate, Enrollment
+
+CERTIFICATE_TEMPLATE = """<!DOCTYPE html>
+<html lang="ru">
+<head><meta charset="utf-8"><title>Сертификат {code}</title></head>
+<body>
+  <h1>Сертификат о прохождении курса</h1>
+  <p>Настоящим подтверждается, что <strong>{student}</strong></p>
+  <p>успешно завершил(а) курс <strong>«{course}»</strong>.</p>
+  <p>Дата окончания: {completed_at}</p>
+  <p>Код проверки: <code>{code}</code></p>
+</body>
+</html>
+"""
+
+
+def certificates_dir():
+    return Path(settings.MEDIA_ROOT) / 'certificates'
+
+
+def certificate_cache_key(code):
+    return f'certificate:{code}'
+
+
+def render_certificate(doc):
+    # Выполняется в дочернем процессе: только чистые данные, без ORM
+    path = Path(doc['directory']) / f"{doc['code']}.html"
+    path.write_text(CERTIFICATE_TEMPLATE.format(
+        code=escape(doc['code']),
+        student=escape(doc['student']),
+        course=escape(doc['course']),
+        completed_at=doc['completed_at'],
+    ), encoding='utf-8')
+    return doc['code']
+
+
+def pending_enrollments():
+    # Завершённые записи без сертификата
+    return Enrollment.objects.filter(status='completed').filter(
+        ~Exists(Certificate.objects.filter(user=OuterRef('user'), course=OuterRef('course')))
+    )
+
+
+def issue_certificates(batch_size=500, workers=4):
+    """Выпускает сертификаты пачками и возвращает число созданных строк."""
+    directory = certificates_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    issued = 0
+    last_id = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = list(
+                pending_enrollments()
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .values(
+                    'id', 'user_id', 'course_id', 'completed_at',
+                    'user__first_name', 'user__last_name', 'course__title'
+                )[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1]['id']
+
+            docs = [{
+                'directory': str(directory),
+                'code': f'CERT-{secrets.token_hex(8).upper()}',
+                'student': f"{row['user__first_name']} {row['user__last_name']}",
+                'course': row['course__title'],
+                'completed_at': row['completed_at'].date().isoformat() if row['completed_at'] else '',
+                'user_id': row['user_id'],
+                'course_id': row['course_id'],
+            } for row in batch]
+            list(pool.map(render_certificate, docs, chunksize=max(1, len(docs) // (workers * 4))))
+
+            # ignore_conflicts: параллельный воркер мог уже выдать сертификат той же паре
+            Certificate.objects.bulk_create([
+                Certificate(
+                    user_id=doc['user_id'],
+                    course_id=doc['course_id'],
+                    certificate_url=f"{settings.CERTIFICATE_BASE_URL}{doc['code']}.html",
+                    verification_code=doc['code'],
+                ) for doc in docs
+            ], ignore_conflicts=True)
+            issued += Certificate.objects.filter(
+                verification_code__in=[doc['code'] for doc in docs]
+            ).count()
+
+    return issued
+
+
+def verify_certificate(code):
+    """Read-through кэш над уникальным индексом verification_code.
+
+    Возвращает словарь для ответа или None; отсутствие сертификата
+    тоже кэшируется, но на короткое время.
+    """
+    key = certificate_cache_key(code)
+    data = cache.get(key)
+    if data is not None:
+        return data or None
+
+    certificate = (
+        Certificate.objects
+        .select_related('user', 'course')
+        .filter(verification_code=code)
+        .first()
+    )
+    if certificate is None:
+        cache.set(key, {}, settings.CERTIFICATE_MISS_CACHE_TIMEOUT)
+        return None
+
+    data = {
+        'verification_code': certificate.verification_code,
+        'student': f'{certificate.user.first_name} {certificate.user.last_name}',
+        'course': certificate.course.title,
+        'course_slug': certificate.course.slug,
+        'issued_at': certificate.issued_at.isoformat() if certificate.issued_at else None,
+        'certificate_url': certificate.certificate_url,
+    }
+    cache.set(key, data, settings.CERTIFICATE_CACHE_TIMEOUT)
+    return data
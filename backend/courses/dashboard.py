@@ -0,0 +1,63 @@
+# courses/dashboard.py
+from django.db import connection
+
+# Один проход по урокам всех курсов пользователя: позиция урока в курсе
+# (ROW_NUMBER по модулям и урокам), флаг «пройден» (есть проверенное решение),
+# затем по курсу — сколько пройдено, докуда дошёл и какой урок следующий.
+DASHBOARD_SQL = """
+WITH ordered AS (
+    SELECT l.id, l.title, m.course_id,
+           ROW_NUMBER() OVER (
+               PARTITION BY m.course_id ORDER BY m.order_num, l.order_num, l.id
+           ) AS pos,
+           EXISTS (
+               SELECT 1 FROM assignments a
+               JOIN submissions s ON s.assignment_id = a.id
+               WHERE a.lesson_id = l.id AND s.user_id = %(user_id)s AND s.is_graded
+           ) AS done
+    FROM lessons l
+    JOIN modules m ON m.id = l.module_id
+    WHERE m.course_id = ANY(%(course_ids)s)
+      AND l.is_deleted = false AND m.is_deleted = false
+),
+progress AS (
+    SELECT course_id,
+           COUNT(*) AS total,
+           COUNT(*) FILTER (WHERE done) AS completed,
+           COALESCE(MAX(pos) FILTER (WHERE done), 0) AS last_done
+    FROM ordered
+    GROUP BY course_id
+),
+activity AS (
+    SELECT m.course_id, MAX(s.submitted_at) AS last_activity
+    FROM submissions s
+    JOIN assignments a ON a.id = s.assignment_id
+    JOIN lessons l ON l.id = a.lesson_id
+    JOIN modules m ON m.id = l.module_id
+    WHERE s.user_id = %(user_id)s AND m.course_id = ANY(%(course_ids)s)
+    GROUP BY m.course_id
+)
+SELECT p.course_id, p.total, p.completed, o.id, o.title, act.last_activity
+FROM progress p
+LEFT JOIN ordered o ON o.course_id = p.course_id AND o.pos = p.last_done + 1
+LEFT JOIN activity act ON act.course_id = p.course_id
+"""
+
+
+def learning_stats(user_id, course_ids):
+    """Прогресс, последняя активность и следующий урок по каждому курсу одним запросом."""
+    if not course_ids:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(DASHBOARD_SQL, {'user_id': user_id, 'course_ids': list(course_ids)})
+        rows = cursor.fetchall()
+
+    return {
+        course_id: {
+            'total_lessons': total,
+            'completed_lessons': completed,
+            'next_lesson': {'id': lesson_id, 'title': lesson_title} if lesson_id else None,
+            'last_activity_at': last_activity,
+        }
+        for course_id, total, completed, lesson_id, lesson_title, last_activity in rows
+    }
@@ -0,0 +1,377 @@
+# courses/dataset.py
+# Детерминированный синтетический датасет для нагрузочных тестов.
+# Один и тот же seed даёт те же строки: генератор каждого куска данных
+# инициализируется от (seed, таблица, номер куска), а блоки id резервируются в
+# порядке кусков, поэтому результат не зависит от числа процессов.
+# Строки пишутся через COPY из нескольких процессов.
+import csv
+import io
+import random
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+from itertools import accumulate
+
+from django.db import connection, transaction
+
+from .models import (
+    Assignment, Category, Comment, Course, Enrollment, Lesson, Module,
+    Payment, Rating, Submission, User, UserRole
+)
+
+FIRST_NAMES = ['Анна', 'Иван', 'Мария', 'Алексей', 'Елена', 'Дмитрий', 'Ольга', 'Сергей',
+               'Наталья', 'Андрей', 'Татьяна', 'Никита', 'Лиза', 'Павел', 'Ксения', 'Максим']
+LAST_NAMES = ['Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов',
+              'Михайлов', 'Новиков', 'Фёдоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев']
+TOPICS = ['Python', 'Django', 'SQL', 'PostgreSQL', 'JavaScript', 'React', 'Java', 'C#',
+          'Go', 'Docker', 'Linux', 'Алгоритмы', 'Машинное обучение', 'Дизайн', 'Тестирование']
+LEVELS = ['для начинающих', 'с нуля', 'продвинутый уровень', 'на практике', 'интенсив', 'для профи']
+WORDS = ['урок', 'практика', 'функции', 'данные', 'проект', 'основы', 'запросы', 'модели',
+         'тесты', 'архитектура', 'интерфейс', 'оптимизация', 'API', 'деплой', 'отладка']
+PAYMENT_METHODS = ['bank_card', 'sbp', 'wallet']
+# J-образное распределение оценок, как на реальных площадках
+RATING_WEIGHTS = list(accumulate([6, 4, 10, 25, 55]))
+
+STUDENT_ROLE = 3
+INSTRUCTOR_ROLE = 2
+
+# Построчные триггеры, которые на COPY миллионов строк не нужны: генератор сам
+# не создаёт дублей, а advisory-лок на каждую строку исчерпывает таблицу блокировок.
+# Сводку оценок и рейтинг курсов быстрее пересчитать одним запросом после загрузки
+BULK_SUSPENDED_TRIGGERS = [
+    ('submissions', 'check_submission_unique_on_write'),
+    ('submissions', 'refresh_course_scores_on_write'),
+    ('ratings', 'refresh_course_rating_stats_on_write'),
+]
+
+
+def rng_for(seed, *key):
+    return random.Random(':'.join(map(str, (seed,) + key)))
+
+
+def zipf_cum_weights(n, exponent, rng):
+    """Накопленные веса Zipf для n элементов в случайном порядке:
+    «популярные» не совпадают с первыми id."""
+    order = list(range(n))
+    rng.shuffle(order)
+    weights = [0.0] * n
+    for rank, index in enumerate(order, 1):
+        weights[index] = 1 / rank ** exponent
+    return list(accumulate(weights))
+
+
+def pick(cum_weights, rng):
+    return bisect_left(cum_weights, rng.random() * cum_weights[-1])
+
+
+def sentence(rng, words=6):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def copy_rows(cursor, model, columns, rows):
+    if not rows:
+        return 0
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f'COPY "{model._meta.db_table}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+        buffer
+    )
+    return len(rows)
+
+
+def reserve_ids(cursor, model, count):
+    """Забирает из последовательности id подряд count значений; возвращает
+    последний id перед блоком. Резервирование сериализуется advisory-локом."""
+    table = model._meta.db_table
+    if count == 0:
+        return 0
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [f'dataset:{table}'])
+    cursor.execute(
+        "SELECT setval(pg_get_serial_sequence(%s, 'id'), nextval(pg_get_serial_sequence(%s, 'id')) + %s - 1)",
+        [table, table, count]
+    )
+    return cursor.fetchone()[0] - count
+
+
+@contextmanager
+def suspended_triggers():
+    """Отключает BULK_SUSPENDED_TRIGGERS на время загрузки и включает обратно."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, t.tgname FROM pg_trigger t JOIN pg_class c ON c.oid = t.tgrelid "
+            "WHERE (c.relname, t.tgname) IN %s",
+            [tuple(BULK_SUSPENDED_TRIGGERS)]
+        )
+        triggers = cursor.fetchall()
+        for table, trigger in triggers:
+            cursor.execute(f'ALTER TABLE "{table}" DISABLE TRIGGER "{trigger}"')
+    try:
+        yield [trigger for _, trigger in triggers]
+    finally:
+        with connection.cursor() as cursor:
+            for table, trigger in triggers:
+                cursor.execute(f'ALTER TABLE "{table}" ENABLE TRIGGER "{trigger}"')
+
+
+class DatasetPlan:
+    """Параметры и раскладка id, общие для всех процессов (передаются через fork)."""
+
+    def __init__(self, seed, users, courses, categories, instructors, end, days,
+                 max_enrollments, chunk_size):
+        self.seed = seed
+        self.users = users
+        self.courses = courses
+        self.categories = categories
+        self.instructors = instructors
+        self.end = end
+        self.days = days
+        self.max_enrollments = max_enrollments
+        self.chunk_size = chunk_size
+
+    def moment(self, rng, not_before=None):
+        # Квадрат равномерной величины сдвигает даты к концу периода — рост аудитории
+        moment = self.end - timedelta(seconds=self.days * 86400 * rng.random() ** 2)
+        if not_before and moment < not_before:
+            moment = not_before + timedelta(seconds=rng.randint(60, 7 * 86400))
+        return min(moment, self.end)
+
+    def layout(self):
+        """Форма каждого курса (модули, уроки, задания) и зарезервированные блоки id."""
+        self.shapes = []
+        for course in range(self.courses):
+            rng = rng_for(self.seed, 'shape', course)
+            self.shapes.append([
+                [rng.random() < 0.4 for _ in range(rng.randint(3, 7))]
+                for _ in range(rng.randint(3, 8))
+            ])
+
+        rng = rng_for(self.seed, 'popularity')
+        self.course_weights = zipf_cum_weights(self.courses, 1.07, rng)
+        self.instructor_weights = zipf_cum_weights(self.instructors, 1.2, rng)
+        self.prices = [
+            0 if rng.random() < 0.15 else rng.choice([990, 1490, 1990, 2990, 3490, 4990, 7990])
+            for _ in range(self.courses)
+        ]
+
+        modules = sum(len(shape) for shape in self.shapes)
+        lessons = sum(len(module) for shape in self.shapes for module in shape)
+        assignments = sum(sum(module) for shape in self.shapes for module in shape)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            self.category_base = reserve_ids(cursor, Category, self.categories)
+            self.user_base = reserve_ids(cursor, User, self.users)
+            self.course_base = reserve_ids(cursor, Course, self.courses)
+            module_base = reserve_ids(cursor, Module, modules)
+            lesson_base = reserve_ids(cursor, Lesson, lessons)
+            assignment_base = reserve_ids(cursor, Assignment, assignments)
+
+        # Уроки и задания курса идут подряд: курсу достаточно начала блока и длины
+        self.module_start, self.lesson_start, self.assignment_start = [], [], []
+        self.lesson_count, self.assignment_count = [], []
+        for shape in self.shapes:
+            self.module_start.append(module_base)
+            self.lesson_start.append(lesson_base)
+            self.assignment_start.append(assignment_base)
+            course_lessons = sum(len(module) for module in shape)
+            course_assignments = sum(sum(module) for module in shape)
+            self.lesson_count.append(course_lessons)
+            self.assignment_count.append(course_assignments)
+            module_base += len(shape)
+            lesson_base += course_lessons
+            assignment_base += course_assignments
+        return {'modules': modules, 'lessons': lessons, 'assignments': assignments}
+
+    def chunks(self, total):
+        return [(start, min(start + self.chunk_size, total)) for start in range(0, total, self.chunk_size)]
+
+
+def write_categories(plan):
+    rng = rng_for(plan.seed, 'categories')
+    rows = []
+    for index in range(plan.categories):
+        category_id = plan.category_base + index + 1
+        # Первые пять — корневые, остальные вложены в них
+        parent_id = plan.category_base + rng.randint(1, 5) if index >= 5 else None
+        rows.append((category_id, f'{rng.choice(TOPICS)} {index + 1}', f'cat-{category_id}', parent_id))
+    with transaction.atomic(), connection.cursor() as cursor:
+        return copy_rows(cursor, Category, ['id', 'name', 'slug', 'parent_id'], rows)
+
+
+def write_users(plan, password_hash, start, end):
+    rng = rng_for(plan.seed, 'users', start)
+    users, roles = [], []
+    for index in range(start, end):
+        user_id = plan.user_base + index + 1
+        created = plan.moment(rng)
+        users.append((
+            user_id, f'user{user_id}@example.test', password_hash,
+            rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f'+7900{user_id % 10_000_000:07d}',
+            f'https://avatars.example.test/{user_id}.jpg' if rng.random() < 0.3 else None,
+            't', created, created
+        ))
+        roles.append((user_id, INSTRUCTOR_ROLE if index < plan.instructors else STUDENT_ROLE))
+    with transaction.atomic(), connection.cursor() as cursor:
+        written = copy_rows(cursor, User, [
+            'id', 'email', 'password_hash', 'first_name', 'last_name', 'phone',
+            'avatar_url', 'is_active', 'created_at', 'updated_at'
+        ], users)
+        written += copy_rows(cursor, UserRole, ['user_id', 'role_id'], roles)
+    return written
+
+
+def write_courses(plan, start, end):
+    courses, modules, lessons, assignments = [], [], [], []
+    for course in range(start, end):
+        rng = rng_for(plan.seed, 'course', course)
+        course_id = plan.course_base + course + 1
+        created = plan.moment(rng)
+        total_minutes = 0
+        module_id = plan.module_start[course]
+        lesson_id = plan.lesson_start[course]
+        assignment_id = plan.assignment_start[course]
+        for module_num, module in enumerate(plan.shapes[course], 1):
+            module_id += 1
+            modules.append((module_id, course_id, f'Модуль {module_num}. {sentence(rng, 3)}', sentence(rng, 10), module_num))
+            for lesson_num, has_assignment in enumerate(module, 1):
+                lesson_id += 1
+                duration = rng.randint(5, 40)
+                total_minutes += duration
+                lessons.append((
+                    lesson_id, module_id, f'Урок {lesson_num}. {sentence(rng, 3)}', sentence(rng, 30),
+                    f'https://video.example.test/{lesson_id}', lesson_num,
+                    't' if module_num > 1 and lesson_num > 1 and rng.random() < 0.3 else 'f', duration
+                ))
+                if has_assignment:
+                    assignment_id += 1
+                    assignments.append((assignment_id, lesson_id, f'Задание: {sentence(rng, 3)}',
+                                        sentence(rng, 15), rng.choice([10, 20, 50, 100]), 't'))
+        topic = rng.choice(TOPICS)
+        courses.append((
+            course_id, f'{topic} {rng.choice(LEVELS)} #{course_id}', f'course-{course_id}',
+            sentence(rng, 40), sentence(rng, 12),
+            plan.user_base + pick(plan.instructor_weights, rng) + 1,
+            plan.category_base + rng.randint(1, plan.categories),
+            plan.prices[course], 'f' if rng.random() < 0.05 else 't', 'f',
+            f'https://img.example.test/courses/{course_id}.jpg',
+            max(1, round(total_minutes / 60)), created, created
+        ))
+    with transaction.atomic(), connection.cursor() as cursor:
+        written = copy_rows(cursor, Course, [
+            'id', 'title', 'slug', 'description', 'short_desc', 'instructor_id', 'category_id',
+            'price', 'is_published', 'is_deleted', 'thumbnail_url', 'duration_hours', 'created_at', 'updated_at'
+        ], courses)
+        written += copy_rows(cursor, Module, ['id', 'course_id', 'title', 'description', 'order_num'], modules)
+        written += copy_rows(cursor, Lesson, [
+            'id', 'module_id', 'title', 'content', 'video_url', 'order_num', 'is_locked', 'duration_min'
+        ], lessons)
+        written += copy_rows(cursor, Assignment, [
+            'id', 'lesson_id', 'title', 'description', 'max_score', 'is_required'
+        ], assignments)
+    return written
+
+
+def write_activity(plan, start, end, reservation_turn=nullcontext):
+    """Записи на курсы, платежи, оценки, решения и комментарии для пользователей [start, end).
+
+    Строки собираются с локальными id, затем под каждую таблицу резервируется
+    блок из последовательности и id сдвигаются — без пропусков и пересечений.
+    reservation_turn(номер куска) упорядочивает резервирование между процессами,
+    чтобы id не зависели от того, какой кусок сгенерирован раньше.
+    """
+    rng = rng_for(plan.seed, 'activity', start)
+    payments, enrollments, ratings, submissions, comments = [], [], [], [], []
+    for index in range(max(start, plan.instructors), end):
+        user_id = plan.user_base + index + 1
+        # Большинство зарегистрированных ничего не покупает, у немногих — десятки курсов
+        if rng.random() < 0.35:
+            continue
+        wanted = min(plan.max_enrollments, int(rng.paretovariate(1.6)))
+        courses = set()
+        for _ in range(wanted * 3):
+            if len(courses) == wanted:
+                break
+            courses.add(pick(plan.course_weights, rng))
+
+        for course in courses:
+            course_id = plan.course_base + course + 1
+            enrolled_at = plan.moment(rng)
+            payment_ref = None
+            if plan.prices[course]:
+                payment_ref = len(payments)
+                payments.append([payment_ref, user_id, course_id, plan.prices[course], 'RUB',
+                                 rng.choice(PAYMENT_METHODS), 'completed',
+                                 f'syn-{plan.seed}-{user_id}-{course_id}', enrolled_at])
+            # Прогресс смещён к нулю: большинство бросает курс в начале
+            progress = min(100, int(rng.betavariate(0.6, 1.4) * 110))
+            completed_at = plan.moment(rng, not_before=enrolled_at) if progress == 100 else None
+            enrollments.append([len(enrollments), user_id, course_id, payment_ref, enrolled_at,
+                                completed_at, progress, 'completed' if progress == 100 else 'active'])
+
+            if rng.random() < (0.6 if progress == 100 else 0.15):
+                rated_at = plan.moment(rng, not_before=enrolled_at)
+                stars = bisect_left(RATING_WEIGHTS, rng.random() * RATING_WEIGHTS[-1]) + 1
+                ratings.append([len(ratings), user_id, course_id, stars,
+                                sentence(rng, 8) if rng.random() < 0.5 else None, rated_at, rated_at])
+
+            done = round(plan.assignment_count[course] * progress / 100)
+            for offset in range(done):
+                submitted_at = plan.moment(rng, not_before=enrolled_at)
+                graded = rng.random() < 0.85
+                submissions.append([len(submissions), plan.assignment_start[course] + offset + 1, user_id,
+                                    submitted_at, sentence(rng, 20),
+                                    rng.randint(0, 10) if graded else None,
+                                    sentence(rng, 6) if graded else None, 't' if graded else 'f'])
+
+            for _ in range(int(rng.expovariate(1.5))):
+                lesson_id = plan.lesson_start[course] + rng.randint(1, plan.lesson_count[course]) if rng.random() < 0.7 else None
+                # Ответ на один из уже написанных комментариев к этому курсу
+                parent_ref = None
+                if comments and rng.random() < 0.2:
+                    candidate = comments[rng.randrange(max(0, len(comments) - 50), len(comments))]
+                    if candidate[3] == course_id:
+                        parent_ref = candidate[0]
+                        lesson_id = candidate[4]
+                comments.append([len(comments), parent_ref, user_id, course_id, lesson_id,
+                                 sentence(rng, 15), plan.moment(rng, not_before=enrolled_at)])
+
+    with reservation_turn(start // plan.chunk_size), transaction.atomic(), connection.cursor() as cursor:
+        payment_base = reserve_ids(cursor, Payment, len(payments))
+        enrollment_base = reserve_ids(cursor, Enrollment, len(enrollments))
+        rating_base = reserve_ids(cursor, Rating, len(ratings))
+        submission_base = reserve_ids(cursor, Submission, len(submissions))
+        comment_base = reserve_ids(cursor, Comment, len(comments))
+
+    for row in payments:
+        row[0] += payment_base + 1
+    for row in enrollments:
+        row[0] += enrollment_base + 1
+        if row[3] is not None:
+            row[3] += payment_base + 1
+    for row in ratings:
+        row[0] += rating_base + 1
+    for row in submissions:
+        row[0] += submission_base + 1
+    for row in comments:
+        row[0] += comment_base + 1
+        if row[1] is not None:
+            row[1] += comment_base + 1
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        written = copy_rows(cursor, Payment, [
+            'id', 'user_id', 'course_id', 'amount', 'currency', 'payment_method', 'status', 'transaction_id', 'paid_at'
+        ], payments)
+        written += copy_rows(cursor, Enrollment, [
+            'id', 'user_id', 'course_id', 'payment_id', 'enrolled_at', 'completed_at', 'progress_pct', 'status'
+        ], enrollments)
+        written += copy_rows(cursor, Rating, [
+            'id', 'user_id', 'course_id', 'rating', 'comment', 'created_at', 'updated_at'
+        ], ratings)
+        written += copy_rows(cursor, Submission, [
+            'id', 'assignment_id', 'user_id', 'submitted_at', 'content', 'score', 'feedback', 'is_graded'
+        ], submissions)
+        written += copy_rows(cursor, Comment, [
+            'id', 'parent_id', 'user_id', 'course_id', 'lesson_id', 'content', 'created_at'
+        ], comments)
+    return written
@@ -0,0 +1,181 @@
+# courses/documents.py
+# Скомпилированные документы курсов (read model). Публичная часть ответа
+# CourseSerializer — курс, преподаватель, категория, модули, уроки, задания,
+# средняя оценка и последние отзывы — сериализуется один раз после изменения
+# курса и хранится в course_documents готовым JSON с номером версии. Страница
+# курса и списки курсов отдают эти байты и добавляют только данные
+# пользователя: пройденные уроки и прогресс по модулям и курсу.
+# Документ годен, пока совпадает состояние дерева курса (course_tree_rows:
+# метки updated_at, число дочерних строк и поля категории); устаревший
+# пересобирается при чтении, а сигналы заранее ставят пересборку в очередь.
+import hashlib
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, transaction
+from django.db.models import Avg, Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from .http_cache import course_tree_rows, course_validators, purge
+from .models import Course, CourseDocument, Enrollment, Rating, Submission
+from .serializers import CourseSerializer
+
+# Версия растёт, только если изменилось содержимое документа; previous —
+# версия до пересборки (CTE видит таблицу до вставки), NULL для нового
+UPSERT_SQL = """
+WITH previous AS (
+    SELECT course_id, version FROM course_documents WHERE course_id = ANY(%s)
+)
+INSERT INTO course_documents AS d (course_id, version, source_state, body, compiled_at)
+SELECT course_id, 1, source_state, body, NOW()
+FROM unnest(%s::bigint[], %s::varchar[], %s::text[]) AS t(course_id, source_state, body)
+ON CONFLICT (course_id) DO UPDATE SET
+    version = d.version + (d.body IS DISTINCT FROM EXCLUDED.body)::int,
+    source_state = EXCLUDED.source_state,
+    body = EXCLUDED.body,
+    compiled_at = EXCLUDED.compiled_at
+RETURNING d.course_id, d.version, (SELECT version FROM previous p WHERE p.course_id = d.course_id)
+"""
+
+ANONYMOUS_CONTEXT = {'request': SimpleNamespace(user=AnonymousUser())}
+
+
+def recent_ratings_prefetch():
+    # Срез в Prefetch Django выполняет через ROW_NUMBER() OVER (PARTITION BY course_id),
+    # поэтому top-N отзывов для всех курсов страницы — один запрос
+    return Prefetch(
+        'ratings',
+        queryset=Rating.objects.select_related('user').order_by('-created_at', '-id')[:settings.COURSE_RECENT_RATINGS],
+        to_attr='recent_ratings'
+    )
+
+
+def course_detail_queryset():
+    # Всё дерево курса (модули, уроки, задания) — фиксированное число запросов
+    # на любое количество курсов
+    return Course.objects.filter(
+        is_published=True
+    ).prefetch_related(
+        'modules__lessons__assignments',
+        recent_ratings_prefetch(),
+        'instructor',
+        'category'
+    ).annotate(
+        average_rating=Avg('ratings__rating')
+    )
+
+
+def course_state(row):
+    return hashlib.md5(repr(row).encode(), usedforsecurity=False).hexdigest()
+
+
+def render_document(course):
+    """Ответ CourseSerializer для анонимного пользователя, байты JSON."""
+    return JSONRenderer().render(CourseSerializer(course, context=ANONYMOUS_CONTEXT).data)
+
+
+def live_documents(course_ids):
+    return {course.id: render_document(course) for course in course_detail_queryset().filter(id__in=course_ids)}
+
+
+def compile_documents(course_ids):
+    """Пересобирает документы курсов; возвращает {id курса: (версия, байты)}.
+
+    Снятые с публикации и удалённые курсы теряют документ. Для изменившихся
+    и удалённых документов сбрасывается Surrogate-Key course-{id}.
+    """
+    course_ids = list(course_ids)
+    # Состояние снимается до сериализации: правка между ними оставит документ
+    # со старым состоянием, и следующее чтение пересоберёт его ещё раз
+    states = {
+        row[0]: course_state(row)
+        for row in course_tree_rows(Course.objects.filter(id__in=course_ids, is_published=True))
+    }
+    bodies = live_documents(states)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM course_documents WHERE course_id = ANY(%s) AND NOT (course_id = ANY(%s)) RETURNING course_id",
+            [course_ids, list(bodies)]
+        )
+        changed = [course_id for course_id, in cursor.fetchall()]
+        documents = {}
+        if bodies:
+            ids = list(bodies)
+            cursor.execute(UPSERT_SQL, [ids, ids, [states[i] for i in ids], [bodies[i].decode() for i in ids]])
+            for course_id, version, previous in cursor.fetchall():
+                documents[course_id] = (version, bodies[course_id])
+                if previous is not None and previous != version:
+                    changed.append(course_id)
+        if changed:
+            purge(*(f'course-{course_id}' for course_id in changed))
+        return documents
+
+
+def course_documents(rows):
+    """{id курса: (версия, байты)} по строкам course_tree_rows.
+
+    Отсутствующие и устаревшие документы пересобираются здесь же.
+    """
+    states = {row[0]: course_state(row) for row in rows}
+    documents = {
+        course_id: (version, body.encode())
+        for course_id, version, state, body in CourseDocument.objects.filter(
+            course_id__in=states
+        ).values_list('course_id', 'version', 'source_state', 'body')
+        if state == states[course_id]
+    }
+    stale = [course_id for course_id in states if course_id not in documents]
+    if stale:
+        documents.update(compile_documents(stale))
+    return documents
+
+
+def document_validators(queryset, is_list):
+    """(валидаторы для ConditionalCatalogMixin, документы курсов).
+
+    Версии документов входят в состояние ETag: пересборка, изменившая
+    документ, меняет ETag, даже если метки дерева курса остались прежними.
+    """
+    last_modified, rows, keys = course_validators(queryset, is_list)
+    documents = course_documents(rows) if rows else {}
+    versions = sorted((course_id, version) for course_id, (version, body) in documents.items())
+    return (last_modified, (rows, versions), keys), documents
+
+
+def user_progress(user_id, lesson_ids, course_ids):
+    """(пройденные уроки, {id курса: progress_pct}) — по одному запросу."""
+    completed = set(
+        Submission.objects.filter(
+            user_id=user_id,
+            assignment__lesson_id__in=lesson_ids,
+            is_graded=True
+        ).values_list('assignment__lesson_id', flat=True)
+    ) if lesson_ids else set()
+    progress = dict(
+        Enrollment.objects.filter(
+            user_id=user_id,
+            course_id__in=course_ids,
+            status='active'
+        ).values_list('course_id', 'progress_pct')
+    )
+    return completed, progress
+
+
+def apply_user_progress(user, documents):
+    """Накладывает на разобранные документы прогресс пользователя — те же
+    значения, что считает CourseSerializer для авторизованного запроса."""
+    lesson_ids = [
+        lesson['id'] for document in documents for module in document['modules'] for lesson in module['lessons']
+    ]
+    completed, progress = user_progress(user.id, lesson_ids, [document['id'] for document in documents])
+    for document in documents:
+        for module in document['modules']:
+            completed_lessons = 0
+            for lesson in module['lessons']:
+                lesson['is_completed'] = lesson['id'] in completed
+                completed_lessons += lesson['is_completed']
+            total_lessons = len(module['lessons'])
+            module['progress_pct'] = round((completed_lessons / total_lessons) * 100) if total_lessons else 0
+        document['progress_pct'] = progress.get(document['id'], 0)
+    return documents
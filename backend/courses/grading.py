@@ -0,0 +1,107 @@
+# courses/grading.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
+
+from .access import invalidate_access
+from .models import Submission
+from .notifications import notify_graded
+
+
+def _lease_duration():
+    return timedelta(seconds=settings.GRADING_LEASE_SECONDS)
+
+
+def claim_submissions(grader, limit):
+    """Выдаёт проверяющему следующую пачку непроверенных решений его курсов.
+
+    Строки блокируются через SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+    параллельные проверяющие никогда не получают одно и то же решение.
+    Свои ещё не истёкшие аренды выдаются повторно с продлением срока.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Submission.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .filter(
+                is_graded=False,
+                assignment__lesson__module__course__instructor=grader,
+            )
+            .filter(
+                Q(lease_expires_at__isnull=True)
+                | Q(lease_expires_at__lt=now)
+                | Q(grader=grader)
+            )
+            .order_by('submitted_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if ids:
+            Submission.objects.filter(id__in=ids).update(
+                grader=grader,
+                lease_expires_at=now + _lease_duration()
+            )
+
+    return Submission.objects.filter(id__in=ids).select_related('assignment').order_by('submitted_at', 'id')
+
+
+def grade_submissions(grader, grades):
+    """Записывает оценки и комментарии одним UPDATE.
+
+    Оцениваются только решения, аренда которых всё ещё принадлежит
+    проверяющему; для остальных возвращается ошибка по каждому id.
+    """
+    now = timezone.now()
+    grades = {item['id']: item for item in grades}
+
+    leased = {}
+    students = {}
+    for submission_id, max_score, user_id in Submission.objects.filter(
+        id__in=grades,
+        grader=grader,
+        is_graded=False,
+        lease_expires_at__gte=now
+    ).values_list('id', 'assignment__max_score', 'user_id'):
+        leased[submission_id] = max_score
+        students[submission_id] = user_id
+
+    errors = {}
+    for submission_id, item in grades.items():
+        if submission_id not in leased:
+            errors[submission_id] = "Решение не закреплено за вами или аренда истекла"
+        elif item['score'] > leased[submission_id]:
+            errors[submission_id] = f"Оценка больше максимальной ({leased[submission_id]})"
+
+    valid_ids = [submission_id for submission_id in grades if submission_id not in errors]
+    graded = 0
+    if valid_ids:
+        with transaction.atomic():
+            # Проверка выше идёт без блокировок: параллельный или повторный запрос
+            # мог уже оценить эти решения. Блокируем ещё не оценённые и дальше
+            # работаем только с ними — ими же ограничены уведомления
+            valid_ids = list(Submission.objects.select_for_update().filter(
+                id__in=valid_ids,
+                grader=grader,
+                is_graded=False
+            ).values_list('id', flat=True))
+            graded = Submission.objects.filter(id__in=valid_ids).update(
+                score=Case(
+                    *[When(id=i, then=Value(grades[i]['score'])) for i in valid_ids],
+                    output_field=models.IntegerField()
+                ),
+                feedback=Case(
+                    *[When(id=i, then=Value(grades[i].get('feedback'))) for i in valid_ids],
+                    output_field=models.TextField()
+                ),
+                is_graded=True,
+                lease_expires_at=None
+            )
+            # Уведомления студентам — в той же транзакции, одним INSERT ... SELECT
+            notify_graded(valid_ids)
+        # UPDATE не шлёт сигналов: оценка открывает следующие уроки
+        invalidate_access(*{students[i] for i in valid_ids})
+
+    return {'graded': graded, 'errors': errors}
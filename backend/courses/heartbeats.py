@@ -0,0 +1,166 @@
+# courses/heartbeats.py
+# Heartbeat'ы просмотра уроков копятся в памяти процесса, по одной записи на
+# (пользователь, урок), и сбрасываются в lesson_progress пачками upsert'ов
+# фоновым потоком. Клиент получает ответ без ожидания записи в базу; при падении
+# процесса теряется не больше HEARTBEAT_FLUSH_INTERVAL секунд прогресса.
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import Enrollment
+
+logger = logging.getLogger(__name__)
+
+# Строки без активной записи на курс (отписался, урок удалён между heartbeat
+# и сбросом) отбрасываются JOIN'ом, а не роняют всю пачку на внешнем ключе
+UPSERT_SQL = """
+INSERT INTO lesson_progress
+    (user_id, lesson_id, enrollment_id, position_sec, max_position_sec, heartbeats, last_seen_at)
+SELECT v.user_id, v.lesson_id, v.enrollment_id, v.position_sec, v.max_position_sec, v.heartbeats, v.last_seen_at
+FROM (VALUES {values}) AS v(user_id, lesson_id, enrollment_id, position_sec, max_position_sec, heartbeats, last_seen_at)
+JOIN enrollments e ON e.id = v.enrollment_id AND e.status = 'active'
+JOIN lessons l ON l.id = v.lesson_id
+ON CONFLICT (user_id, lesson_id) DO UPDATE SET
+    enrollment_id = EXCLUDED.enrollment_id,
+    position_sec = EXCLUDED.position_sec,
+    max_position_sec = GREATEST(lesson_progress.max_position_sec, EXCLUDED.max_position_sec),
+    heartbeats = lesson_progress.heartbeats + EXCLUDED.heartbeats,
+    last_seen_at = GREATEST(lesson_progress.last_seen_at, EXCLUDED.last_seen_at)
+"""
+VALUES_ROW = '(%s::bigint, %s::bigint, %s::bigint, %s::int, %s::int, %s::int, %s::timestamp)'
+
+
+class HeartbeatBuffer:
+    """Буфер heartbeat'ов одного процесса с фоновым сбросом."""
+
+    def __init__(self):
+        # (user_id, lesson_id) -> [enrollment_id, position, max_position, heartbeats, last_seen_at]
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher_pid = None
+        # (user_id, lesson_id) -> (enrollment_id, действительно до)
+        self._enrollments = OrderedDict()
+        self._enrollments_lock = threading.Lock()
+
+    def enrollment_id(self, user_id, lesson_id):
+        """id активной записи на курс урока; проверенные пары кэшируются
+        на HEARTBEAT_ACCESS_TTL, чтобы heartbeat не ходил в базу каждый раз."""
+        key = (user_id, lesson_id)
+        now = time.monotonic()
+        with self._enrollments_lock:
+            cached = self._enrollments.get(key)
+            if cached and cached[1] > now:
+                return cached[0]
+
+        enrollment_id = Enrollment.objects.filter(
+            user_id=user_id,
+            status='active',
+            course__modules__lessons__id=lesson_id
+        ).values_list('id', flat=True).first()
+
+        if enrollment_id is not None:
+            with self._enrollments_lock:
+                self._enrollments.pop(key, None)
+                self._enrollments[key] = (enrollment_id, now + settings.HEARTBEAT_ACCESS_TTL)
+                while len(self._enrollments) > settings.HEARTBEAT_MAX_KEYS:
+                    self._enrollments.popitem(last=False)
+        return enrollment_id
+
+    def add(self, user_id, lesson_id, enrollment_id, position_sec):
+        """Склеивает heartbeat с уже накопленным. False — буфер полон."""
+        self._ensure_flusher()
+        key = (user_id, lesson_id)
+        now = timezone.now()
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                if len(self._pending) >= settings.HEARTBEAT_MAX_KEYS:
+                    # Новые пары не принимаем, пока поток не освободит место
+                    self._wakeup.set()
+                    return False
+                self._pending[key] = [enrollment_id, position_sec, position_sec, 1, now]
+            else:
+                entry[0] = enrollment_id
+                entry[1] = position_sec
+                entry[2] = max(entry[2], position_sec)
+                entry[3] += 1
+                entry[4] = now
+            if len(self._pending) >= settings.HEARTBEAT_FLUSH_BATCH:
+                self._wakeup.set()
+        return True
+
+    def flush(self):
+        """Пишет всё накопленное; при ошибке базы возвращает строки в буфер."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        rows = [
+            (user_id, lesson_id, *entry)
+            for (user_id, lesson_id), entry in pending.items()
+        ]
+        batch = settings.HEARTBEAT_FLUSH_BATCH
+        written = 0
+        try:
+            for start in range(0, len(rows), batch):
+                chunk = rows[start:start + batch]
+                sql = UPSERT_SQL.format(values=', '.join([VALUES_ROW] * len(chunk)))
+                params = [
+                    value
+                    for user_id, lesson_id, enrollment_id, position, max_position, count, seen_at in chunk
+                    for value in (user_id, lesson_id, enrollment_id, position, max_position, count,
+                                  timezone.make_naive(seen_at, dt_timezone.utc))
+                ]
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                written += len(chunk)
+        except Exception:
+            logger.exception("Не удалось сохранить heartbeat'ы, вернём в буфер")
+            self._requeue(rows[written:])
+        return written
+
+    def _requeue(self, rows):
+        with self._lock:
+            for user_id, lesson_id, enrollment_id, position, max_position, count, seen_at in rows:
+                entry = self._pending.get((user_id, lesson_id))
+                if entry is None:
+                    # При переполнении старые строки теряются — буфер не растёт без предела
+                    if len(self._pending) < settings.HEARTBEAT_MAX_KEYS:
+                        self._pending[(user_id, lesson_id)] = [enrollment_id, position, max_position, count, seen_at]
+                else:
+                    # Свежая позиция уже в буфере, добавляем только счётчики
+                    entry[2] = max(entry[2], max_position)
+                    entry[3] += count
+
+    def _ensure_flusher(self):
+        # После fork (gunicorn --preload) поток родителя в воркере не существует
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._pending = {}
+            self._flusher_pid = pid
+            threading.Thread(target=self._run, name='heartbeat-flusher', daemon=True).start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.HEARTBEAT_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+heartbeat_buffer = HeartbeatBuffer()
@@ -0,0 +1,126 @@
+# courses/http_cache.py
+# Условное HTTP-кэширование публичного каталога: ETag/Last-Modified считаются
+# одним лёгким запросом до сериализации, а Surrogate-Key позволяет кэширующему
+# прокси сбрасывать только изменившиеся курсы, преподавателей и категории.
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .jobs import enqueue
+from .models import Assignment, Course, Lesson, Module, Rating, User
+
+
+def purge(*keys):
+    # Без настроенного прокси ничего не ставим в очередь
+    if settings.SURROGATE_PURGE_URL:
+        enqueue('catalog.purge_surrogate_keys', keys=sorted(keys))
+
+
+def _child_stats(queryset, field):
+    # Скалярные подзапросы MAX(updated_at) и COUNT(*) по дочерней таблице курса
+    grouped = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return (
+        Subquery(grouped.annotate(ts=Max('updated_at')).values('ts')),
+        Coalesce(Subquery(grouped.annotate(n=Count('id')).values('n')), 0),
+    )
+
+
+def course_tree_rows(queryset):
+    """По одной строке на курс: id, преподаватель, категория,
+    максимальная метка времени по курсу и его дочерним строкам, их количество
+    и поля категории (у категорий нет updated_at)."""
+    modules_ts, modules_n = _child_stats(Module.all_objects, 'course')
+    lessons_ts, lessons_n = _child_stats(Lesson.all_objects, 'module__course')
+    assignments_ts, assignments_n = _child_stats(Assignment.objects, 'lesson__module__course')
+    ratings_ts, ratings_n = _child_stats(Rating.objects, 'course')
+
+    return list(
+        Course.objects.filter(id__in=queryset.values('id')).annotate(
+            tree_updated_at=Greatest(
+                F('updated_at'), F('instructor__updated_at'),
+                modules_ts, lessons_ts, assignments_ts, ratings_ts
+            ),
+            modules_n=modules_n,
+            lessons_n=lessons_n,
+            assignments_n=assignments_n,
+            ratings_n=ratings_n,
+        ).order_by('id').values_list(
+            'id', 'instructor_id', 'category_id', 'tree_updated_at',
+            'modules_n', 'lessons_n', 'assignments_n', 'ratings_n',
+            'category__name', 'category__slug', 'category__parent_id'
+        )
+    )
+
+
+def course_validators(queryset, is_list):
+    rows = course_tree_rows(queryset)
+    keys = set()
+    for course_id, instructor_id, category_id, *_ in rows:
+        keys.update((f'course-{course_id}', f'instructor-{instructor_id}', f'category-{category_id}'))
+    if is_list:
+        # Списки зависят и от появления новых курсов
+        keys.add('catalog')
+    last_modified = max((row[3] for row in rows if row[3]), default=None)
+    return last_modified, rows, keys
+
+
+def instructor_validators(pk):
+    row = User.objects.filter(id=pk).values_list('id', 'updated_at').first()
+    if row is None:
+        return None
+    return row[1], row, {f'instructor-{pk}'}
+
+
+class ConditionalCatalogMixin:
+    """Для анонимных GET отвечает 304 по If-None-Match/If-Modified-Since,
+    не запуская сериализацию, и проставляет Cache-Control и Surrogate-Key.
+
+    Вьюха реализует get_validators() -> (last_modified, state, keys) или None.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        # Ответ для авторизованных содержит прогресс пользователя — только private
+        if request.user.is_authenticated:
+            response = super().get(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+
+        validators = self.get_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        last_modified, state, keys = validators
+        digest = hashlib.md5(
+            repr((state, request.accepted_renderer.format)).encode(),
+            usedforsecurity=False
+        ).hexdigest()
+        etag = quote_etag(digest)
+        last_modified = timegm(last_modified.utctimetuple()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+
+        response.headers['ETag'] = etag
+        if last_modified:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        response.headers['Surrogate-Key'] = ' '.join(sorted(keys))
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.CATALOG_CACHE_MAX_AGE,
+            s_maxage=settings.CATALOG_CACHE_S_MAXAGE
+        )
+        patch_vary_headers(response, ['Authorization', 'Accept'])
+        return response
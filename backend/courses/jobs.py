@@ -0,0 +1,135 @@
+# courses/jobs.py
+# Фоновые задачи без внешнего брокера: строки в таблице jobs (transactional outbox).
+# Задача ставится в очередь в той же транзакции, что и основная запись,
+# а воркер (manage.py run_jobs) забирает их через FOR UPDATE SKIP LOCKED.
+import logging
+import random
+import traceback
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def job(name):
+    """Регистрирует функцию как обработчик задачи с именем name."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, delay=0, max_attempts=None, **payload):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Если вызывающий код откатится, задача исчезнет вместе с записью.
+    """
+    if name not in _registry:
+        raise KeyError(f"Неизвестная задача: {name}")
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS
+    )
+
+
+def claim_jobs(limit):
+    """Забирает до limit готовых задач; зависшие (locked_until в прошлом) тоже."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(run_at__lte=now)
+            .filter(
+                Q(status=Job.STATUS_PENDING)
+                | Q(status=Job.STATUS_RUNNING, locked_until__lt=now)
+            )
+            .order_by('run_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if ids:
+            Job.objects.filter(id__in=ids).update(
+                status=Job.STATUS_RUNNING,
+                locked_until=now + timedelta(seconds=settings.JOBS_LOCK_TIMEOUT),
+                attempts=F('attempts') + 1
+            )
+    return list(Job.objects.filter(id__in=ids).order_by('run_at', 'id'))
+
+
+def retry_delay(attempts):
+    delay = min(settings.JOBS_RETRY_BASE_DELAY * 2 ** (attempts - 1), settings.JOBS_RETRY_MAX_DELAY)
+    return delay + random.uniform(0, delay / 2)
+
+
+def run_job(job_row):
+    """Выполняет одну задачу; успешные удаляются, упавшие откладываются с backoff."""
+    close_old_connections()
+    try:
+        handler = _registry[job_row.name]
+        handler(**job_row.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Задача %s #%s упала (попытка %s)", job_row.name, job_row.id, job_row.attempts)
+        if job_row.attempts >= job_row.max_attempts:
+            Job.objects.filter(id=job_row.id).update(
+                status=Job.STATUS_FAILED,
+                last_error=error,
+                locked_until=None,
+                finished_at=timezone.now()
+            )
+        else:
+            Job.objects.filter(id=job_row.id).update(
+                status=Job.STATUS_PENDING,
+                last_error=error,
+                locked_until=None,
+                run_at=timezone.now() + timedelta(seconds=retry_delay(job_row.attempts))
+            )
+        return False
+    finally:
+        close_old_connections()
+
+    Job.objects.filter(id=job_row.id).delete()
+    return True
+
+
+def queue_stats():
+    """Глубина очереди по именам задач одним запросом."""
+    now = timezone.now()
+    rows = Job.objects.values('name').annotate(
+        ready=Count('id', filter=Q(status=Job.STATUS_PENDING, run_at__lte=now)),
+        delayed=Count('id', filter=Q(status=Job.STATUS_PENDING, run_at__gt=now)),
+        running=Count('id', filter=Q(status=Job.STATUS_RUNNING)),
+        failed=Count('id', filter=Q(status=Job.STATUS_FAILED)),
+        oldest_ready=Min('run_at', filter=Q(status=Job.STATUS_PENDING, run_at__lte=now)),
+    ).order_by('name')
+
+    by_name = {}
+    totals = {'ready': 0, 'delayed': 0, 'running': 0, 'failed': 0, 'oldest_ready_age_sec': 0}
+    for row in rows:
+        oldest = row['oldest_ready']
+        if oldest and timezone.is_naive(oldest):
+            # Колонки TIMESTAMP без часового пояса, а сессия Django работает в UTC
+            oldest = timezone.make_aware(oldest, dt_timezone.utc)
+        age = (now - oldest).total_seconds() if oldest else 0
+        by_name[row['name']] = {
+            'ready': row['ready'],
+            'delayed': row['delayed'],
+            'running': row['running'],
+            'failed': row['failed'],
+            'oldest_ready_age_sec': round(age, 1),
+        }
+        for key in ('ready', 'delayed', 'running', 'failed'):
+            totals[key] += row[key]
+        totals['oldest_ready_age_sec'] = max(totals['oldest_ready_age_sec'], round(age, 1))
+
+    return {'totals': totals, 'by_name': by_name}
@@ -0,0 +1,77 @@
+# courses/leaderboard.py
+# Рейтинг студентов курса по сумме баллов за проверенные решения. Суммы
+# (course_scores) и гистограмму «балл -> число студентов» (course_score_counts)
+# ведут триггеры при каждой оценке, поэтому чтение не агрегирует submissions:
+# top-N — проход по индексу idx_course_scores_rank, место студента — сумма
+# по строкам гистограммы с баллом выше, а не подсчёт всех студентов курса.
+# Места «олимпийские»: равный балл — равное место, следующее пропускается.
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+
+from .models import CourseScore, CourseScoreCount
+
+
+def score_entry(score, rank):
+    return {
+        'rank': rank,
+        'user_id': score.user_id,
+        'name': f'{score.user.first_name} {score.user.last_name}'.strip(),
+        'total_score': score.total_score,
+        'graded_count': score.graded_count,
+    }
+
+
+def course_leaderboard(course_id, user_id, limit):
+    """{'participants', 'top', 'me'} — me равен None, если у студента нет оценок."""
+    top = list(
+        CourseScore.objects.filter(course_id=course_id)
+        .select_related('user')
+        .order_by('-total_score', 'user_id')[:limit]
+    )
+    mine = next((score for score in top if score.user_id == user_id), None)
+    if mine is None:
+        mine = CourseScore.objects.filter(course_id=course_id, user_id=user_id).select_related('user').first()
+
+    # Число участников и место студента — один запрос по гистограмме
+    aggregates = {'participants': Sum('students')}
+    if mine is not None:
+        aggregates['above'] = Sum('students', filter=Q(total_score__gt=mine.total_score))
+    totals = CourseScoreCount.objects.filter(course_id=course_id).aggregate(**aggregates)
+
+    entries, rank = [], 0
+    for i, score in enumerate(top, 1):
+        # Место первого из группы равных баллов — его позиция в списке
+        if i == 1 or score.total_score != top[i - 2].total_score:
+            rank = i
+        entries.append(score_entry(score, rank))
+    return {
+        'participants': totals['participants'] or 0,
+        'top': entries,
+        'me': score_entry(mine, (totals['above'] or 0) + 1) if mine is not None else None,
+    }
+
+
+@transaction.atomic
+def rebuild_course_scores():
+    """Пересчитывает рейтинг всех курсов по submissions (после загрузки с отключённым триггером)."""
+    with connection.cursor() as cursor:
+        cursor.execute("TRUNCATE course_scores, course_score_counts")
+        # Гистограмма строится одним GROUP BY, построчный триггер тут не нужен
+        cursor.execute("ALTER TABLE course_scores DISABLE TRIGGER refresh_course_score_counts_on_write")
+        cursor.execute("""
+            INSERT INTO course_scores (course_id, user_id, total_score, graded_count)
+            SELECT m.course_id, s.user_id, SUM(COALESCE(s.score, 0)), COUNT(*)
+            FROM submissions s
+            JOIN assignments a ON a.id = s.assignment_id
+            JOIN lessons l ON l.id = a.lesson_id
+            JOIN modules m ON m.id = l.module_id
+            WHERE s.is_graded
+            GROUP BY m.course_id, s.user_id
+        """)
+        rows = cursor.rowcount
+        cursor.execute("""
+            INSERT INTO course_score_counts (course_id, total_score, students)
+            SELECT course_id, total_score, COUNT(*) FROM course_scores GROUP BY course_id, total_score
+        """)
+        cursor.execute("ALTER TABLE course_scores ENABLE TRIGGER refresh_course_score_counts_on_write")
+    return rows
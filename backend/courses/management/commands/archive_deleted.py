@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from courses.models import Comment, Course, Lesson, Module
+
+# Порядок важен: сначала листья, затем родители
+ARCHIVED_MODELS = [Comment, Lesson, Module, Course]
+
+
+def dependents(model):
+    # Таблицы и колонки, ссылающиеся на модель; строку с живыми ссылками не трогаем,
+    # иначе ON DELETE CASCADE унесёт зависимые данные (платежи, решения и т.д.)
+    return [
+        (rel.related_model._meta.db_table, rel.field.column)
+        for rel in model._meta.get_fields(include_hidden=True)
+        if rel.auto_created and not rel.concrete and (rel.one_to_many or rel.one_to_one)
+    ]
+
+
+def archive_batch(model, cutoff, batch_size):
+    table = model._meta.db_table
+    columns = ', '.join(f'"{field.column}"' for field in model._meta.concrete_fields)
+    not_referenced = ''.join(
+        f' AND NOT EXISTS (SELECT 1 FROM "{dep_table}" d WHERE d."{dep_column}" = t.id)'
+        for dep_table, dep_column in dependents(model)
+    )
+    sql = f"""
+        WITH moved AS (
+            DELETE FROM "{table}"
+            WHERE id IN (
+                SELECT t.id FROM "{table}" t
+                WHERE t.is_deleted = true AND t.deleted_at < %s{not_referenced}
+                ORDER BY t.deleted_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING {columns}
+        )
+        INSERT INTO "{table}_archive" ({columns})
+        SELECT {columns} FROM moved
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, [cutoff, batch_size])
+        return cursor.rowcount
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит строки, удалённые (is_deleted) больше N дней назад, в таблицы *_archive. "
+        "Строки, на которые ещё ссылаются другие записи, остаются на месте."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+
+        for model in ARCHIVED_MODELS:
+            total = 0
+            while True:
+                moved = archive_batch(model, cutoff, batch_size)
+                total += moved
+                if moved < batch_size:
+                    break
+            self.stdout.write(f"{model._meta.db_table}: в архив перенесено {total}")
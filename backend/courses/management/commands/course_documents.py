@@ -0,0 +1,105 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.documents import compile_documents, course_state, live_documents
+from courses.http_cache import course_tree_rows
+from courses.models import Course, CourseDocument
+
+
+def first_difference(stored, live, path='$'):
+    """Путь к первому расхождению двух JSON-значений или None."""
+    if isinstance(stored, dict) and isinstance(live, dict):
+        for key in sorted(set(stored) | set(live)):
+            if key not in stored or key not in live:
+                return f'{path}.{key}'
+            found = first_difference(stored[key], live[key], f'{path}.{key}')
+            if found:
+                return found
+        return None
+    if isinstance(stored, list) and isinstance(live, list):
+        if len(stored) != len(live):
+            return f'{path}[] ({len(stored)} != {len(live)})'
+        for i, (a, b) in enumerate(zip(stored, live)):
+            found = first_difference(a, b, f'{path}[{i}]')
+            if found:
+                return found
+        return None
+    return None if stored == live else path
+
+
+class Command(BaseCommand):
+    help = (
+        "Скомпилированные документы курсов: rebuild — пересобрать, check — сравнить "
+        "каждый документ с живой сериализацией CourseSerializer (с --fix — пересобрать расходящиеся)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['rebuild', 'check'])
+        parser.add_argument('--course', type=int, action='append', help="id курса (по умолчанию все опубликованные)")
+        parser.add_argument('--batch-size', type=int, default=settings.COURSE_DOCUMENTS_BATCH)
+        parser.add_argument('--fix', action='store_true', help="check: пересобрать расходящиеся документы")
+
+    def handle(self, *args, **options):
+        if options['course']:
+            course_ids = sorted(options['course'])
+        else:
+            course_ids = list(Course.objects.filter(is_published=True).order_by('id').values_list('id', flat=True))
+            # Документы курсов, снятых с публикации, тоже проверяются и удаляются
+            course_ids = sorted(set(course_ids) | set(CourseDocument.objects.values_list('course_id', flat=True)))
+
+        batch_size = options['batch_size']
+        batches = [course_ids[start:start + batch_size] for start in range(0, len(course_ids), batch_size)]
+        if options['action'] == 'rebuild':
+            compiled = 0
+            for batch in batches:
+                compiled += len(compile_documents(batch))
+            self.stdout.write(self.style.SUCCESS(f"Собрано документов: {compiled}"))
+            return
+
+        problems = {'missing': [], 'stale': [], 'mismatch': [], 'orphan': []}
+        for batch in batches:
+            for kind, course_id, detail in self.check_batch(batch):
+                problems[kind].append(course_id)
+                if kind in ('mismatch', 'orphan'):
+                    self.stdout.write(f"{kind}: курс {course_id} — {detail}")
+            if options['fix']:
+                broken = [course_id for ids in problems.values() for course_id in ids if course_id in batch]
+                if broken:
+                    compile_documents(broken)
+
+        summary = ', '.join(f'{kind} {len(ids)}' for kind, ids in problems.items())
+        self.stdout.write(f"Проверено курсов: {len(course_ids)}; {summary}")
+        # Отсутствующий или устаревший документ соберётся при чтении; mismatch —
+        # документ считается свежим, но расходится с базой: отдаётся неверный ответ
+        if problems['mismatch'] and not options['fix']:
+            raise CommandError(f"Документов расходится с базой: {len(problems['mismatch'])}")
+
+    def check_batch(self, course_ids):
+        states = {
+            row[0]: course_state(row)
+            for row in course_tree_rows(Course.objects.filter(id__in=course_ids, is_published=True))
+        }
+        live = live_documents(states)
+        stored = {
+            course_id: (state, body)
+            for course_id, state, body in CourseDocument.objects.filter(
+                course_id__in=course_ids
+            ).values_list('course_id', 'source_state', 'body')
+        }
+        for course_id in course_ids:
+            if course_id not in live:
+                if course_id in stored:
+                    yield 'orphan', course_id, "курс не опубликован"
+                continue
+            if course_id not in stored:
+                yield 'missing', course_id, None
+                continue
+            state, body = stored[course_id]
+            if state != states[course_id]:
+                yield 'stale', course_id, None
+                continue
+            document, expected = json.loads(body), json.loads(live[course_id])
+            if document != expected:
+                yield 'mismatch', course_id, first_difference(document, expected)
@@ -0,0 +1,150 @@
+import multiprocessing
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from courses import dataset
+from courses.catalog import rebuild_rating_stats
+from courses.leaderboard import rebuild_course_scores
+from courses.models import (
+    Assignment, Category, Comment, Course, CourseRatingStats, CourseScore, CourseScoreCount, Enrollment,
+    Lesson, Module, Payment, Rating, Submission, User
+)
+from courses.partitioning import PARTITIONED_TABLES, ensure_partitions, is_partitioned
+
+# План наследуется процессами пула через fork и не сериализуется на каждую задачу
+_plan = None
+_password_hash = None
+# (Condition, Value): номер куска, чья очередь резервировать id
+_turn = None
+
+
+@contextmanager
+def _reservation_turn(chunk):
+    condition, turn = _turn
+    with condition:
+        # Куски раздаются пулу по порядку, поэтому предыдущие уже кем-то взяты
+        condition.wait_for(lambda: turn.value == chunk)
+        try:
+            yield
+        finally:
+            turn.value += 1
+            condition.notify_all()
+
+
+def _run(task):
+    kind, start, end = task
+    started = time.perf_counter()
+    if kind == 'users':
+        written = dataset.write_users(_plan, _password_hash, start, end)
+    elif kind == 'courses':
+        written = dataset.write_courses(_plan, start, end)
+    else:
+        written = dataset.write_activity(_plan, start, end, _reservation_turn)
+    return kind, written, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует детерминированный синтетический датасет (пользователи, курсы, модули, уроки, "
+        "задания, записи, платежи, оценки, решения, комментарии) со скошенными распределениями. "
+        "Пишет через COPY из нескольких процессов; дописывает к существующим данным."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--instructors', type=int, help="По умолчанию — курсов / 5")
+        parser.add_argument('--courses', type=int, default=2_000)
+        parser.add_argument('--categories', type=int, default=40)
+        parser.add_argument('--max-enrollments', type=int, default=40,
+                            help="Потолок записей на одного пользователя (хвост распределения Парето)")
+        parser.add_argument('--days', type=int, default=730, help="Глубина истории в днях")
+        parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(),
+                            help="Последний день истории (YYYY-MM-DD); фиксируйте для воспроизводимости")
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+        parser.add_argument('--chunk-size', type=int, default=20_000,
+                            help="Пользователей или курсов в одной задаче")
+        parser.add_argument('--password', default='password', help="Пароль всех сгенерированных пользователей")
+
+    def handle(self, *args, **options):
+        global _plan, _password_hash, _turn
+        instructors = options['instructors'] or max(1, options['courses'] // 5)
+        if options['categories'] < 5:
+            raise CommandError("Нужно хотя бы 5 категорий")
+        if instructors >= options['users']:
+            raise CommandError("Преподавателей должно быть меньше, чем пользователей")
+
+        end = datetime.combine(options['end_date'], datetime.min.time()) + timedelta(days=1)
+        _plan = dataset.DatasetPlan(
+            seed=options['seed'],
+            users=options['users'],
+            courses=options['courses'],
+            categories=options['categories'],
+            instructors=instructors,
+            end=end,
+            days=options['days'],
+            max_enrollments=options['max_enrollments'],
+            chunk_size=options['chunk_size'],
+        )
+        # Один хеш на всех: PBKDF2 на миллион пользователей занял бы часы
+        _password_hash = make_password(options['password'])
+
+        started = time.perf_counter()
+        shape = _plan.layout()
+        self.ensure_partitions(end - timedelta(days=options['days']))
+        written = {'categories': dataset.write_categories(_plan)}
+
+        context = multiprocessing.get_context('fork')
+        _turn = (context.Condition(), context.Value('i', 0, lock=False))
+        with dataset.suspended_triggers() as suspended:
+            if suspended:
+                self.stdout.write(f"На время загрузки отключены триггеры: {', '.join(suspended)}")
+            # Процессы пула открывают свои соединения; унаследованный сокет родителя им не достаётся
+            connections.close_all()
+            with context.Pool(options['workers']) as pool:
+                self.run_phases(pool, written)
+
+        self.stdout.write(f"Сводка оценок: {rebuild_rating_stats()} курсов")
+        self.stdout.write(f"Рейтинг студентов: {rebuild_course_scores()} строк")
+
+        self.stdout.write("ANALYZE...")
+        with connection.cursor() as cursor:
+            for model in (User, Category, Course, Module, Lesson, Assignment,
+                          Payment, Enrollment, Rating, CourseRatingStats, Submission, Comment,
+                          CourseScore, CourseScoreCount):
+                cursor.execute(f'ANALYZE "{model._meta.db_table}"')
+
+        total = sum(written.values())
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: {total} строк за {elapsed:.1f} с "
+            f"(модулей {shape['modules']}, уроков {shape['lessons']}, заданий {shape['assignments']})"
+        ))
+
+    def run_phases(self, pool, written):
+        # Фазы идут по порядку: активность ссылается на пользователей и курсы
+        for phase, total in (('users', _plan.users), ('courses', _plan.courses), ('activity', _plan.users)):
+            phase_started = time.perf_counter()
+            tasks = [(phase, start, end_) for start, end_ in _plan.chunks(total)]
+            rows = 0
+            for done, (_, count, _) in enumerate(pool.imap_unordered(_run, tasks), 1):
+                rows += count
+                self.stdout.write(f"\r{phase}: {done}/{len(tasks)} задач, строк {rows}", ending='')
+                self.stdout.flush()
+            elapsed = time.perf_counter() - phase_started
+            self.stdout.write(f"\r{phase}: строк {rows} за {elapsed:.1f} с ({rows / max(elapsed, 1e-6):,.0f} строк/с)")
+            written[phase] = rows
+
+    def ensure_partitions(self, first_day):
+        # Исторические даты должны попасть в помесячные секции, а не в DEFAULT
+        with connection.cursor() as cursor:
+            tables = [table for table in PARTITIONED_TABLES if is_partitioned(cursor, table)]
+        for table in tables:
+            created = ensure_partitions(table, first_month=first_day)
+            if created:
+                self.stdout.write(f"{table}: создано секций {len(created)}")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from courses.certificates import issue_certificates
+
+
+class Command(BaseCommand):
+    help = "Выпускает сертификаты для завершённых записей на курсы, у которых их ещё нет"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=4, help="Процессов для рендеринга документов")
+
+    def handle(self, *args, **options):
+        issued = issue_certificates(
+            batch_size=options['batch_size'],
+            workers=options['workers']
+        )
+        self.stdout.write(self.style.SUCCESS(f"Выпущено сертификатов: {issued}"))
@@ -0,0 +1,147 @@
+import json
+import secrets
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import User
+
+POOL_EMAIL = 'loadtest-{}@example.com'
+
+
+def timed_request(url, data=None):
+    body = json.dumps(data).encode() if data is not None else None
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    except urllib.error.URLError:
+        status = None
+    return status, (time.perf_counter() - started) * 1000
+
+
+def percentiles(samples):
+    if not samples:
+        return {'p50': 0, 'p95': 0, 'p99': 0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+    return {'p50': round(statistics.median(ordered), 1), 'p95': round(pick(0.95), 1), 'p99': round(pick(0.99), 1)}
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест: замеряет задержку каталога до и во время флуда auth/login/. "
+        "Флуд идёт по существующим email с неверным паролем, поэтому каждый "
+        "пропущенный throttle'ом запрос считает PBKDF2. Запускается против "
+        "работающего сервера (runserver/gunicorn) с той же базой."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000/api/v1')
+        parser.add_argument('--duration', type=float, default=10, help="Длительность каждой фазы (сек)")
+        parser.add_argument('--flood-threads', type=int, default=32)
+        parser.add_argument('--catalog-threads', type=int, default=4)
+        parser.add_argument('--users', type=int, default=20,
+                            help="Сколько пользователей создать для флуда (удаляются после теста)")
+        parser.add_argument('--email', action='append',
+                            help="Флудить по email существующего пользователя вместо созданных")
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        duration = options['duration']
+
+        if options['email']:
+            emails, created = options['email'], []
+        else:
+            if options['users'] < 1:
+                raise CommandError("--users должно быть больше нуля")
+            emails = created = self.create_pool(options['users'])
+        try:
+            report = self.run(base_url, duration, options, emails)
+        finally:
+            if created:
+                User.objects.filter(email__in=created).delete()
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def create_pool(self, count):
+        # Один хеш на всех: создание пула не должно само грузить сервер PBKDF2
+        password_hash = make_password(secrets.token_urlsafe(16))
+        emails = [POOL_EMAIL.format(i) for i in range(count)]
+        User.objects.bulk_create(
+            [User(email=email, password_hash=password_hash, first_name='Load', last_name='Test', phone='')
+             for email in emails],
+            ignore_conflicts=True,
+        )
+        return emails
+
+    def run(self, base_url, duration, options, emails):
+        baseline = self.measure_catalog(base_url, duration, options['catalog_threads'])
+
+        stop = threading.Event()
+        flood_results = []
+        flood_lock = threading.Lock()
+
+        def flood(worker):
+            n = worker
+            while not stop.is_set():
+                result = timed_request(f'{base_url}/auth/login/', {
+                    'email': emails[n % len(emails)],
+                    'password': 'wrong-password',
+                })
+                with flood_lock:
+                    flood_results.append(result)
+                n += 1
+
+        with ThreadPoolExecutor(max_workers=options['flood_threads']) as pool:
+            for worker in range(options['flood_threads']):
+                pool.submit(flood, worker)
+            try:
+                under_flood = self.measure_catalog(base_url, duration, options['catalog_threads'])
+            finally:
+                stop.set()
+
+        # 429 отсекается до сериализатора, остальные ответы прошли проверку пароля
+        statuses = Counter(status for status, _ in flood_results)
+        throttled = [elapsed for status, elapsed in flood_results if status == 429]
+        hashed = [elapsed for status, elapsed in flood_results if status not in (429, None)]
+        return {
+            'catalog_baseline_ms': baseline,
+            'catalog_under_login_flood_ms': under_flood,
+            'login_users': len(emails),
+            'login_requests': len(flood_results),
+            'login_statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+            'login_throttled_share': round(len(throttled) / len(flood_results), 3) if flood_results else 0,
+            'login_checked_ms': dict(percentiles(hashed), requests=len(hashed)),
+            'login_throttled_ms': dict(percentiles(throttled), requests=len(throttled)),
+        }
+
+    def measure_catalog(self, base_url, duration, threads):
+        samples = []
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def worker():
+            while time.monotonic() < deadline:
+                status, elapsed = timed_request(f'{base_url}/courses/')
+                if status == 200:
+                    with lock:
+                        samples.append(elapsed)
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for _ in range(threads):
+                pool.submit(worker)
+
+        result = percentiles(samples)
+        result['requests'] = len(samples)
+        return result
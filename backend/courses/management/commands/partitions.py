@@ -0,0 +1,100 @@
+import json
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from courses.models import Payment, Submission
+from courses.partitioning import (
+    PARTITIONED_TABLES, add_months, convert_table, detach_partitions,
+    ensure_partitions, is_partitioned, month_start
+)
+
+MODELS = {'payments': Payment, 'submissions': Submission}
+
+
+def plan_relations(plan, found=None):
+    """Имена таблиц-секций, которые план реально читает, и число отброшенных подпланов."""
+    if found is None:
+        found = {'relations': [], 'subplans_removed': 0}
+    if 'Relation Name' in plan:
+        found['relations'].append(plan['Relation Name'])
+    found['subplans_removed'] += plan.get('Subplans Removed', 0)
+    for child in plan.get('Plans', []):
+        plan_relations(child, found)
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        "Помесячные секции payments/submissions: convert — перевести обычную таблицу "
+        "в секционированную, ensure — создать будущие секции (запускать раз в месяц), "
+        "detach — отсоединить старые (секции submissions — только пустые: по решениям "
+        "открываются уроки и считаются прогресс и лидерборд), explain — показать отсечение секций на запросах по дате."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['convert', 'ensure', 'detach', 'explain'])
+        parser.add_argument('--table', action='append', choices=list(PARTITIONED_TABLES),
+                            help="Таблица (по умолчанию обе)")
+        parser.add_argument('--months-ahead', type=int, default=settings.PARTITION_MONTHS_AHEAD,
+                            help="На сколько месяцев вперёд создавать секции")
+        parser.add_argument('--older-than', type=int,
+                            help="detach: отсоединять секции старше N месяцев; "
+                                 "секции submissions с решениями пропускаются")
+        parser.add_argument('--drop', action='store_true',
+                            help="detach: удалить секции, а не переносить в архивную схему")
+
+    def handle(self, *args, **options):
+        tables = options['table'] or list(PARTITIONED_TABLES)
+        action = options['action']
+
+        if action != 'convert':
+            with connection.cursor() as cursor:
+                plain = [table for table in tables if not is_partitioned(cursor, table)]
+            if plain:
+                raise CommandError(f"Таблицы не секционированы, сначала convert: {', '.join(plain)}")
+
+        for table in tables:
+            if action == 'convert':
+                converted = convert_table(table, options['months_ahead'])
+                self.stdout.write(f"{table}: {'переведена на секции' if converted else 'уже секционирована'}")
+            elif action == 'ensure':
+                created = ensure_partitions(table, options['months_ahead'])
+                self.stdout.write(f"{table}: создано секций {len(created)} {' '.join(created)}")
+            elif action == 'detach':
+                if options['older_than'] is None:
+                    raise CommandError("Для detach нужен --older-than")
+                detached, skipped = detach_partitions(table, options['older_than'], options['drop'])
+                verb = 'удалено' if options['drop'] else f"перенесено в {settings.PARTITION_ARCHIVE_SCHEMA}"
+                self.stdout.write(f"{table}: {verb} {len(detached)} {' '.join(detached)}")
+                if skipped:
+                    self.stdout.write(f"{table}: пропущены (есть решения, их читают доступ к урокам, прогресс и лидерборд) {' '.join(skipped)}")
+            else:
+                self.stdout.write(json.dumps(self.explain(table), ensure_ascii=False, indent=2))
+
+    def explain(self, table):
+        # Тот же ORM-запрос за последний месяц и без условия на дату
+        column = PARTITIONED_TABLES[table]
+        model = MODELS[table]
+        month = add_months(month_start(date.today()), -1)
+        # Колонки TIMESTAMP без зоны хранят UTC — границы месяца тоже в UTC
+        bounds = {
+            f'{column}__gte': timezone.make_aware(datetime.combine(month, datetime.min.time()), dt_timezone.utc),
+            f'{column}__lt': timezone.make_aware(datetime.combine(add_months(month, 1), datetime.min.time()), dt_timezone.utc),
+        }
+        result = {'table': table, 'month': f'{month:%Y-%m}'}
+        for label, queryset in (
+            ('bounded', model.objects.filter(**bounds)),
+            ('unbounded', model.objects.all()),
+        ):
+            plan = json.loads(queryset.explain(format='json', analyze=True))[0]
+            found = plan_relations(plan['Plan'])
+            result[label] = {
+                'partitions_scanned': sorted(set(found['relations'])),
+                'subplans_removed': found['subplans_removed'],
+                'execution_ms': plan['Execution Time'],
+            }
+        return result
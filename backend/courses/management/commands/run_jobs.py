@@ -0,0 +1,72 @@
+import json
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from courses.jobs import claim_jobs, queue_stats, run_job
+
+
+class Command(BaseCommand):
+    help = "Воркер фоновых задач: забирает задачи из таблицы jobs и выполняет их"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_CONCURRENCY,
+                            help="Сколько задач выполняется одновременно")
+        parser.add_argument('--poll-interval', type=float, default=settings.JOBS_POLL_INTERVAL,
+                            help="Пауза (сек), когда очередь пуста")
+        parser.add_argument('--once', action='store_true',
+                            help="Выполнить всё готовое и завершиться")
+        parser.add_argument('--stats', action='store_true',
+                            help="Только вывести глубину очереди")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(queue_stats(), ensure_ascii=False, indent=2))
+            return
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        concurrency = options['concurrency']
+        done = failed = 0
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while not self.stopping:
+                free = concurrency - len(in_flight)
+                jobs = claim_jobs(free) if free else []
+                for job_row in jobs:
+                    in_flight.add(pool.submit(run_job, job_row))
+
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                # Все слоты заняты — ждём освобождения; иначе периодически опрашиваем очередь
+                finished, in_flight = wait(
+                    in_flight,
+                    timeout=None if len(in_flight) >= concurrency else options['poll_interval'],
+                    return_when=FIRST_COMPLETED
+                )
+                for future in finished:
+                    if future.result():
+                        done += 1
+                    else:
+                        failed += 1
+
+            # Дожидаемся уже начатых задач перед выходом
+            for future in in_flight:
+                if future.result():
+                    done += 1
+                else:
+                    failed += 1
+
+        self.stdout.write(f"Выполнено: {done}, с ошибкой: {failed}")
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,118 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Выполняется в чистом интерпретаторе: иначе модули уже импортированы этим процессом
+PROBE = """
+import json, time
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+app_done = time.perf_counter()
+from courses.warmup import warmup
+timings = warmup()
+done = time.perf_counter()
+print(json.dumps({
+    'setup_ms': round((setup_done - started) * 1000, 1),
+    'application_ms': round((app_done - setup_done) * 1000, 1),
+    'warmup_ms': round((done - app_done) * 1000, 1),
+    'warmup_phases_ms': {name: ms for name, (ms, _) in timings.items()},
+}))
+"""
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(stderr):
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            # Вложенность — по два пробела на уровень после одного разделителя
+            modules.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        "Профиль холодного старта: время импортов (python -X importtime) по пакетам, "
+        "django.setup(), загрузки WSGI-приложения и фаз прогрева. "
+        "Сохраните --json от релиза и сравнивайте через --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help="Сколько самых тяжёлых импортов показать")
+        parser.add_argument('--json', action='store_true', help="Вывести отчёт в JSON")
+        parser.add_argument('--compare', help="JSON-отчёт предыдущего релиза для сравнения")
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings')},
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Профилирование упало:\n{result.stderr[-2000:]}")
+
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+        by_package = defaultdict(int)
+        for name, self_us, _, _ in modules:
+            by_package[name.split('.')[0]] += self_us
+
+        report['imports_ms'] = round(sum(self_us for _, self_us, _, _ in modules) / 1000, 1)
+        report['modules'] = len(modules)
+        report['packages_ms'] = {
+            package: round(us / 1000, 1)
+            for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]
+        }
+        # Верхний уровень импортов: cumulative уже включает вложенные модули
+        top_level = sorted((m for m in modules if m[3] == 0), key=lambda m: -m[2])
+        report['top_imports_ms'] = {
+            name: round(cumulative_us / 1000, 1)
+            for name, _, cumulative_us, _ in top_level[:options['top']]
+        }
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                report['delta_ms'] = self.compare(json.load(f), report)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        self.print_report(report)
+
+    def compare(self, previous, current):
+        delta = {}
+        for key in ('setup_ms', 'application_ms', 'warmup_ms', 'imports_ms'):
+            delta[key] = round(current[key] - previous.get(key, 0), 1)
+        for package, ms in current['packages_ms'].items():
+            delta[f'package:{package}'] = round(ms - previous.get('packages_ms', {}).get(package, 0), 1)
+        return delta
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"django.setup(): {report['setup_ms']} мс, WSGI-приложение: {report['application_ms']} мс, "
+            f"прогрев: {report['warmup_ms']} мс {report['warmup_phases_ms']}"
+        )
+        self.stdout.write(f"Импорты: {report['imports_ms']} мс, модулей {report['modules']}")
+        self.stdout.write("По пакетам (собственное время):")
+        for package, ms in report['packages_ms'].items():
+            self.stdout.write(f"  {ms:>8} мс  {package}")
+        self.stdout.write("Самые тяжёлые импорты верхнего уровня (с вложенными):")
+        for name, ms in report['top_imports_ms'].items():
+            self.stdout.write(f"  {ms:>8} мс  {name}")
+        for key, ms in report.get('delta_ms', {}).items():
+            self.stdout.write(f"  Δ {key}: {ms:+} мс")
@@ -1,6 +1,14 @@
 # courses/models.py
+from django.contrib.auth.hashers import make_password, check_password
 from django.db import models
 
+
+class SoftDeleteManager(models.Manager):
+    # Менеджер по умолчанию: удалённые (is_deleted=True) строки не видны
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
 class User(models.Model):
     email = models.EmailField(unique=True)
     password_hash = models.CharField(max_length=255)
@@ -9,6 +17,8 @@ class User(models.Model):
     phone = models.CharField(max_length=20)
     avatar_url = models.URLField(max_length=500, null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    # Сверяется с claim ver в JWT: увеличение отзывает все выданные токены
+    token_version = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -23,11 +33,37 @@ class User(models.Model):
         if self.pk is None or 'password_hash' in kwargs.get('update_fields', []):
             if not self.password_hash.startswith('pbkdf2_'):  # если пароль не захеширован
                 self.set_password(self.password_hash)
+                if self.pk is not None:
+                    # Смена пароля отзывает выданные токены
+                    self.token_version += 1
+                    kwargs['update_fields'] = [*kwargs['update_fields'], 'token_version']
         super().save(*args, **kwargs)
 
+    def __str__(self):
+        return self.email
+
     class Meta:
         db_table = 'users'
 
+class TokenUser(User):
+    """Пользователь запроса из проверенного JWT (courses/authentication.py).
+
+    id и email берутся из claims, остальные поля отложены: первое обращение
+    к любому из них читает их все одним запросом.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    roles = ()
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred.intersection(fields):
+            fields = deferred | set(fields)
+        super().refresh_from_db(using=using, fields=fields)
+
 class Role(models.Model):
     id = models.SmallIntegerField(primary_key=True)
     name = models.CharField(max_length=50, unique=True)
@@ -51,6 +87,9 @@ class Category(models.Model):
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, db_column='parent_id')
     date_create = models.DateTimeField(auto_now_add=True)
 
+    def __str__(self):
+        return self.name
+
     class Meta:
         db_table = 'categories'
 
@@ -64,38 +103,63 @@ class Course(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     is_published = models.BooleanField(default=True)
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
     thumbnail_url = models.URLField(max_length=500, null=True, blank=True)
     duration_hours = models.IntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
+    def __str__(self):
+        return self.title
+
     class Meta:
         db_table = 'courses'
 
 class Module(models.Model):
-    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column='course_id')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column='course_id', related_name='modules')
     title = models.CharField(max_length=255)
     description = models.TextField(null=True, blank=True)
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
     order_num = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
+    def __str__(self):
+        return self.title
 
     class Meta:
         db_table = 'modules'
         unique_together = (('course', 'order_num'),)
+        ordering = ['order_num']
 
 class Lesson(models.Model):
-    module = models.ForeignKey(Module, on_delete=models.CASCADE, db_column='module_id')
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, db_column='module_id', related_name='lessons')
     title = models.CharField(max_length=255)
     content = models.TextField(null=True, blank=True)
     video_url = models.URLField(max_length=500, null=True, blank=True)
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
     order_num = models.IntegerField(default=0)
     is_locked = models.BooleanField(default=False)
     duration_min = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
+    def __str__(self):
+        return self.title
 
     class Meta:
         db_table = 'lessons'
         unique_together = (('module', 'order_num'),)
+        ordering = ['order_num']
 
 class Payment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, db_column='user_id')
@@ -112,7 +176,7 @@ class Payment(models.Model):
 
 class Enrollment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, db_column='user_id')
-    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column='course_id')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column='course_id', related_name='enrollments')
     payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, db_column='payment_id')
     enrolled_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
@@ -123,24 +187,55 @@ class Enrollment(models.Model):
         db_table = 'enrollments'
         unique_together = (('user', 'course'),)
 
+class LessonProgress(models.Model):
+    # Строки пишет только courses.heartbeats пачками upsert'ов
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_column='user_id')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, db_column='lesson_id')
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, db_column='enrollment_id')
+    position_sec = models.IntegerField(default=0)
+    max_position_sec = models.IntegerField(default=0)
+    heartbeats = models.IntegerField(default=0)
+    last_seen_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'lesson_progress'
+        unique_together = (('user', 'lesson'),)
+
 class Rating(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, db_column='user_id')
-    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column='course_id')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column='course_id', related_name='ratings')
     rating = models.SmallIntegerField()
     comment = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'ratings'
         unique_together = (('user', 'course'),)
 
+class CourseRatingStats(models.Model):
+    # Строки ведёт триггер на ratings; rating_avg — вычисляемый столбец в базе
+    course = models.OneToOneField(
+        Course, on_delete=models.CASCADE, primary_key=True, db_column='course_id', related_name='rating_stats'
+    )
+    ratings_count = models.IntegerField(default=0)
+    ratings_sum = models.IntegerField(default=0)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, null=True, editable=False)
+
+    class Meta:
+        db_table = 'course_rating_stats'
+
 class Assignment(models.Model):
-    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, db_column='lesson_id')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, db_column='lesson_id', related_name='assignments')
     title = models.CharField(max_length=255)
     description = models.TextField(null=True, blank=True)
     due_date = models.DateTimeField(null=True, blank=True)
     max_score = models.IntegerField()
     is_required = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.title
 
     class Meta:
         db_table = 'assignments'
@@ -154,11 +249,50 @@ class Submission(models.Model):
     score = models.IntegerField(null=True, blank=True)
     feedback = models.TextField(null=True, blank=True)
     is_graded = models.BooleanField(default=False)
+    # Аренда решения проверяющим: пока lease_expires_at в будущем, другие его не получат
+    grader = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_column='grader_id', related_name='+')
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'submissions'
         unique_together = (('assignment', 'user'),)
 
+class CourseScore(models.Model):
+    # Строки ведёт триггер на submissions: сумма баллов за проверенные решения
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column='course_id', related_name='scores')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_column='user_id')
+    total_score = models.IntegerField(default=0)
+    graded_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'course_scores'
+        unique_together = (('course', 'user'),)
+
+class CourseScoreCount(models.Model):
+    # Число студентов курса с данным баллом; ведёт триггер на course_scores
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column='course_id')
+    total_score = models.IntegerField()
+    students = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'course_score_counts'
+        unique_together = (('course', 'total_score'),)
+
+class CourseDocument(models.Model):
+    # Скомпилированный ответ страницы курса (courses/documents.py)
+    course = models.OneToOneField(
+        Course, on_delete=models.CASCADE, primary_key=True, db_column='course_id', related_name='document'
+    )
+    version = models.IntegerField(default=1)
+    # md5 строки course_tree_rows, по которой собран документ
+    source_state = models.CharField(max_length=32)
+    body = models.TextField()
+    compiled_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'course_documents'
+
 class Certificate(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, db_column='user_id')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, db_column='course_id')
@@ -178,6 +312,47 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        db_table = 'comments'
+
+class Notification(models.Model):
+    KIND_LESSON_PUBLISHED = 'lesson_published'
+    KIND_ASSIGNMENT_PUBLISHED = 'assignment_published'
+    KIND_SUBMISSION_GRADED = 'submission_graded'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_column='user_id')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, blank=True, db_column='course_id')
+    kind = models.CharField(max_length=30)
+    # id урока, задания или решения — в зависимости от kind
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'notifications'
+        unique_together = (('user', 'kind', 'object_id'),)
+
+class Job(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_FAILED = 'failed'
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_at = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
-        db_table = 'comments'
\ No newline at end of file
+        db_table = 'jobs'
@@ -0,0 +1,107 @@
+# courses/notifications.py
+# Уведомления в приложении: новый урок или задание на курсе, проверенное
+# решение. Рассылка по курсу не создаёт строки по одной: фоновая задача
+# notifications.fan_out вставляет их пачками INSERT ... SELECT из активных
+# записей на курс (NOTIFICATIONS_FANOUT_CHUNK строк на транзакцию), продолжение
+# ставится в очередь в той же транзакции, что и пачка. Уникальность
+# (user_id, kind, object_id) и ON CONFLICT DO NOTHING делают повтор задачи
+# безопасным. Число непрочитанных кэшируется по пользователю и сбрасывается
+# после коммита изменений.
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import Notification
+
+FAN_OUT_SQL = """
+WITH chunk AS (
+    SELECT id, user_id FROM enrollments
+    WHERE course_id = %(course_id)s AND status = 'active' AND id > %(after)s
+    ORDER BY id
+    LIMIT %(limit)s
+), inserted AS (
+    INSERT INTO notifications (user_id, course_id, kind, object_id, title)
+    SELECT user_id, %(course_id)s, %(kind)s, %(object_id)s, %(title)s FROM chunk
+    ON CONFLICT (user_id, kind, object_id) DO NOTHING
+    RETURNING user_id
+)
+SELECT (SELECT MAX(id) FROM chunk), (SELECT COUNT(*) FROM chunk), ARRAY(SELECT user_id FROM inserted)
+"""
+
+GRADED_SQL = """
+INSERT INTO notifications (user_id, course_id, kind, object_id, title)
+SELECT s.user_id, m.course_id, 'submission_graded', s.id, a.title
+FROM submissions s
+JOIN assignments a ON a.id = s.assignment_id
+JOIN lessons l ON l.id = a.lesson_id
+JOIN modules m ON m.id = l.module_id
+WHERE s.id = ANY(%s) AND s.is_graded
+ON CONFLICT (user_id, kind, object_id) DO NOTHING
+RETURNING user_id
+"""
+
+
+def unread_cache_key(user_id):
+    return f'notifications-unread:{user_id}'
+
+
+def unread_count(user_id):
+    cache = caches[settings.NOTIFICATIONS_CACHE]
+    count = cache.get(unread_cache_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, read_at__isnull=True).count()
+        cache.set(unread_cache_key(user_id), count, settings.NOTIFICATIONS_UNREAD_TIMEOUT)
+    return count
+
+
+def invalidate_unread(user_ids):
+    # После коммита: иначе параллельный запрос закэширует старое число
+    keys = [unread_cache_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: caches[settings.NOTIFICATIONS_CACHE].delete_many(keys))
+
+
+def notify_course(kind, course_id, object_id, title):
+    """Ставит рассылку по курсу в очередь в текущей транзакции."""
+    enqueue('notifications.fan_out', kind=kind, course_id=course_id, object_id=object_id, title=title[:255])
+
+
+def fan_out_chunk(kind, course_id, object_id, title, after=0):
+    """Одна пачка рассылки; возвращает (id последней записи или None,
+    сколько записей в пачке, сколько уведомлений вставлено)."""
+    with connection.cursor() as cursor:
+        cursor.execute(FAN_OUT_SQL, {
+            'course_id': course_id,
+            'kind': kind,
+            'object_id': object_id,
+            'title': title,
+            'after': after,
+            'limit': settings.NOTIFICATIONS_FANOUT_CHUNK,
+        })
+        last_id, chunk_size, user_ids = cursor.fetchone()
+    invalidate_unread(user_ids)
+    return last_id, chunk_size, len(user_ids)
+
+
+def notify_graded(submission_ids):
+    """Уведомления о проверке решений — один INSERT на всю пачку оценок."""
+    if not submission_ids:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(GRADED_SQL, [list(submission_ids)])
+        user_ids = [row[0] for row in cursor.fetchall()]
+    invalidate_unread(user_ids)
+    return len(user_ids)
+
+
+def mark_read(user_id, ids=None):
+    """Отмечает прочитанными уведомления ids (или все); возвращает их число."""
+    notifications = Notification.objects.filter(user_id=user_id, read_at__isnull=True)
+    if ids is not None:
+        notifications = notifications.filter(id__in=ids)
+    marked = notifications.update(read_at=timezone.now())
+    if marked:
+        invalidate_unread([user_id])
+    return marked
@@ -0,0 +1,279 @@
+# courses/partitioning.py
+# Помесячное декларативное секционирование payments (paid_at) и submissions
+# (submitted_at). Модели не меняются: ORM работает с родительской таблицей,
+# а PostgreSQL отбрасывает лишние секции по условию на дату.
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+
+PARTITIONED_TABLES = {
+    'payments': 'paid_at',
+    'submissions': 'submitted_at',
+}
+
+# Секции с такими строками не отсоединяются. Решения нужны все: непроверенные
+# читает очередь проверки, проверенные — открытие уроков (access.py),
+# прогресс курса и пересчёт лидерборда; отсоединяются только пустые секции.
+DETACH_GUARDS = {
+    'submissions': 'TRUE',
+}
+
+# Уникальность и внешние ключи, которые секционированная таблица не может
+# выразить констрейнтами (они обязаны включать ключ секционирования).
+# Те же функции и триггеры создаёт init.sql.
+INTEGRITY_SQL = {
+    'payments': """
+        CREATE OR REPLACE FUNCTION clear_enrollment_payment()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            UPDATE enrollments SET payment_id = NULL WHERE payment_id = OLD.id;
+            RETURN OLD;
+        END;
+        $$ language 'plpgsql';
+
+        CREATE TRIGGER clear_enrollment_payment_on_delete
+            AFTER DELETE ON payments
+            FOR EACH ROW EXECUTE FUNCTION clear_enrollment_payment();
+    """,
+    'submissions': """
+        CREATE OR REPLACE FUNCTION check_submission_unique()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtext('submissions'), hashtext(NEW.assignment_id || ':' || NEW.user_id));
+            IF EXISTS (
+                SELECT 1 FROM submissions
+                WHERE assignment_id = NEW.assignment_id AND user_id = NEW.user_id
+                  AND (TG_OP = 'INSERT' OR id <> NEW.id)
+            ) THEN
+                RAISE EXCEPTION 'Решение по этому заданию уже отправлено'
+                    USING ERRCODE = 'unique_violation';
+            END IF;
+            RETURN NEW;
+        END;
+        $$ language 'plpgsql';
+
+        CREATE TRIGGER check_submission_unique_on_write
+            BEFORE INSERT OR UPDATE OF assignment_id, user_id ON submissions
+            FOR EACH ROW EXECUTE FUNCTION check_submission_unique();
+
+        CREATE INDEX idx_submissions_assignment_user ON submissions(assignment_id, user_id);
+    """,
+}
+
+# Триггеры, ведущие производные таблицы: функции остаются, а сами триггеры
+# уходят вместе со старой таблицей. Создаются, если функция уже есть в базе
+DERIVED_TRIGGERS_SQL = {
+    'submissions': ('refresh_course_scores', """
+        CREATE TRIGGER refresh_course_scores_on_write
+            AFTER INSERT OR UPDATE OF assignment_id, user_id, score, is_graded OR DELETE ON submissions
+            FOR EACH ROW EXECUTE FUNCTION refresh_course_scores();
+    """),
+}
+
+PARTITION_NAME_RE = re.compile(r'_y(\d{4})m(\d{2})$')
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months_between(first, last):
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_y{month:%Y}m{month:%m}'
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+        [table]
+    )
+    return cursor.fetchone()[0]
+
+
+def month_partitions(cursor, table):
+    """{месяц: имя секции} для помесячных секций таблицы (без DEFAULT)."""
+    cursor.execute(
+        """
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        """,
+        [table]
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME_RE.search(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def create_month_partition(cursor, table, column, month):
+    name = partition_name(table, month)
+    default = f'{table}_default'
+    bounds = [month, add_months(month, 1)]
+
+    # Строки этого месяца, уже попавшие в DEFAULT, не дадут создать секцию —
+    # отсоединяем DEFAULT, создаём секцию и переносим строки через родителя
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE "{column}" >= %s AND "{column}" < %s)',
+        bounds
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)', bounds)
+        return name
+
+    cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{default}"')
+    cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)', bounds)
+    cursor.execute(
+        f"""
+        WITH moved AS (
+            DELETE FROM "{default}" WHERE "{column}" >= %s AND "{column}" < %s RETURNING *
+        )
+        INSERT INTO "{table}" SELECT * FROM moved
+        """,
+        bounds
+    )
+    cursor.execute(f'ALTER TABLE "{table}" ATTACH PARTITION "{default}" DEFAULT')
+    return name
+
+
+def ensure_partitions(table, months_ahead=None, first_month=None):
+    """Создаёт недостающие секции от first_month (или текущего месяца)
+    до текущего месяца + months_ahead. Возвращает имена созданных секций."""
+    if months_ahead is None:
+        months_ahead = settings.PARTITION_MONTHS_AHEAD
+    column = PARTITIONED_TABLES[table]
+    current = month_start(date.today())
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        existing = month_partitions(cursor, table)
+        for month in months_between(first_month or current, add_months(current, months_ahead)):
+            if month not in existing:
+                created.append(create_month_partition(cursor, table, column, month))
+    return created
+
+
+def convert_table(table, months_ahead=None):
+    """Переводит обычную таблицу в секционированную с теми же колонками,
+    CHECK-ограничениями, внешними ключами, индексами и последовательностью id.
+
+    Выполняется в одной транзакции под ACCESS EXCLUSIVE: на время копирования
+    таблица недоступна. Возвращает False, если таблица уже секционирована.
+    """
+    if months_ahead is None:
+        months_ahead = settings.PARTITION_MONTHS_AHEAD
+    column = PARTITIONED_TABLES[table]
+    legacy = f'{table}_legacy'
+    current = month_start(date.today())
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if is_partitioned(cursor, table):
+            return False
+
+        cursor.execute(f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        sequence = cursor.fetchone()[0]
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = to_regclass(%s) AND contype = 'f'
+            """,
+            [table]
+        )
+        foreign_keys = cursor.fetchall()
+        # Обычные индексы (не PK/UNIQUE) пересоздаются на новой таблице
+        cursor.execute(
+            """
+            SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+            FROM pg_index i
+            WHERE i.indrelid = to_regclass(%s)
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+            """,
+            [table]
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(f'SELECT MIN("{column}") FROM "{table}"')
+        first_value = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+        for index_name, _ in indexes:
+            cursor.execute(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"')
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+
+        # Уникальность по id обязана включать ключ секционирования
+        cursor.execute(
+            f"""
+            CREATE TABLE "{table}" (
+                LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+                UNIQUE (id, "{column}")
+            ) PARTITION BY RANGE ("{column}")
+            """
+        )
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+        for _, definition in indexes:
+            cursor.execute(definition)
+
+        cursor.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+        first_month = month_start(first_value) if first_value else current
+        for month in months_between(first_month, add_months(current, months_ahead)):
+            create_month_partition(cursor, table, column, month)
+
+        cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id')
+        # Внешние ключи других таблиц на старую таблицу (enrollments.payment_id)
+        # уходят вместе с ней; их заменяют триггеры из INTEGRITY_SQL
+        cursor.execute(f'DROP TABLE "{legacy}" CASCADE')
+        if table in INTEGRITY_SQL:
+            cursor.execute(INTEGRITY_SQL[table])
+        if table in DERIVED_TRIGGERS_SQL:
+            function, sql = DERIVED_TRIGGERS_SQL[table]
+            cursor.execute("SELECT to_regproc(%s) IS NOT NULL", [function])
+            if cursor.fetchone()[0]:
+                cursor.execute(sql)
+        cursor.execute(f'ANALYZE "{table}"')
+    return True
+
+
+def detach_partitions(table, older_than_months, drop=False):
+    """Отсоединяет помесячные секции старше N месяцев и переносит их в схему
+    PARTITION_ARCHIVE_SCHEMA (или удаляет при drop=True).
+
+    Возвращает (обработанные секции, пропущенные по DETACH_GUARDS).
+    """
+    cutoff = add_months(month_start(date.today()), -older_than_months)
+    schema = settings.PARTITION_ARCHIVE_SCHEMA
+    detached, skipped = [], []
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not drop:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+        for month, name in sorted(month_partitions(cursor, table).items()):
+            if month >= cutoff:
+                continue
+            guard = DETACH_GUARDS.get(table)
+            if guard:
+                cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{name}" WHERE {guard})')
+                if cursor.fetchone()[0]:
+                    skipped.append(name)
+                    continue
+            cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+            if drop:
+                cursor.execute(f'DROP TABLE "{name}"')
+            else:
+                cursor.execute(f'ALTER TABLE "{name}" SET SCHEMA "{schema}"')
+            detached.append(name)
+    return detached, skipped
@@ -19,4 +19,17 @@ class IsAdminOrReadOnly(BasePermission):
         try:
             return UserRole.objects.filter(user_id=user_id, role_id=1).exists()
         except:
-            return False
\ No newline at end of file
+            return False
+
+class IsInstructor(BasePermission):
+    message = "Доступно только преподавателям"
+
+    def has_permission(self, request, view):
+        return UserRole.objects.filter(user_id=request.user.id, role_id=2).exists()
+
+
+class IsAdmin(BasePermission):
+    message = "Доступно только администраторам"
+
+    def has_permission(self, request, view):
+        return UserRole.objects.filter(user_id=request.user.id, role_id=1).exists()
@@ -0,0 +1,342 @@
+# courses/profiling.py
+# Профилирование одного запроса по требованию администратора. Запрос с
+# подписанным токеном (заголовок X-Profile-Token или параметр ?_profile=)
+# выполняется под сэмплирующим профилировщиком: стеки потока раз в
+# PROFILING_SAMPLE_INTERVAL, все SQL-запросы с временем, время по полям
+# сериализаторов и по этапам DRF. Результат пишется в PROFILING_DIR:
+# <id>.json и <id>.folded (свёрнутые стеки для flamegraph.pl/speedscope).
+# Обычный запрос проверяет только наличие токена; хуки ставятся на время
+# одного профилируемого запроса, одновременно — не больше одного.
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.utils import timezone
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.serializers import Serializer
+from rest_framework.views import APIView
+
+from .models import UserRole
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'courses.profiling'
+TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+TOKEN_PARAM = '_profile'
+ADMIN_ROLE = 1
+MAX_STACK_DEPTH = 128
+MAX_SQL_LENGTH = 2000
+
+_busy = threading.Lock()
+
+
+def issue_token(user_id):
+    return signing.dumps({'user_id': user_id}, salt=TOKEN_SALT)
+
+
+def token_user_id(token):
+    """id администратора из токена или None, если токен поддельный или просрочен."""
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    user_id = data.get('user_id')
+    # Роль проверяется заново: токен мог пережить снятие прав
+    if UserRole.objects.filter(user_id=user_id, role_id=ADMIN_ROLE).exists():
+        return user_id
+    return None
+
+
+def frame_label(frame):
+    code = frame.f_code
+    parts = code.co_filename.replace('\\', '/').split('/')
+    location = '/'.join(parts[-2:])
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f'{name} ({location}:{code.co_firstlineno})'.replace(';', ':')
+
+
+def app_origin(frame):
+    # Первый кадр кода проекта: откуда пришёл запрос к базе
+    base = str(settings.BASE_DIR)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base) and '/courses/profiling.py' not in filename:
+            return f'{os.path.relpath(filename, base)}:{frame.f_lineno} {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+class Sampler(threading.Thread):
+    """Снимает стек профилируемого потока через sys._current_frames()."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profiling-sampler', daemon=True)
+        self.target_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def profiled_path(request):
+    # Токен в сохранённый профиль не попадает
+    query = request.GET.copy()
+    query.pop(TOKEN_PARAM, None)
+    return f'{request.path}?{query.urlencode()}' if query else request.path
+
+
+class RequestProfile:
+    # (класс, атрибут, этап): время этапов DRF, включая вложенные
+    PHASES = [
+        (Request, '_authenticate', 'authentication'),
+        (APIView, 'check_permissions', 'permissions'),
+        (APIView, 'check_object_permissions', 'permissions'),
+        (APIView, 'check_throttles', 'throttling'),
+        (Response, 'rendered_content', 'rendering'),
+    ]
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.thread_id = threading.get_ident()
+        self.queries = []
+        self.fields = defaultdict(lambda: [0, 0.0])
+        self.phases = defaultdict(float)
+        self.restore = []
+        self.sampler = Sampler(self.thread_id, settings.PROFILING_SAMPLE_INTERVAL)
+        self.wrappers = []
+
+    # ----- SQL -----
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql[:MAX_SQL_LENGTH],
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+                'many': many,
+                'db': context['connection'].alias,
+                'origin': app_origin(sys._getframe(1)),
+            })
+
+    # ----- поля сериализаторов -----
+    def serializer_to_representation(self):
+        profile = self
+        original = Serializer.to_representation
+
+        # Повторяет Serializer.to_representation, замеряя каждое поле
+        def to_representation(serializer, instance):
+            if threading.get_ident() != profile.thread_id:
+                return original(serializer, instance)
+            ret = {}
+            prefix = type(serializer).__name__
+            for field in serializer._readable_fields:
+                started = time.perf_counter()
+                try:
+                    attribute = field.get_attribute(instance)
+                except SkipField:
+                    continue
+                check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+                if check_for_none is None:
+                    ret[field.field_name] = None
+                else:
+                    ret[field.field_name] = field.to_representation(attribute)
+                stats = profile.fields[f'{prefix}.{field.field_name}']
+                stats[0] += 1
+                stats[1] += time.perf_counter() - started
+            return ret
+
+        return to_representation
+
+    def timed(self, original, phase):
+        profile = self
+
+        def wrapper(*args, **kwargs):
+            if threading.get_ident() != profile.thread_id:
+                return original(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                profile.phases[phase] += time.perf_counter() - started
+
+        return wrapper
+
+    def patch(self, owner, name, value):
+        self.restore.append((owner, name, owner.__dict__[name]))
+        setattr(owner, name, value)
+
+    # ----- запуск и остановка -----
+    def start(self):
+        self.patch(Serializer, 'to_representation', self.serializer_to_representation())
+        for owner, name, phase in self.PHASES:
+            attr = owner.__dict__[name]
+            if isinstance(attr, property):
+                self.patch(owner, name, property(self.timed(attr.fget, phase)))
+            else:
+                self.patch(owner, name, self.timed(attr, phase))
+        for connection in connections.all():
+            wrapper = connection.execute_wrapper(self)
+            wrapper.__enter__()
+            self.wrappers.append(wrapper)
+        self.switch_interval = sys.getswitchinterval()
+        # Иначе поток-сэмплер получает GIL не чаще раза в 5 мс
+        sys.setswitchinterval(min(self.switch_interval, settings.PROFILING_SAMPLE_INTERVAL / 2))
+        self.started_at = timezone.now()
+        self.started = time.perf_counter()
+        self.sampler.start()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.started
+        self.sampler.stop()
+        sys.setswitchinterval(self.switch_interval)
+        for wrapper in reversed(self.wrappers):
+            wrapper.__exit__(None, None, None)
+        for owner, name, value in reversed(self.restore):
+            setattr(owner, name, value)
+
+    # ----- отчёт -----
+    def report(self, request, response):
+        sql_by_text = Counter(q['sql'] for q in self.queries)
+        leaves = Counter()
+        for stack, count in self.sampler.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        samples = sum(self.sampler.stacks.values())
+        return {
+            'method': request.method,
+            'path': profiled_path(request),
+            'status': response.status_code,
+            'user_id': self.user_id,
+            'started_at': self.started_at.isoformat(),
+            'duration_ms': round(self.duration * 1000, 2),
+            'samples': samples,
+            'sample_interval_ms': settings.PROFILING_SAMPLE_INTERVAL * 1000,
+            'phases_ms': {
+                'sql': round(sum(q['ms'] for q in self.queries), 2),
+                **{phase: round(seconds * 1000, 2) for phase, seconds in self.phases.items()},
+            },
+            'fields': [
+                {'field': name, 'calls': calls, 'ms': round(seconds * 1000, 3)}
+                for name, (calls, seconds) in sorted(self.fields.items(), key=lambda item: -item[1][1])
+            ],
+            'top_frames': [
+                {'frame': frame, 'samples': count} for frame, count in leaves.most_common(20)
+            ],
+            'sql': {
+                'count': len(self.queries),
+                'repeated': [
+                    {'sql': sql, 'count': count} for sql, count in sql_by_text.most_common() if count > 1
+                ],
+                'queries': self.queries,
+            },
+        }
+
+
+def profile_path(profile_id, suffix):
+    return os.path.join(settings.PROFILING_DIR, f'{profile_id}{suffix}')
+
+
+def save_profile(report, stacks):
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+    report['id'] = profile_id
+    with open(profile_path(profile_id, '.folded'), 'w', encoding='utf-8') as f:
+        for stack, count in stacks.items():
+            f.write(f'{stack} {count}\n')
+    with open(profile_path(profile_id, '.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    prune_profiles()
+    return profile_id
+
+
+def list_profile_ids():
+    try:
+        names = os.listdir(settings.PROFILING_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted((name[:-5] for name in names if name.endswith('.json')), reverse=True)
+
+
+def prune_profiles():
+    for profile_id in list_profile_ids()[settings.PROFILING_KEEP:]:
+        for suffix in ('.json', '.folded'):
+            try:
+                os.remove(profile_path(profile_id, suffix))
+            except FileNotFoundError:
+                pass
+
+
+def load_profile(profile_id):
+    try:
+        with open(profile_path(profile_id, '.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request.META.get(TOKEN_HEADER)
+        if token is None and TOKEN_PARAM in request.META.get('QUERY_STRING', ''):
+            token = request.GET.get(TOKEN_PARAM)
+        if not token:
+            return self.get_response(request)
+        return self.profile(request, token)
+
+    def profile(self, request, token):
+        user_id = token_user_id(token)
+        if user_id is None:
+            response = self.get_response(request)
+            response['X-Profile-Status'] = 'invalid-token'
+            return response
+        if not _busy.acquire(blocking=False):
+            response = self.get_response(request)
+            response['X-Profile-Status'] = 'busy'
+            return response
+
+        try:
+            profile = RequestProfile(user_id)
+            profile.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.stop()
+        finally:
+            _busy.release()
+
+        try:
+            profile_id = save_profile(profile.report(request, response), profile.sampler.stacks)
+        except Exception:
+            logger.exception("Не удалось сохранить профиль запроса %s", request.path)
+            response['X-Profile-Status'] = 'error'
+            return response
+        response['X-Profile-Status'] = 'saved'
+        response['X-Profile-Id'] = profile_id
+        return response
@@ -1,14 +1,32 @@
 # courses/serializers.py
+from decimal import Decimal
+
+from django.conf import settings
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.db.models import Avg
 from .models import (
     User, Role, Category, Course, Module, Lesson,
-    Payment, Enrollment, Rating, Assignment, Submission, UserRole, Certificate, Comment
+    Payment, Enrollment, Rating, Assignment, Submission, UserRole, Certificate, Comment, Notification
 )
+from .authentication import TOKEN_VERSION_CLAIM, check_token_version
+from .catalog import ORDERINGS, bucket_ranges
 
 # ===== АУТЕНТИФИКАЦИЯ =====
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    username_field = 'email'
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # Claims, из которых TokenUserAuthentication собирает request.user
+        token['user_id'] = user.id
+        token['email'] = user.email
+        token['roles'] = list(UserRole.objects.filter(user=user).values_list('role_id', flat=True))
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
     def validate(self, attrs):
         email = attrs.get('email')
         password = attrs.get('password')
@@ -21,19 +39,29 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         if not user.check_password(password):
             raise serializers.ValidationError("Неверный email или пароль")
         
-        # Создаём токен
-        data = super().validate(attrs)
-        
+        # Токен выдаётся пользователю courses.User, а не auth.User
+        refresh = self.get_token(user)
+
         # Добавляем кастомные поля в ответ
-        data.update({
+        return {
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
             'user_id': user.id,
             'email': user.email,
             'first_name': user.first_name,
             'last_name': user.last_name,
             'avatar_url': user.avatar_url,
-            'roles': list(UserRole.objects.filter(user=user).values_list('role_id', flat=True))
-        })
-        return data
+            'roles': refresh['roles']
+        }
+
+class TokenVersionRefreshSerializer(TokenRefreshSerializer):
+    """Обновление токена, отклоняющее отозванные refresh-токены."""
+
+    def validate(self, attrs):
+        # Мимо кэша: новый access-токен не выдаётся заблокированному или
+        # вышедшему со всех устройств пользователю ни одним воркером
+        check_token_version(RefreshToken(attrs['refresh']), use_cache=False)
+        return super().validate(attrs)
 
 # ===== РЕГИСТРАЦИЯ =====
 class RegisterSerializer(serializers.ModelSerializer):
@@ -56,13 +84,14 @@ class RegisterSerializer(serializers.ModelSerializer):
         validated_data.pop('password_confirm')
         raw_password = validated_data.pop('password')
         
-        user = User.objects.create(
+        user = User(
             email=validated_data['email'],
             first_name=validated_data['first_name'],
             last_name=validated_data['last_name'],
             phone=validated_data.get('phone', ''),
             is_active=True
         )
+        # Хешируем до сохранения, чтобы обойтись одним INSERT
         user.set_password(raw_password)
         user.save()
         
@@ -102,6 +131,10 @@ class LessonSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         if not user.is_authenticated:
             return False
+        # Пакетные вьюхи заранее собирают пройденные уроки одним запросом
+        completed = self.context.get('completed_lesson_ids')
+        if completed is not None:
+            return obj.id in completed
         return Submission.objects.filter(
             user=user,
             assignment__lesson=obj,
@@ -109,11 +142,11 @@ class LessonSerializer(serializers.ModelSerializer):
         ).exists()
     
     def get_assignment(self, obj):
-        try:
-            assignment = Assignment.objects.get(lesson=obj)
-            return AssignmentSerializer(assignment).data
-        except Assignment.DoesNotExist:
+        # .all() берёт предзагруженные задания, если вьюха их подготовила
+        assignments = list(obj.assignments.all()[:1])
+        if not assignments:
             return None
+        return AssignmentSerializer(assignments[0]).data
 
 # ===== МОДУЛИ =====
 class ModuleSerializer(serializers.ModelSerializer):
@@ -125,7 +158,7 @@ class ModuleSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'order_num', 'lessons', 'progress_pct']
     
     def get_lessons(self, obj):
-        lessons = obj.lesson_set.filter(is_deleted=False).order_by('order_num')
+        lessons = obj.lessons.all()
         return LessonSerializer(lessons, many=True, context=self.context).data
     
     def get_progress_pct(self, obj):
@@ -133,10 +166,15 @@ class ModuleSerializer(serializers.ModelSerializer):
         if not user.is_authenticated:
             return 0
         
-        total_lessons = obj.lesson_set.filter(is_deleted=False).count()
+        total_lessons = obj.lessons.count()
         if total_lessons == 0:
             return 0
         
+        completed = self.context.get('completed_lesson_ids')
+        if completed is not None:
+            completed_lessons = sum(1 for lesson in obj.lessons.all() if lesson.id in completed)
+            return round((completed_lessons / total_lessons) * 100)
+        
         completed_lessons = Submission.objects.filter(
             user=user,
             assignment__lesson__module=obj,
@@ -163,15 +201,24 @@ class CourseSerializer(serializers.ModelSerializer):
         ]
     
     def get_modules(self, obj):
-        modules = obj.module_set.filter(is_deleted=False).order_by('order_num')
+        modules = obj.modules.all()
         return ModuleSerializer(modules, many=True, context=self.context).data
     
     def get_average_rating(self, obj):
-        avg = Rating.objects.filter(course=obj).aggregate(Avg('rating'))['rating__avg']
+        # Вьюхи считают среднее аннотацией в основном запросе
+        if hasattr(obj, 'average_rating'):
+            avg = obj.average_rating
+        else:
+            avg = Rating.objects.filter(course=obj).aggregate(Avg('rating'))['rating__avg']
         return round(avg, 1) if avg else None
     
     def get_ratings(self, obj):
-        ratings = Rating.objects.filter(course=obj).select_related('user')[:5]
+        # recent_ratings — top-N последних отзывов, предзагруженные одним запросом
+        # на все курсы страницы (см. recent_ratings_prefetch)
+        if hasattr(obj, 'recent_ratings'):
+            ratings = obj.recent_ratings
+        else:
+            ratings = Rating.objects.filter(course=obj).select_related('user').order_by('-created_at')[:settings.COURSE_RECENT_RATINGS]
         return RatingWithUserSerializer(ratings, many=True).data
     
     def get_progress_pct(self, obj):
@@ -179,6 +226,10 @@ class CourseSerializer(serializers.ModelSerializer):
         if not user.is_authenticated:
             return 0
         
+        progress = self.context.get('enrollment_progress')
+        if progress is not None:
+            return progress.get(obj.id, 0)
+        
         enrollment = Enrollment.objects.filter(
             user=user,
             course=obj,
@@ -204,6 +255,111 @@ class EnrollmentSerializer(serializers.ModelSerializer):
             'progress_pct', 'status'
         ]
 
+# ===== ДАШБОРД «МОЁ ОБУЧЕНИЕ» =====
+class CourseCardSerializer(serializers.ModelSerializer):
+    instructor_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Course
+        fields = [
+            'id', 'title', 'slug', 'short_desc', 'thumbnail_url',
+            'duration_hours', 'instructor_name'
+        ]
+
+    def get_instructor_name(self, obj):
+        return f'{obj.instructor.first_name} {obj.instructor.last_name}'
+
+# ===== КАТАЛОГ =====
+class CatalogCourseSerializer(CourseCardSerializer):
+    category = CategorySerializer(read_only=True)
+    # Из course_rating_stats, аннотацией в запросе страницы
+    average_rating = serializers.FloatField(read_only=True)
+    ratings_count = serializers.IntegerField(read_only=True)
+
+    class Meta(CourseCardSerializer.Meta):
+        fields = CourseCardSerializer.Meta.fields + ['price', 'category', 'average_rating', 'ratings_count']
+
+class IdListField(serializers.CharField):
+    """«1,2,3» -> [1, 2, 3]."""
+
+    def to_internal_value(self, data):
+        raw = super().to_internal_value(data)
+        try:
+            ids = list(dict.fromkeys(int(part) for part in raw.split(',') if part.strip()))
+        except ValueError:
+            raise serializers.ValidationError("Ожидается список чисел через запятую")
+        if len(ids) > settings.CATALOG_MAX_FILTER_VALUES:
+            raise serializers.ValidationError(f"Не больше {settings.CATALOG_MAX_FILTER_VALUES} значений")
+        return ids
+
+class CatalogQuerySerializer(serializers.Serializer):
+    category = IdListField(required=False)
+    instructor = IdListField(required=False)
+    price_min = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal(0), required=False)
+    price_max = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal(0), required=False)
+    # Нижние границы корзин CATALOG_DURATION_BUCKETS
+    duration = IdListField(required=False)
+    rating_min = serializers.DecimalField(max_digits=3, decimal_places=2, min_value=Decimal(0), max_value=Decimal(5), required=False)
+    ordering = serializers.ChoiceField(choices=list(ORDERINGS), default='-created_at')
+    page = serializers.IntegerField(min_value=1, default=1)
+    page_size = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_duration(self, value):
+        known = dict(bucket_ranges(settings.CATALOG_DURATION_BUCKETS))
+        unknown = [lower for lower in value if lower not in known]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Неизвестные корзины длительности: {unknown}; допустимы {list(known)}"
+            )
+        return value
+
+    def validate_page_size(self, value):
+        return min(value, settings.CATALOG_MAX_PAGE_SIZE)
+
+    def validate(self, attrs):
+        if attrs.get('price_min') is not None and attrs.get('price_max') is not None \
+                and attrs['price_min'] >= attrs['price_max']:
+            raise serializers.ValidationError({'price_max': "Должна быть больше price_min"})
+        return attrs
+
+class DashboardEnrollmentSerializer(serializers.ModelSerializer):
+    course = CourseCardSerializer(read_only=True)
+    progress_pct = serializers.SerializerMethodField()
+    completed_lessons = serializers.SerializerMethodField()
+    total_lessons = serializers.SerializerMethodField()
+    last_activity_at = serializers.SerializerMethodField()
+    next_lesson = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Enrollment
+        fields = [
+            'id', 'course', 'enrolled_at', 'status', 'progress_pct',
+            'completed_lessons', 'total_lessons', 'last_activity_at', 'next_lesson'
+        ]
+
+    # Статистика заранее посчитана одним запросом (courses.dashboard.learning_stats)
+    def _stats(self, obj):
+        return self.context['stats'].get(obj.course_id, {})
+
+    def get_progress_pct(self, obj):
+        stats = self._stats(obj)
+        if not stats.get('total_lessons'):
+            return obj.progress_pct
+        return round(stats['completed_lessons'] / stats['total_lessons'] * 100)
+
+    def get_completed_lessons(self, obj):
+        return self._stats(obj).get('completed_lessons', 0)
+
+    def get_total_lessons(self, obj):
+        return self._stats(obj).get('total_lessons', 0)
+
+    def get_last_activity_at(self, obj):
+        last_activity = self._stats(obj).get('last_activity_at') or obj.enrolled_at
+        return serializers.DateTimeField().to_representation(last_activity)
+
+    def get_next_lesson(self, obj):
+        return self._stats(obj).get('next_lesson')
+
 # ===== ОЦЕНКИ =====
 class RatingSerializer(serializers.ModelSerializer):
     class Meta:
@@ -237,6 +393,69 @@ class SubmissionSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Это задание не требует отправки решения")
         return data
 
+# ===== ОЧЕРЕДЬ ПРОВЕРКИ =====
+class GradingSubmissionSerializer(serializers.ModelSerializer):
+    max_score = serializers.IntegerField(source='assignment.max_score', read_only=True)
+
+    class Meta:
+        model = Submission
+        fields = [
+            'id', 'assignment', 'user', 'content', 'file_url',
+            'submitted_at', 'max_score', 'lease_expires_at'
+        ]
+
+class GradingClaimSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, default=10)
+
+    def validate_limit(self, value):
+        return min(value, settings.GRADING_BATCH_MAX)
+
+class HeartbeatSerializer(serializers.Serializer):
+    position_sec = serializers.IntegerField(min_value=0, max_value=24 * 60 * 60)
+
+class TypeaheadSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100, allow_blank=True)
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_limit(self, value):
+        return min(value, settings.TYPEAHEAD_MAX_LIMIT)
+
+class LeaderboardSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_limit(self, value):
+        return min(value, settings.LEADERBOARD_MAX_SIZE)
+
+class GradeItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    score = serializers.IntegerField(min_value=0)
+    feedback = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+class BulkGradeSerializer(serializers.Serializer):
+    grades = GradeItemSerializer(many=True, allow_empty=False)
+
+    def validate_grades(self, value):
+        if len(value) > settings.GRADING_BATCH_MAX:
+            raise serializers.ValidationError(
+                f"Не больше {settings.GRADING_BATCH_MAX} решений за раз"
+            )
+        return value
+
+# ===== УВЕДОМЛЕНИЯ =====
+class NotificationSerializer(serializers.ModelSerializer):
+    course_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'kind', 'course_id', 'object_id', 'title', 'created_at', 'read_at']
+
+class NotificationReadSerializer(serializers.Serializer):
+    # Без ids отмечаются прочитанными все уведомления
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False,
+        max_length=settings.NOTIFICATIONS_READ_MAX
+    )
+
 # ===== ПЛАТЕЖИ =====
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
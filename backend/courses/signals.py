@@ -0,0 +1,168 @@
+# courses/signals.py
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .access import invalidate_access
+from .authentication import forget_token_version
+from .http_cache import purge
+from .jobs import enqueue
+from .models import (
+    Assignment, Category, Course, Enrollment, Lesson, Module, Notification, Rating, Submission, User, UserRole
+)
+from .notifications import notify_course
+from .typeahead import sync_category, sync_course, sync_instructor, typeahead_index
+
+
+@receiver([post_save, post_delete], sender=Course)
+def purge_course(sender, instance, **kwargs):
+    purge(
+        f'course-{instance.id}',
+        f'instructor-{instance.instructor_id}',
+        f'category-{instance.category_id}',
+        'catalog'
+    )
+
+
+@receiver([post_save, post_delete], sender=Module)
+def purge_module(sender, instance, **kwargs):
+    purge(f'course-{instance.course_id}')
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def purge_lesson(sender, instance, **kwargs):
+    if settings.SURROGATE_PURGE_URL:
+        course_id = Module.all_objects.filter(id=instance.module_id).values_list('course_id', flat=True).first()
+        purge(f'course-{course_id}')
+
+
+@receiver([post_save, post_delete], sender=Assignment)
+def purge_assignment(sender, instance, **kwargs):
+    if settings.SURROGATE_PURGE_URL:
+        course_id = Lesson.all_objects.filter(
+            id=instance.lesson_id
+        ).values_list('module__course_id', flat=True).first()
+        purge(f'course-{course_id}')
+
+
+@receiver([post_save, post_delete], sender=Category)
+def purge_category(sender, instance, **kwargs):
+    # Ключ category-{id} есть у каждого ответа с курсом этой категории
+    purge(f'category-{instance.id}')
+
+
+@receiver([post_save, post_delete], sender=Rating)
+def purge_rating(sender, instance, **kwargs):
+    purge(f'course-{instance.course_id}')
+
+
+@receiver(post_save, sender=User)
+def purge_instructor(sender, instance, **kwargs):
+    purge(f'instructor-{instance.id}')
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=Submission)
+def reset_lesson_access(sender, instance, **kwargs):
+    invalidate_access(instance.user_id)
+
+
+# ===== ИНДЕКС ПОДСКАЗОК =====
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, **kwargs):
+    sync_course(instance)
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course(sender, instance, **kwargs):
+    sync_course(instance, deleted=True)
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, **kwargs):
+    sync_category(instance)
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category(sender, instance, **kwargs):
+    sync_category(instance, deleted=True)
+
+
+@receiver(post_save, sender=User)
+def index_instructor(sender, instance, **kwargs):
+    sync_instructor(instance.id)
+
+
+@receiver([post_save, post_delete], sender=UserRole)
+def index_instructor_role(sender, instance, **kwargs):
+    sync_instructor(instance.user_id, role_changed=True)
+
+
+@receiver(post_delete, sender=User)
+def unindex_instructor(sender, instance, **kwargs):
+    if typeahead_index.contains('instructor', instance.id):
+        typeahead_index.remove('instructor', instance.id)
+
+
+# ===== УВЕДОМЛЕНИЯ =====
+@receiver(post_save, sender=Lesson)
+def notify_lesson_published(sender, instance, created, **kwargs):
+    if not created:
+        return
+    course_id = Course.objects.filter(
+        modules__id=instance.module_id, is_published=True
+    ).values_list('id', flat=True).first()
+    if course_id:
+        notify_course(Notification.KIND_LESSON_PUBLISHED, course_id, instance.id, instance.title)
+
+
+@receiver(post_save, sender=Assignment)
+def notify_assignment_published(sender, instance, created, **kwargs):
+    if not created:
+        return
+    course_id = Course.objects.filter(
+        modules__lessons__id=instance.lesson_id, is_published=True
+    ).values_list('id', flat=True).first()
+    if course_id:
+        notify_course(Notification.KIND_ASSIGNMENT_PUBLISHED, course_id, instance.id, instance.title)
+
+
+# ===== СКОМПИЛИРОВАННЫЕ ДОКУМЕНТЫ КУРСОВ =====
+def recompile(*course_ids):
+    course_ids = sorted({course_id for course_id in course_ids if course_id})
+    if course_ids:
+        enqueue('courses.compile_documents', course_ids=course_ids)
+
+
+@receiver(post_save, sender=Course)
+def recompile_course(sender, instance, **kwargs):
+    # Снятие с публикации тоже: задача удалит документ
+    recompile(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Module)
+def recompile_module(sender, instance, **kwargs):
+    recompile(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def recompile_lesson(sender, instance, **kwargs):
+    recompile(Module.all_objects.filter(id=instance.module_id).values_list('course_id', flat=True).first())
+
+
+@receiver([post_save, post_delete], sender=Assignment)
+def recompile_assignment(sender, instance, **kwargs):
+    recompile(Lesson.all_objects.filter(id=instance.lesson_id).values_list('module__course_id', flat=True).first())
+
+
+@receiver(post_save, sender=Category)
+def recompile_category(sender, instance, **kwargs):
+    recompile(*Course.objects.filter(category_id=instance.id, is_published=True).values_list('id', flat=True))
+
+
+# ===== ВЕРСИИ ТОКЕНОВ =====
+@receiver([post_save, post_delete], sender=User)
+def reset_token_version(sender, instance, **kwargs):
+    # Блокировка, удаление и смена пароля должны действовать сразу, а не
+    # после истечения кэша версии
+    forget_token_version(instance.id)
@@ -0,0 +1,15 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    // Выбор в autocomplete-фильтре перезагружает список с новым параметром
+    $(function() {
+        $('select.autocomplete-filter').on('change', function() {
+            const params = new URLSearchParams(this.dataset.queryString);
+            if (this.value) {
+                params.set(this.dataset.lookup, this.value);
+            }
+            window.location.search = params.toString();
+        });
+    });
+}
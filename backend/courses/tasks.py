@@ -0,0 +1,63 @@
+# courses/tasks.py
+# Обработчики фоновых задач (см. courses/jobs.py)
+import urllib.request
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .jobs import enqueue, job
+from .models import Enrollment, Payment
+from .documents import compile_documents
+from .notifications import fan_out_chunk
+
+
+@job('enrollment.create_payment')
+def create_enrollment_payment(enrollment_id):
+    enrollment = Enrollment.objects.select_related('course').filter(id=enrollment_id).first()
+    # Запись могли удалить, а платёж — уже создать при прошлой попытке
+    if enrollment is None or enrollment.payment_id:
+        return
+    # Бесплатные курсы платежа не требуют (amount > 0 в схеме)
+    if enrollment.course.price <= 0:
+        return
+
+    with transaction.atomic():
+        payment = Payment.objects.create(
+            user_id=enrollment.user_id,
+            course=enrollment.course,
+            amount=enrollment.course.price,
+            status='completed',
+            paid_at=timezone.now()
+        )
+        Enrollment.objects.filter(id=enrollment_id, payment__isnull=True).update(payment=payment)
+
+
+@job('catalog.purge_surrogate_keys')
+def purge_surrogate_keys(keys):
+    # Сбрасываем в кэширующем прокси ответы, помеченные этими Surrogate-Key
+    request = urllib.request.Request(
+        settings.SURROGATE_PURGE_URL,
+        method='PURGE',
+        headers={'Surrogate-Key': ' '.join(keys)}
+    )
+    with urllib.request.urlopen(request, timeout=10):
+        pass
+
+
+@job('notifications.fan_out')
+def fan_out_notifications(kind, course_id, object_id, title, after=0):
+    # Пачка и задача на следующую пачку коммитятся вместе. Если задачу
+    # забрали повторно после коммита (воркер упал до удаления строки jobs),
+    # вставлять нечего, а продолжение уже стоит в очереди — второе не ставим
+    with transaction.atomic():
+        last_id, chunk_size, inserted = fan_out_chunk(kind, course_id, object_id, title, after)
+        if chunk_size == settings.NOTIFICATIONS_FANOUT_CHUNK and inserted:
+            enqueue('notifications.fan_out', kind=kind, course_id=course_id,
+                    object_id=object_id, title=title, after=last_id)
+
+
+@job('courses.compile_documents')
+def compile_course_documents(course_ids):
+    for start in range(0, len(course_ids), settings.COURSE_DOCUMENTS_BATCH):
+        compile_documents(course_ids[start:start + settings.COURSE_DOCUMENTS_BATCH])
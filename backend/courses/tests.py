@@ -1,3 +1,275 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .catalog import ALL_BITS, GROUP_OF, GROUPED, bucket_facet, bucket_ranges, build_facets, filter_conditions
+from .leaderboard import course_leaderboard, rebuild_course_scores
+from .models import Assignment, Category, Course, CourseScore, CourseScoreCount, Lesson, Module, Submission, User
+
+# Таблицы, функции и триггеры создаёт init.sql, а не миграции
+INIT_SQL = settings.BASE_DIR.parent / 'docker' / 'projects' / 'lms-db' / 'init.sql'
+
+
+class SchemaTestCase(TestCase):
+    """TestCase, для которого в тестовую базу один раз загружается init.sql."""
+
+    @classmethod
+    def setUpClass(cls):
+        # До транзакции TestCase: схема остаётся для следующих классов
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('users')")
+            if cursor.fetchone()[0] is None:
+                cursor.execute(INIT_SQL.read_text(encoding='utf-8'))
+        super().setUpClass()
+
+
+# ===== КАТАЛОГ С ФАСЕТАМИ =====
+def facet_row(column, value, matched=0, without=0, ratings=(0, 0, 0, 0), name=None):
+    """Строка FACETS_SQL для группы column: GROUPING() как у PostgreSQL —
+    бит первого аргумента старший, 1 у измерений, свёрнутых в этой группе."""
+    index = GROUPED.index(column)
+    row = {
+        'grouping_id': ALL_BITS ^ (1 << (len(GROUPED) - 1 - index)),
+        'matched': matched,
+        'category_name': None,
+        'instructor_name': None,
+    }
+    for other in GROUPED:
+        row[other] = value if other == column else None
+    dimension = column.rsplit('_', 1)[0]
+    for other in ('category', 'instructor', 'price', 'duration'):
+        row[f'without_{other}'] = without if other == dimension else 0
+    for i, count in enumerate(ratings):
+        row[f'rating_{i}'] = count
+    if name is not None:
+        row[f'{dimension}_name'] = name
+    return row
+
+
+NO_SELECTION = {'category': set(), 'instructor': set()}
+
+
+@override_settings(
+    CATALOG_PRICE_BUCKETS=[0, 1, 1000, 3000, 10000],
+    CATALOG_DURATION_BUCKETS=[0, 2, 5, 10, 20],
+    CATALOG_RATING_THRESHOLDS=[4.5, 4, 3.5, 3],
+    CATALOG_FACET_LIMIT=2,
+)
+class CatalogFacetsTests(SimpleTestCase):
+    def test_group_of_decodes_grouping_bitmask(self):
+        # GROUPING(category_id, instructor_id, price_bucket, duration_bucket)
+        self.assertEqual(GROUP_OF, {
+            0b0111: 'category_id',
+            0b1011: 'instructor_id',
+            0b1101: 'price_bucket',
+            0b1110: 'duration_bucket',
+        })
+
+    def test_rows_are_routed_by_grouping_id(self):
+        rows = [
+            facet_row('category_id', 1, without=3, name='Программирование'),
+            facet_row('instructor_id', 7, without=2, name='Иван Петров'),
+            facet_row('price_bucket', 3, matched=2, without=4),
+            facet_row('duration_bucket', 2, without=5),
+        ]
+        facets = build_facets(rows, NO_SELECTION)['facets']
+        self.assertEqual(facets['category'], [{'id': 1, 'name': 'Программирование', 'count': 3}])
+        self.assertEqual(facets['instructor'], [{'id': 7, 'name': 'Иван Петров', 'count': 2}])
+        self.assertEqual(facets['price'][2]['count'], 4)
+        self.assertEqual(facets['duration'][1]['count'], 5)
+
+    def test_total_and_ratings_come_from_price_groups_only(self):
+        # Курс попадает в одну корзину цены, но и в группы категории и
+        # преподавателя: сумма по ним посчитала бы его трижды
+        rows = [
+            facet_row('price_bucket', 1, matched=2, ratings=(1, 2, 2, 2)),
+            facet_row('price_bucket', 4, matched=3, ratings=(0, 1, 2, 3)),
+            facet_row('category_id', 1, matched=5, without=5, ratings=(9, 9, 9, 9)),
+            facet_row('instructor_id', 7, matched=5, without=5, ratings=(9, 9, 9, 9)),
+        ]
+        result = build_facets(rows, NO_SELECTION)
+        self.assertEqual(result['total'], 5)
+        self.assertEqual(
+            result['facets']['rating'],
+            [{'min': 4.5, 'count': 1}, {'min': 4, 'count': 3}, {'min': 3.5, 'count': 4}, {'min': 3, 'count': 5}]
+        )
+
+    def test_count_uses_all_filters_except_own_dimension(self):
+        # Выбрана категория 1: matched у категории 2 равен нулю, но счётчик
+        # фасета — without_category, посчитанный без фильтра по категории
+        rows = [
+            facet_row('category_id', 1, matched=4, without=4, name='А'),
+            facet_row('category_id', 2, matched=0, without=6, name='Б'),
+        ]
+        categories = build_facets(rows, {'category': {1}, 'instructor': set()})['facets']['category']
+        self.assertEqual([(item['id'], item['count']) for item in categories], [(2, 6), (1, 4)])
+
+    def test_empty_values_are_hidden_unless_selected(self):
+        rows = [
+            facet_row('category_id', 1, without=0, name='А'),
+            facet_row('category_id', 2, without=0, name='Б'),
+            facet_row('category_id', 3, without=1, name='В'),
+        ]
+        categories = build_facets(rows, {'category': {2}, 'instructor': set()})['facets']['category']
+        self.assertEqual([item['id'] for item in categories], [3, 2])
+
+    def test_instructors_are_limited_but_keep_selected(self):
+        rows = [facet_row('instructor_id', i, without=10 - i, name=f'И{i}') for i in range(1, 6)]
+        instructors = build_facets(rows, {'category': set(), 'instructor': {5}})['facets']['instructor']
+        self.assertEqual([item['id'] for item in instructors], [1, 2, 5])
+
+    def test_price_buckets_edges(self):
+        # width_bucket: значение на границе попадает в верхнюю корзину,
+        # последняя корзина открыта сверху
+        self.assertEqual(
+            bucket_ranges([0, 1, 1000, 3000, 10000]),
+            [(0, 1), (1, 1000), (1000, 3000), (3000, 10000), (10000, None)]
+        )
+        price = bucket_facet([
+            {'price_bucket': 1, 'without_price': 2},
+            {'price_bucket': 5, 'without_price': 7},
+        ], 'price', [0, 1, 1000, 3000, 10000])
+        self.assertEqual(price[0], {'min': 0, 'max': 1, 'count': 2})
+        self.assertEqual(price[-1], {'min': 10000, 'max': None, 'count': 7})
+        self.assertEqual([item['count'] for item in price[1:4]], [0, 0, 0])
+
+    def test_duration_null_and_zero(self):
+        # duration_hours = 0 -> корзина 1 [0, 2); NULL -> width_bucket NULL,
+        # отрицательное -> 0: такие строки в фасет не попадают
+        duration = bucket_facet([
+            {'duration_bucket': None, 'without_duration': 5},
+            {'duration_bucket': 0, 'without_duration': 4},
+            {'duration_bucket': 1, 'without_duration': 3},
+        ], 'duration', [0, 2, 5, 10, 20])
+        self.assertEqual(duration[0], {'min': 0, 'max': 2, 'count': 3})
+        self.assertEqual(sum(item['count'] for item in duration), 3)
+
+    def test_duration_filter_matches_bucket_ranges(self):
+        sql, params = filter_conditions({'duration': [0, 20]})['duration']
+        self.assertEqual(
+            sql,
+            '((c.duration_hours >= %(duration_0_min)s AND c.duration_hours < %(duration_0_max)s)'
+            ' OR c.duration_hours >= %(duration_1_min)s)'
+        )
+        self.assertEqual(params, {'duration_0_min': 0, 'duration_0_max': 2, 'duration_1_min': 20})
+
+    def test_price_filter_is_half_open(self):
+        sql, params = filter_conditions({'price_min': Decimal('1000'), 'price_max': Decimal('3000')})['price']
+        self.assertEqual(sql, 'c.price >= %(price_min)s AND c.price < %(price_max)s')
+        self.assertEqual(params, {'price_min': Decimal('1000'), 'price_max': Decimal('3000')})
+        sql, params = filter_conditions({'price_min': Decimal('0')})['price']
+        self.assertEqual(sql, 'c.price >= %(price_min)s')
+
+    def test_no_filters_no_conditions(self):
+        self.assertEqual(filter_conditions({'category': [], 'instructor': None}), {})
+
+
+# ===== РЕЙТИНГ СТУДЕНТОВ КУРСА =====
+class LeaderboardTests(SchemaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        def user(name):
+            # Уже «захешированный» пароль: save() не тратит время на PBKDF2
+            return User.objects.create(
+                email=f'{name}@test.ru', password_hash='pbkdf2_sha256$test',
+                first_name=name, last_name='Тестов', phone='0'
+            )
+
+        instructor = user('instructor')
+        category = Category.objects.create(name='Тесты', slug='leaderboard-tests')
+
+        def assignments(slug, count):
+            course = Course.objects.create(
+                title=slug, slug=slug, description='', instructor=instructor, category=category, price=0
+            )
+            module = Module.objects.create(course=course, title='Модуль', order_num=1)
+            lesson = Lesson.objects.create(module=module, title='Урок', order_num=1)
+            return course, [
+                Assignment.objects.create(lesson=lesson, title=f'Задание {i}', max_score=100)
+                for i in range(count)
+            ]
+
+        cls.course, cls.tasks = assignments('leaderboard-a', 3)
+        cls.other_course, cls.other_tasks = assignments('leaderboard-b', 1)
+        cls.students = [user(f'student{i}') for i in range(4)]
+
+    def submit(self, student, task, score=None):
+        return Submission.objects.create(
+            assignment=task, user=student, score=score, is_graded=score is not None
+        )
+
+    def snapshot(self):
+        scores = sorted(CourseScore.objects.values_list('course_id', 'user_id', 'total_score', 'graded_count'))
+        # Триггер оставляет в гистограмме строки с нулём студентов, пересборка — нет
+        counts = sorted(
+            CourseScoreCount.objects.filter(students__gt=0).values_list('course_id', 'total_score', 'students')
+        )
+        return scores, counts
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_course_scores()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_triggers_match_rebuild(self):
+        s0, s1, s2, s3 = self.students
+        a, b, c = self.tasks
+
+        # Оценка и решения без оценки
+        first = self.submit(s0, a, 10)
+        self.submit(s0, b, 5)
+        self.submit(s1, a, 15)
+        pending = self.submit(s2, a)
+        self.submit(s3, c, 0)
+        self.assertMatchesRebuild()
+        self.assertEqual(CourseScore.objects.get(course=self.course, user=s0).total_score, 15)
+
+        # Проверка отложенного решения и переоценка
+        pending.score, pending.is_graded = 8, True
+        pending.save()
+        first.score = 20
+        first.save()
+        self.assertMatchesRebuild()
+
+        # Снятие оценки и пустой балл при is_graded
+        first.is_graded = False
+        first.save()
+        Submission.objects.filter(user=s3, assignment=c).update(score=None)
+        self.assertMatchesRebuild()
+
+        # Перенос решения на задание другого курса и другому студенту
+        moved = Submission.objects.get(user=s1, assignment=a)
+        moved.assignment = self.other_tasks[0]
+        moved.save()
+        Submission.objects.filter(user=s0, assignment=b).update(user=s3)
+        self.assertMatchesRebuild()
+
+        # Удаление: последний зачтённый ответ убирает студента из рейтинга
+        Submission.objects.filter(user=s2).delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(CourseScore.objects.filter(course=self.course, user=s2).exists())
+
+    def test_ranks_with_ties(self):
+        s0, s1, s2, s3 = self.students
+        a, b, _ = self.tasks
+        self.submit(s0, a, 10)
+        self.submit(s1, a, 6)
+        self.submit(s1, b, 4)
+        self.submit(s2, a, 7)
+        self.submit(s3, a)  # без оценки — вне рейтинга
+
+        board = course_leaderboard(self.course.id, s2.id, limit=2)
+        self.assertEqual(board['participants'], 3)
+        self.assertEqual(
+            [(entry['user_id'], entry['rank'], entry['total_score']) for entry in board['top']],
+            [(s0.id, 1, 10), (s1.id, 1, 10)]
+        )
+        # Место вне top-N — по гистограмме: двое выше, значит третье
+        self.assertEqual(board['me']['rank'], 3)
+        self.assertEqual(course_leaderboard(self.course.id, s1.id, limit=10)['me']['rank'], 1)
+        self.assertIsNone(course_leaderboard(self.course.id, s3.id, limit=10)['me'])
+
+        rebuild_course_scores()
+        self.assertEqual(course_leaderboard(self.course.id, s2.id, limit=2), board)
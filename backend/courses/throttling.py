@@ -0,0 +1,112 @@
+# courses/throttling.py
+# Token bucket для auth-эндпоинтов. DRF проверяет throttle до сериализатора,
+# поэтому отклонённый запрос не доходит до хеширования пароля (PBKDF2).
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+
+class LocalTokenBucketStore:
+    """Корзины в памяти процесса — для одного воркера."""
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            # Самые давно не трогавшиеся корзины вытесняются первыми
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / refill_rate
+
+
+class CacheTokenBucketStore:
+    """Корзины в общем кэше Django (Redis/Memcached) — для нескольких воркеров.
+
+    Чтение и запись не атомарны, поэтому при гонке корзина может пропустить
+    на пару запросов больше; для защиты от перебора этого достаточно.
+    """
+
+    def __init__(self):
+        self.cache = caches[settings.AUTH_THROTTLE_CACHE]
+
+    def consume(self, key, capacity, refill_rate):
+        now = time.time()
+        tokens, updated = self.cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # Полная корзина не отличается от отсутствующей — ключ можно отпустить
+        self.cache.set(key, (tokens, now), timeout=int(capacity / refill_rate) + 1)
+        return allowed, 0 if allowed else (1 - tokens) / refill_rate
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(settings.AUTH_THROTTLE_STORE)()
+    return _store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def get_bucket_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        key = self.get_bucket_key(request)
+        if key is None:
+            return True
+
+        capacity, refill_rate = settings.AUTH_THROTTLE_RATES[self.scope]
+        allowed, retry_after = get_store().consume(f'throttle:{self.scope}:{key}', capacity, refill_rate)
+        if not allowed:
+            self.retry_after = retry_after
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    scope = 'auth_ip'
+
+    def get_bucket_key(self, request):
+        # X-Forwarded-For учитывается только с REST_FRAMEWORK['NUM_PROXIES'] > 0:
+        # иначе каждый запрос с новым заголовком получал бы свежую корзину
+        return self.get_ident(request)
+
+
+class AuthEmailThrottle(TokenBucketThrottle):
+    scope = 'auth_email'
+
+    def get_bucket_key(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        # Хеш вместо адреса: ключ короткий и безопасен для memcached
+        return hashlib.sha1(email.strip().lower().encode()).hexdigest()
@@ -0,0 +1,322 @@
+# courses/typeahead.py
+# Подсказки при наборе без похода в базу: префиксный индекс в памяти процесса
+# по опубликованным курсам, преподавателям и категориям. Ключи — нормализованные
+# хвосты названия от начала каждого слова (плюс транслитерация кириллицы),
+# отсортированный список и bisect. Сигналы каталога подменяют снимок индекса
+# исправленной копией и поднимают общую версию в кэше; остальные процессы
+# видят её и пересобираются в фоне. Популярность (число записей) обновляется
+# пересборкой.
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Category, Course, Enrollment, User, UserRole
+
+logger = logging.getLogger(__name__)
+
+INSTRUCTOR_ROLE = 2
+VERSION_KEY = 'typeahead:version'
+MAX_KEY_LENGTH = 64
+# Больше любого символа: верхняя граница диапазона ключей с префиксом
+PREFIX_END = '\U0010ffff'
+# Надбавка к оценке, если совпало начало названия, а не слово в середине
+START_BONUS = 1.0
+
+WORD_RE = re.compile(r'\w+')
+
+TRANSLIT = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'c', 'ч': 'ch', 'ш': 'sh',
+    'щ': 'sch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+
+# Набор не в той раскладке: «gbnjy» -> «питон», «ьфкшф» -> «maria»
+LAYOUT = dict(zip("qwertyuiop[]asdfghjkl;'zxcvbnm,.`", 'йцукенгшщзхъфывапролджэячсмитьбюё'))
+LAYOUT.update({cyr: lat for lat, cyr in LAYOUT.items()})
+
+
+def normalize(text):
+    # casefold + NFKD без диакритики: «Ёлка» и «елка», «Й» и «и» совпадают
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(WORD_RE.findall(text))
+
+
+def has_cyrillic(text):
+    return any('а' <= ch <= 'я' for ch in text)
+
+
+def translit(text):
+    return ''.join(TRANSLIT.get(ch, ch) for ch in text)
+
+
+def spellings(text):
+    """Нормализованное написание и, для кириллицы, его транслитерация."""
+    base = normalize(text)
+    variants = [base] if base else []
+    if has_cyrillic(base):
+        variants.append(translit(base))
+    return variants
+
+
+def query_variants(query):
+    swapped = ''.join(LAYOUT.get(ch, ch) for ch in query.casefold())
+    variants = []
+    for variant in spellings(query) + spellings(swapped):
+        if variant not in variants:
+            variants.append(variant)
+    return variants
+
+
+def label_keys(label):
+    # «Python для начинающих» находится и по «pyt», и по «для нач», и по «nach»
+    keys = set()
+    for variant in spellings(label):
+        words = variant.split(' ')
+        for i in range(len(words)):
+            keys.add((' '.join(words[i:])[:MAX_KEY_LENGTH], i == 0))
+    return keys
+
+
+class Entry:
+    __slots__ = ('kind', 'id', 'label', 'slug', 'popularity', 'keys')
+
+    def __init__(self, kind, obj_id, label, slug, popularity):
+        self.kind = kind
+        self.id = obj_id
+        self.label = label
+        self.slug = slug
+        self.popularity = popularity
+        self.keys = [(key, kind, obj_id, at_start) for key, at_start in label_keys(label)]
+
+    @property
+    def ref(self):
+        return self.kind, self.id
+
+    def as_dict(self):
+        return {'type': self.kind, 'id': self.id, 'label': self.label, 'slug': self.slug}
+
+
+class IndexState:
+    """Снимок индекса. Запросы читают его без блокировки, поэтому после
+    создания он не меняется: пересборка и правки подменяют его целиком."""
+
+    def __init__(self, entries, version, keys=None):
+        self.entries = {entry.ref: entry for entry in entries}
+        if keys is None:
+            keys = sorted(key for entry in self.entries.values() for key in entry.keys)
+        self.keys = keys
+        # Лучшие совпадения для коротких префиксов с длинным диапазоном ключей
+        self.memo = {}
+        self.version = version
+        self.built_at = self.checked_at = time.monotonic()
+
+    def replace(self, kind, obj_id, make_entry):
+        """Новый снимок, где запись (kind, obj_id) заменена на make_entry(old)
+        или удалена, если та вернула None. Ключи копируются, а не пересортировываются."""
+        entries = dict(self.entries)
+        keys = list(self.keys)
+        old = entries.pop((kind, obj_id), None)
+        if old is not None:
+            for key in old.keys:
+                i = bisect_left(keys, key)
+                if i < len(keys) and keys[i] == key:
+                    del keys[i]
+        new = make_entry(old)
+        if new is not None:
+            for key in new.keys:
+                insort(keys, key)
+            entries[new.ref] = new
+        state = IndexState(entries.values(), self.version, keys)
+        # Правка не обновляет популярность: срок плановой пересборки прежний
+        state.built_at, state.checked_at = self.built_at, self.checked_at
+        return state
+
+
+def shared_cache():
+    return caches[settings.TYPEAHEAD_CACHE]
+
+
+def load_entries():
+    popularity = dict(
+        Enrollment.objects.values('course_id').annotate(n=Count('id')).values_list('course_id', 'n')
+    )
+    by_instructor = defaultdict(int)
+    by_category = defaultdict(int)
+    entries = []
+    for course_id, title, slug, instructor_id, category_id in Course.objects.filter(
+        is_published=True
+    ).values_list('id', 'title', 'slug', 'instructor_id', 'category_id').iterator():
+        enrolled = popularity.get(course_id, 0)
+        by_instructor[instructor_id] += enrolled
+        by_category[category_id] += enrolled
+        entries.append(Entry('course', course_id, title, slug, enrolled))
+
+    instructors = User.objects.filter(
+        is_active=True,
+        id__in=UserRole.objects.filter(role_id=INSTRUCTOR_ROLE).values('user_id')
+    ).values_list('id', 'first_name', 'last_name')
+    for user_id, first_name, last_name in instructors.iterator():
+        entries.append(Entry('instructor', user_id, f'{first_name} {last_name}', None, by_instructor[user_id]))
+
+    for category_id, name, slug in Category.objects.values_list('id', 'name', 'slug'):
+        entries.append(Entry('category', category_id, name, slug, by_category[category_id]))
+    return entries
+
+
+class TypeaheadIndex:
+    def __init__(self):
+        self.state = None
+        self.lock = threading.Lock()
+        self.rebuilding = False
+
+    # ----- чтение -----
+    def search(self, query, limit):
+        state = self.current()
+        best = {}
+        for prefix in query_variants(query):
+            for score, ref in self.top(state, prefix):
+                if best.get(ref, -1) < score:
+                    best[ref] = score
+        ranked = heapq.nlargest(limit, best.items(), key=lambda item: item[1])
+        return [state.entries[ref].as_dict() for ref, _ in ranked if ref in state.entries]
+
+    def top(self, state, prefix):
+        keys = state.keys
+        start = bisect_left(keys, (prefix,))
+        end = bisect_left(keys, (prefix + PREFIX_END,), start)
+        large = end - start > settings.TYPEAHEAD_SCAN_LIMIT
+        if large and prefix in state.memo:
+            return state.memo[prefix]
+
+        best = {}
+        entries = state.entries
+        for i in range(start, end):
+            _, kind, obj_id, at_start = keys[i]
+            entry = entries.get((kind, obj_id))
+            if entry is None:
+                continue
+            score = math.log1p(entry.popularity) + (START_BONUS if at_start else 0)
+            if best.get(entry.ref, -1) < score:
+                best[entry.ref] = score
+        result = heapq.nlargest(settings.TYPEAHEAD_MAX_LIMIT, ((score, ref) for ref, score in best.items()))
+        if large:
+            state.memo[prefix] = result
+        return result
+
+    def current(self):
+        """Текущий снимок; первый вызов строит индекс синхронно, дальше
+        устаревший индекс пересобирается в фоне, а запросы читают старый."""
+        state = self.state
+        if state is None:
+            with self.lock:
+                if self.state is None:
+                    self.state = IndexState(load_entries(), shared_cache().get(VERSION_KEY, 0))
+                return self.state
+
+        now = time.monotonic()
+        if now - state.checked_at >= settings.TYPEAHEAD_SYNC_INTERVAL:
+            state.checked_at = now
+            expired = now - state.built_at >= settings.TYPEAHEAD_REBUILD_INTERVAL
+            if expired or shared_cache().get(VERSION_KEY, 0) != state.version:
+                self.rebuild_in_background()
+        return state
+
+    def ensure_built(self):
+        return len(self.current().entries)
+
+    def rebuild_in_background(self):
+        with self.lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+        threading.Thread(target=self.rebuild, name='typeahead-rebuild', daemon=True).start()
+
+    def rebuild(self):
+        try:
+            # Версию читаем до выборки: изменения во время загрузки вызовут ещё одну пересборку
+            version = shared_cache().get(VERSION_KEY, 0)
+            state = IndexState(load_entries(), version)
+            with self.lock:
+                self.state = state
+        except Exception:
+            logger.exception("Не удалось пересобрать индекс подсказок")
+        finally:
+            self.rebuilding = False
+
+    # ----- инкрементальные изменения -----
+    def contains(self, kind, obj_id):
+        state = self.state
+        return state is not None and (kind, obj_id) in state.entries
+
+    def upsert(self, kind, obj_id, label, slug=None):
+        self.apply(kind, obj_id, lambda old: Entry(kind, obj_id, label, slug, old.popularity if old else 0))
+
+    def remove(self, kind, obj_id):
+        self.apply(kind, obj_id, lambda old: None)
+
+    def apply(self, kind, obj_id, make_entry):
+        # Copy-on-write: запросы, уже читающие старый снимок, доиграют по нему
+        with self.lock:
+            state = self.state
+            if state is not None:
+                state = self.state = state.replace(kind, obj_id, make_entry)
+        self.bump_version(state)
+
+    def bump_version(self, state):
+        cache = shared_cache()
+        cache.add(VERSION_KEY, 0, timeout=None)
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            return
+        # Своё изменение уже применено; если между версиями был чужой шаг — пересоберёмся
+        if state is not None and version == state.version + 1:
+            state.version = version
+
+
+typeahead_index = TypeaheadIndex()
+
+
+def sync_course(course, deleted=False):
+    def apply():
+        if course.is_published and not course.is_deleted and not deleted:
+            typeahead_index.upsert('course', course.id, course.title, course.slug)
+        else:
+            typeahead_index.remove('course', course.id)
+    transaction.on_commit(apply)
+
+
+def sync_instructor(user_id, role_changed=False):
+    """Сохранение обычного пользователя индекс не трогает и версию не поднимает."""
+    def apply():
+        row = User.objects.filter(
+            id=user_id,
+            id__in=UserRole.objects.filter(role_id=INSTRUCTOR_ROLE).values('user_id')
+        ).values_list('first_name', 'last_name', 'is_active').first()
+        if row and row[2]:
+            typeahead_index.upsert('instructor', user_id, f'{row[0]} {row[1]}')
+        elif row or role_changed or typeahead_index.contains('instructor', user_id):
+            typeahead_index.remove('instructor', user_id)
+    transaction.on_commit(apply)
+
+
+def sync_category(category, deleted=False):
+    def apply():
+        if deleted:
+            typeahead_index.remove('category', category.id)
+        else:
+            typeahead_index.upsert('category', category.id, category.name, category.slug)
+    transaction.on_commit(apply)
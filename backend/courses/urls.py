@@ -1,7 +1,6 @@
 # courses/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenRefreshView
 from . import views
 
 # Роутер только для ADMIN-эндпоинтов
@@ -22,11 +21,13 @@ urlpatterns = [
     # ===== АУТЕНТИФИКАЦИЯ =====
     path('auth/login/', views.LoginView.as_view(), name='login'),
     path('auth/register/', views.RegisterView.as_view(), name='register'),
-    path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('auth/refresh/', views.RefreshView.as_view(), name='token_refresh'),
+    path('auth/logout-all/', views.LogoutAllView.as_view(), name='logout-all'),
     
     # ===== ПРОФИЛЬ ПОЛЬЗОВАТЕЛЯ =====
     path('profile/', views.ProfileView.as_view(), name='profile'),
     path('profile/enrollments/', views.UserEnrollmentsView.as_view(), name='user-enrollments'),
+    path('profile/dashboard/', views.LearningDashboardView.as_view(), name='learning-dashboard'),
     
     # ===== ПРОФИЛЬ ПРЕПОДАВАТЕЛЯ =====
     path('instructors/<int:pk>/', views.InstructorProfileView.as_view(), name='instructor-profile'),
@@ -35,14 +36,36 @@ urlpatterns = [
     # ===== ГЛАВНАЯ СТРАНИЦА =====
     path('courses/', views.CourseListView.as_view(), name='course-list'),
     
+    # ===== КАТАЛОГ С ФАСЕТАМИ =====
+    path('catalog/', views.CatalogView.as_view(), name='catalog'),
+    
+    # ===== ПАКЕТНАЯ ЗАГРУЗКА (до courses/<slug>/, иначе batch примется за slug) =====
+    path('courses/batch/', views.CourseBatchView.as_view(), name='course-batch'),
+    path('lessons/batch/', views.LessonBatchView.as_view(), name='lesson-batch'),
+    path('instructors/batch/', views.InstructorBatchView.as_view(), name='instructor-batch'),
+    
+    # ===== ПОДСКАЗКИ ПОИСКА =====
+    path('search/typeahead/', views.TypeaheadView.as_view(), name='search-typeahead'),
+    
     # ===== СТРАНИЦА КУРСА =====
     path('courses/<slug:slug>/', views.CourseDetailView.as_view(), name='course-detail'),
     
+    path('courses/<slug:slug>/reviews/', views.CourseReviewsView.as_view(), name='course-reviews'),
+    
     # ===== СТРАНИЦА ОБУЧЕНИЯ (ВНУТРИ КУРСА) =====
     path('courses/<slug:slug>/learning/', views.CourseLearningView.as_view(), name='course-learning'),
     
+    # ===== РЕЙТИНГ СТУДЕНТОВ КУРСА =====
+    path('courses/<slug:slug>/leaderboard/', views.CourseLeaderboardView.as_view(), name='course-leaderboard'),
+    
     # ===== СТРАНИЦА УРОКА =====
     path('lessons/<int:pk>/', views.LessonDetailView.as_view(), name='lesson-detail'),
+    path('lessons/<int:pk>/heartbeat/', views.LessonHeartbeatView.as_view(), name='lesson-heartbeat'),
+    
+    # ===== УВЕДОМЛЕНИЯ =====
+    path('notifications/', views.NotificationListView.as_view(), name='notification-list'),
+    path('notifications/unread-count/', views.NotificationUnreadCountView.as_view(), name='notification-unread-count'),
+    path('notifications/read/', views.NotificationReadView.as_view(), name='notification-read'),
     
     # ===== ОТЗЫВЫ И ОЦЕНКИ =====
     path('ratings/', views.RatingListView.as_view(), name='rating-list'),
@@ -50,6 +73,22 @@ urlpatterns = [
     # ===== ПОКУПКА / ЗАПИСЬ НА КУРС =====
     path('enrollments/', views.EnrollmentCreateView.as_view(), name='enrollment-create'),
     
+    # ===== ОЧЕРЕДЬ ПРОВЕРКИ РЕШЕНИЙ =====
+    path('grading/claim/', views.GradingClaimView.as_view(), name='grading-claim'),
+    path('grading/grade/', views.GradingBulkGradeView.as_view(), name='grading-grade'),
+    
+    # ===== ПРОВЕРКА СЕРТИФИКАТА =====
+    path('certificates/verify/<str:code>/', views.CertificateVerifyView.as_view(), name='certificate-verify'),
+    
+    # ===== ФОНОВЫЕ ЗАДАЧИ =====
+    path('jobs/stats/', views.JobStatsView.as_view(), name='job-stats'),
+    
+    # ===== ПРОФИЛИРОВАНИЕ ЗАПРОСОВ =====
+    path('profiling/token/', views.ProfilingTokenView.as_view(), name='profiling-token'),
+    path('profiling/profiles/', views.ProfileListView.as_view(), name='profiling-list'),
+    path('profiling/profiles/<slug:profile_id>/', views.ProfileDetailView.as_view(), name='profiling-detail'),
+    path('profiling/profiles/<slug:profile_id>/flamegraph/', views.ProfileFlamegraphView.as_view(), name='profiling-flamegraph'),
+    
     # ===== ADMIN-ПАНЕЛЬ =====
     path('admin/', include(admin_router.urls), name='admin-panel'),
 ]
\ No newline at end of file
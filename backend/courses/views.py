@@ -1,51 +1,112 @@
 # courses/views.py
+import json
+
 from rest_framework import viewsets, generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.exceptions import ValidationError
-from django.db.models import Avg, Prefetch
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.conf import settings
+from django.db.models import Avg, Count, Prefetch, Q, prefetch_related_objects
 from django.db import transaction
+from django.http import Http404, HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from .serializers import CustomTokenObtainPairSerializer
+from .serializers import CustomTokenObtainPairSerializer, TokenVersionRefreshSerializer
 from .models import (
     User, Role, Category, Course, Module, Lesson,
-    Payment, Enrollment, Rating, Assignment, Submission, UserRole
+    Payment, Enrollment, Rating, Assignment, Submission, UserRole, Notification
 )
 from .serializers import (
     UserSerializer, RoleSerializer, CategorySerializer, CourseSerializer,
     ModuleSerializer, LessonSerializer, PaymentSerializer, EnrollmentSerializer,
     RatingSerializer, AssignmentSerializer, SubmissionSerializer,
-    RegisterSerializer
+    RegisterSerializer, RatingWithUserSerializer, GradingSubmissionSerializer,
+    GradingClaimSerializer, BulkGradeSerializer, DashboardEnrollmentSerializer,
+    HeartbeatSerializer, TypeaheadSerializer, CatalogQuerySerializer, CatalogCourseSerializer,
+    LeaderboardSerializer, NotificationSerializer, NotificationReadSerializer
 )
-from .permissions import IsAdminOrReadOnly
+from .permissions import IsAdminOrReadOnly, IsInstructor, IsAdmin
+from .grading import claim_submissions, grade_submissions
+from .certificates import verify_certificate
+from .jobs import enqueue, queue_stats
+from .throttling import AuthEmailThrottle, AuthIPThrottle
+from .dashboard import learning_stats
+from .http_cache import ConditionalCatalogMixin, course_tree_rows, instructor_validators
+from .access import LessonAccess
+from .heartbeats import heartbeat_buffer
+from .typeahead import typeahead_index
+from .catalog import catalog_page
+from .leaderboard import course_leaderboard
+from .documents import apply_user_progress, course_detail_queryset, course_documents, document_validators, user_progress
+from .notifications import mark_read, unread_count
+from .authentication import revoke_tokens
+from .profiling import issue_token, list_profile_ids, load_profile, profile_path
 
 # ===== АУТЕНТИФИКАЦИЯ =====
-class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
-    @classmethod
-    def get_token(cls, user):
-        token = super().get_token(user)
-        # Добавляем кастомные поля в токен
-        token['user_id'] = user.id
-        token['email'] = user.email
-        token['roles'] = list(UserRole.objects.filter(user=user).values_list('role_id', flat=True))
-        return token
-
 class LoginView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [AuthIPThrottle, AuthEmailThrottle]
+
+class RefreshView(TokenRefreshView):
+    serializer_class = TokenVersionRefreshSerializer
+
+class LogoutAllView(generics.GenericAPIView):
+    """Отзывает все токены пользователя, включая текущий."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revoke_tokens(request.user.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPThrottle, AuthEmailThrottle]
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        user = serializer.save()
-        # Автоматически добавляем роль студента (role_id=3)
-        UserRole.objects.create(user=user, role_id=3)
-        return user
+        # Роль студента (role_id=3) добавляет RegisterSerializer.create
+        return serializer.save()
+
+def user_progress_context(user, courses):
+    # Пройденные уроки и прогресс по курсам одним запросом на модель,
+    # чтобы сериализаторы не ходили в базу на каждый урок
+    if not user.is_authenticated:
+        return {}
+    lesson_ids = [
+        lesson.id
+        for course in courses
+        for module in course.modules.all()
+        for lesson in module.lessons.all()
+    ]
+    completed, progress = user_progress(user.id, lesson_ids, [course.id for course in courses])
+    return {'completed_lesson_ids': completed, 'enrollment_progress': progress}
+
+class CompiledCourseListMixin:
+    """Список курсов из скомпилированных документов (courses/documents.py):
+    сериализуются только устаревшие документы, пользователю добавляется прогресс.
+
+    get_validators() сохраняет документы, прочитанные для ETag, в self.documents.
+    """
+    documents = None
+
+    def list(self, request, *args, **kwargs):
+        ids = list(self.filter_queryset(self.get_queryset()).values_list('id', flat=True))
+        page = self.paginate_queryset(ids)
+        if page is not None:
+            ids = page
+        documents = self.documents
+        if documents is None:
+            documents = course_documents(course_tree_rows(Course.objects.filter(id__in=ids)))
+        data = [json.loads(documents[course_id][1]) for course_id in ids if course_id in documents]
+        if request.user.is_authenticated:
+            apply_user_progress(request.user, data)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
 
 # ===== ПРОФИЛЬ ПОЛЬЗОВАТЕЛЯ =====
 class ProfileView(generics.RetrieveAPIView):
@@ -65,15 +126,38 @@ class UserEnrollmentsView(generics.ListAPIView):
             status='active'
         ).select_related('course')
 
+class LearningDashboardView(generics.GenericAPIView):
+    serializer_class = DashboardEnrollmentSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Enrollment.objects.filter(
+            user=self.request.user,
+            status='active',
+            course__is_deleted=False
+        ).select_related('course__instructor').order_by('-enrolled_at')
+
+    def get(self, request):
+        # Два запроса независимо от числа курсов: записи с курсами и статистика по урокам
+        enrollments = list(self.get_queryset())
+        stats = learning_stats(request.user.id, [e.course_id for e in enrollments])
+        context = self.get_serializer_context()
+        context['stats'] = stats
+        serializer = self.get_serializer(enrollments, many=True, context=context)
+        return Response(serializer.data)
+
 # ===== ПРОФИЛЬ ПРЕПОДАВАТЕЛЯ =====
-class InstructorProfileView(generics.RetrieveAPIView):
+class InstructorProfileView(ConditionalCatalogMixin, generics.RetrieveAPIView):
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
     def get_object(self):
         return get_object_or_404(User, id=self.kwargs['pk'])
 
-class InstructorCoursesView(generics.ListAPIView):
+    def get_validators(self):
+        return instructor_validators(self.kwargs['pk'])
+
+class InstructorCoursesView(ConditionalCatalogMixin, CompiledCourseListMixin, generics.ListAPIView):
     serializer_class = CourseSerializer
     permission_classes = [AllowAny]
 
@@ -81,14 +165,15 @@ class InstructorCoursesView(generics.ListAPIView):
         instructor_id = self.kwargs['pk']
         return Course.objects.filter(
             instructor_id=instructor_id,
-            is_published=True,
-            is_deleted=False
-        ).annotate(
-            average_rating=Avg('ratings__rating')
-        ).prefetch_related('modules', 'ratings')
+            is_published=True
+        )
+
+    def get_validators(self):
+        validators, self.documents = document_validators(self.filter_queryset(self.get_queryset()), is_list=True)
+        return validators
 
 # ===== ГЛАВНАЯ СТРАНИЦА =====
-class CourseListView(generics.ListAPIView):
+class CourseListView(ConditionalCatalogMixin, CompiledCourseListMixin, generics.ListAPIView):
     serializer_class = CourseSerializer
     permission_classes = [AllowAny]
     filter_backends = [DjangoFilterBackend]
@@ -96,33 +181,107 @@ class CourseListView(generics.ListAPIView):
 
     def get_queryset(self):
         return Course.objects.filter(
-            is_published=True,
-            is_deleted=False
-        ).annotate(
-            average_rating=Avg('ratings__rating')
-        ).prefetch_related(
-            Prefetch('modules', queryset=Module.objects.filter(is_deleted=False).order_by('order_num')[:1]),  # Только первый модуль для превью
-            'instructor'
-        ).order_by('-created_at')[:10]  # Последние 10 курсов
+            is_published=True
+        ).order_by('-created_at')
+
+    def filter_queryset(self, queryset):
+        # Срез только после фильтров: обрезанный queryset фильтровать нельзя
+        return super().filter_queryset(queryset)[:10]  # Последние 10 курсов
+
+    def get_validators(self):
+        validators, self.documents = document_validators(self.filter_queryset(self.get_queryset()), is_list=True)
+        return validators
+
+# ===== КАТАЛОГ С ФАСЕТАМИ =====
+class CatalogView(generics.GenericAPIView):
+    serializer_class = CatalogCourseSerializer
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        query = CatalogQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        page, page_size = params['page'], params.get('page_size', settings.REST_FRAMEWORK['PAGE_SIZE'])
+
+        courses, count, facets = catalog_page(params, params['ordering'], page_size, (page - 1) * page_size)
+        return Response({
+            'count': count,
+            'next': self.page_link(page + 1) if page * page_size < count else None,
+            'previous': self.page_link(page - 1) if page > 1 else None,
+            'results': self.get_serializer(courses, many=True).data,
+            'facets': facets,
+        })
+
+    def page_link(self, page):
+        url = self.request.build_absolute_uri()
+        return remove_query_param(url, 'page') if page == 1 else replace_query_param(url, 'page', page)
 
 # ===== СТРАНИЦА КУРСА =====
-class CourseDetailView(generics.RetrieveAPIView):
+class CourseDetailView(ConditionalCatalogMixin, generics.RetrieveAPIView):
     serializer_class = CourseSerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug'
+    documents = None
+
+    def published(self):
+        return Course.objects.filter(slug=self.kwargs['slug'], is_published=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Ответ — скомпилированный документ курса (courses/documents.py)
+        documents = self.documents
+        if documents is None:
+            rows = course_tree_rows(self.published())
+            documents = course_documents(rows) if rows else {}
+        if not documents:
+            raise Http404
+        version, body = next(iter(documents.values()))
+        if request.user.is_authenticated:
+            response = Response(apply_user_progress(request.user, [json.loads(body)])[0])
+        elif request.accepted_renderer.format == 'json':
+            # Анонимному JSON-клиенту — сохранённые байты без разбора
+            response = HttpResponse(body, content_type='application/json')
+        else:
+            response = Response(json.loads(body))
+        response['X-Course-Version'] = version
+        return response
+
+    def get_validators(self):
+        validators, self.documents = document_validators(self.published(), is_list=False)
+        if not self.documents:
+            return None
+        return validators
+
+# ===== ОТЗЫВЫ О КУРСЕ (С ГИСТОГРАММОЙ) =====
+class CourseReviewsView(generics.ListAPIView):
+    serializer_class = RatingWithUserSerializer
+    permission_classes = [AllowAny]
+
+    def get_course(self):
+        if not hasattr(self, '_course'):
+            self._course = get_object_or_404(Course, slug=self.kwargs['slug'], is_published=True)
+        return self._course
 
     def get_queryset(self):
-        return Course.objects.filter(
-            is_published=True,
-            is_deleted=False
-        ).prefetch_related(
-            Prefetch('modules', queryset=Module.objects.filter(is_deleted=False).order_by('order_num')),
-            Prefetch('ratings', queryset=Rating.objects.select_related('user')),
-            'instructor',
-            'category'
-        ).annotate(
-            average_rating=Avg('ratings__rating')
+        return Rating.objects.filter(
+            course=self.get_course()
+        ).select_related('user').order_by('-created_at', '-id')
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response.data.update(self.rating_histogram())
+        return response
+
+    def rating_histogram(self):
+        # Распределение оценок 1..5 и среднее одним агрегирующим запросом
+        stats = Rating.objects.filter(course=self.get_course()).aggregate(
+            average=Avg('rating'),
+            **{f'stars_{i}': Count('id', filter=Q(rating=i)) for i in range(1, 6)}
         )
+        return {
+            'average_rating': round(stats['average'], 1) if stats['average'] else None,
+            'histogram': {str(i): stats[f'stars_{i}'] for i in range(1, 6)},
+        }
 
 # ===== СТРАНИЦА ОБУЧЕНИЯ (ВНУТРИ КУРСА) =====
 class CourseLearningView(generics.RetrieveAPIView):
@@ -134,11 +293,10 @@ class CourseLearningView(generics.RetrieveAPIView):
         return Course.objects.filter(
             enrollments__user=self.request.user,
             enrollments__status='active',
-            is_published=True,
-            is_deleted=False
+            is_published=True
         ).prefetch_related(
-            Prefetch('modules', queryset=Module.objects.filter(is_deleted=False).order_by('order_num')),
-            Prefetch('modules__lessons', queryset=Lesson.objects.filter(is_deleted=False).order_by('order_num')),
+            Prefetch('modules', queryset=Module.objects.order_by('order_num')),
+            Prefetch('modules__lessons', queryset=Lesson.objects.order_by('order_num')),
             'instructor'
         )
 
@@ -153,42 +311,237 @@ class CourseLearningView(generics.RetrieveAPIView):
             obj.progress_pct = enrollment.progress_pct
         return obj
 
+# ===== РЕЙТИНГ СТУДЕНТОВ КУРСА =====
+class CourseLeaderboardView(generics.GenericAPIView):
+    serializer_class = LeaderboardSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, slug):
+        course = get_object_or_404(Course, slug=slug, is_published=True)
+        user_id = request.user.id
+        is_participant = (
+            course.id in LessonAccess(request.user).course_ids
+            or course.instructor_id == user_id
+            or Enrollment.objects.filter(user_id=user_id, course=course).exists()
+            or UserRole.objects.filter(user_id=user_id, role_id=1).exists()
+        )
+        if not is_participant:
+            return Response({"detail": "Рейтинг доступен участникам курса"}, status=status.HTTP_403_FORBIDDEN)
+
+        query = self.get_serializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        limit = query.validated_data.get('limit', settings.LEADERBOARD_SIZE)
+        return Response({'course': course.slug, **course_leaderboard(course.id, user_id, limit)})
+
 # ===== СТРАНИЦА УРОКА =====
 class LessonDetailView(generics.RetrieveAPIView):
     serializer_class = LessonSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Lesson.objects.filter(
-            is_deleted=False
-        ).prefetch_related(
-            Prefetch('assignment', queryset=Assignment.objects.all()),
-            Prefetch('submissions', queryset=Submission.objects.filter(user=self.request.user))
-        )
+        return Lesson.objects.select_related('module')
 
     def get_object(self):
         lesson = super().get_object()
         # Проверяем, есть ли доступ к уроку
-        enrollment = Enrollment.objects.filter(
-            user=self.request.user,
-            course=lesson.module.course,
-            status='active'
-        ).first()
-        
-        if not enrollment:
+        error = LessonAccess(self.request.user).error(lesson)
+        if error:
+            raise ValidationError(error)
+        # Задания подгружаются только для урока, к которому есть доступ
+        prefetch_related_objects([lesson], 'assignments')
+        return lesson
+
+class LessonHeartbeatView(generics.GenericAPIView):
+    serializer_class = HeartbeatSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        enrollment_id = heartbeat_buffer.enrollment_id(request.user.id, pk)
+        if enrollment_id is None:
             raise ValidationError("Вы не записаны на этот курс")
-        
-        # Если урок заблокирован и пользователь не завершил предыдущие уроки
-        if lesson.is_locked:
-            completed_lessons = Submission.objects.filter(
-                user=self.request.user,
-                assignment__lesson__module=lesson.module,
+
+        # Запись в базу делает фоновый поток пачкой — отвечаем сразу
+        accepted = heartbeat_buffer.add(
+            request.user.id, pk, enrollment_id, serializer.validated_data['position_sec']
+        )
+        if not accepted:
+            return Response(
+                {'detail': "Сервер перегружен, повторите позже"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(settings.HEARTBEAT_FLUSH_INTERVAL)}
+            )
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+# ===== ПОДСКАЗКИ ПОИСКА =====
+class TypeaheadView(generics.GenericAPIView):
+    serializer_class = TypeaheadSerializer
+    permission_classes = [AllowAny]
+    # Ответ одинаков для всех: разбор JWT на каждое нажатие клавиши не нужен
+    authentication_classes = []
+
+    def get(self, request):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data['q']
+        limit = serializer.validated_data.get('limit', settings.TYPEAHEAD_LIMIT)
+        results = typeahead_index.search(query, limit) if query.strip() else []
+        return Response({'query': query, 'results': results})
+
+# ===== ПАКЕТНАЯ ЗАГРУЗКА =====
+class BatchRetrieveView(generics.GenericAPIView):
+    """Несколько объектов за один запрос: ?<batch_param>=a,b,c.
+
+    Один IN-запрос на модель и общий контекст сериализатора. Ответ —
+    {"results": {ключ: объект}, "errors": {ключ: сообщение}}: отсутствующий
+    или недоступный объект не роняет весь пакет.
+    """
+    batch_param = None
+    lookup_field = 'pk'
+    not_found_message = "Не найдено"
+
+    def parse_key(self, raw):
+        return raw
+
+    def get_keys(self):
+        raw = self.request.query_params.get(self.batch_param, '')
+        keys = list(dict.fromkeys(part.strip() for part in raw.split(',') if part.strip()))
+        if not keys:
+            raise ValidationError({self.batch_param: "Укажите хотя бы один идентификатор"})
+        if len(keys) > settings.BATCH_MAX_ITEMS:
+            raise ValidationError({
+                self.batch_param: f"Не больше {settings.BATCH_MAX_ITEMS} идентификаторов за запрос"
+            })
+        return keys
+
+    def prepare_batch(self, objects):
+        pass
+
+    def get_item_error(self, obj):
+        return None
+
+    def get_batch_context(self, objects):
+        return {}
+
+    def get(self, request):
+        errors = {}
+        lookups = {}
+        for raw in self.get_keys():
+            try:
+                lookups[self.parse_key(raw)] = raw
+            except (TypeError, ValueError):
+                errors[raw] = "Некорректный идентификатор"
+
+        found = {}
+        if lookups:
+            queryset = self.get_queryset().filter(**{f'{self.lookup_field}__in': list(lookups)})
+            found = {getattr(obj, self.lookup_field): obj for obj in queryset}
+
+        objects = []
+        for lookup, raw in lookups.items():
+            obj = found.get(lookup)
+            if obj is None:
+                errors[raw] = self.not_found_message
+            else:
+                objects.append((raw, obj))
+
+        self.prepare_batch([obj for _, obj in objects])
+        allowed = []
+        for raw, obj in objects:
+            error = self.get_item_error(obj)
+            if error:
+                errors[raw] = error
+            else:
+                allowed.append((raw, obj))
+
+        context = self.get_serializer_context()
+        context.update(self.get_batch_context([obj for _, obj in allowed]))
+        serializer = self.get_serializer([obj for _, obj in allowed], many=True, context=context)
+        results = {raw: data for (raw, _), data in zip(allowed, serializer.data)}
+        return Response({'results': results, 'errors': errors})
+
+class CourseBatchView(BatchRetrieveView):
+    serializer_class = CourseSerializer
+    permission_classes = [AllowAny]
+    batch_param = 'slugs'
+    lookup_field = 'slug'
+    not_found_message = "Курс не найден"
+
+    def get_queryset(self):
+        return course_detail_queryset()
+
+    def get_batch_context(self, objects):
+        return user_progress_context(self.request.user, objects)
+
+class LessonBatchView(BatchRetrieveView):
+    serializer_class = LessonSerializer
+    permission_classes = [IsAuthenticated]
+    batch_param = 'ids'
+    not_found_message = "Урок не найден"
+
+    def parse_key(self, raw):
+        return int(raw)
+
+    def get_queryset(self):
+        return Lesson.objects.select_related('module').prefetch_related('assignments')
+
+    def prepare_batch(self, objects):
+        # Те же проверки, что в LessonDetailView, по одной карте доступа на пакет
+        self.access = LessonAccess(self.request.user)
+
+    def get_item_error(self, obj):
+        return self.access.error(obj)
+
+    def get_batch_context(self, objects):
+        completed = set(
+            Submission.objects.filter(
+                user_id=self.request.user.id,
+                assignment__lesson_id__in=[lesson.id for lesson in objects],
                 is_graded=True
-            ).count()
-            if completed_lessons < lesson.order_num - 1:
-                raise ValidationError("Сначала завершите предыдущие уроки")
-        
-        return lesson
+            ).values_list('assignment__lesson_id', flat=True)
+        ) if objects else set()
+        return {'completed_lesson_ids': completed}
+
+class InstructorBatchView(BatchRetrieveView):
+    serializer_class = UserSerializer
+    permission_classes = [AllowAny]
+    batch_param = 'ids'
+    not_found_message = "Преподаватель не найден"
+
+    def parse_key(self, raw):
+        return int(raw)
+
+    def get_queryset(self):
+        return User.objects.all()
+
+# ===== УВЕДОМЛЕНИЯ =====
+class NotificationListView(generics.ListAPIView):
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        notifications = Notification.objects.filter(user_id=self.request.user.id)
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            notifications = notifications.filter(read_at__isnull=True)
+        return notifications.order_by('-id')
+
+class NotificationUnreadCountView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'unread': unread_count(request.user.id)})
+
+class NotificationReadView(generics.GenericAPIView):
+    serializer_class = NotificationReadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        marked = mark_read(request.user.id, serializer.validated_data.get('ids'))
+        return Response({'marked': marked, 'unread': unread_count(request.user.id)})
 
 # ===== ОТЗЫВЫ И ОЦЕНКИ =====
 class RatingListView(generics.ListCreateAPIView):
@@ -197,7 +550,11 @@ class RatingListView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         course_id = self.request.query_params.get('course_id')
-        return Rating.objects.filter(course_id=course_id).select_related('user')
+        # Менеджер по умолчанию не действует на JOIN — удалённые курсы отсекаем явно
+        return Rating.objects.filter(
+            course_id=course_id,
+            course__is_deleted=False
+        ).select_related('user')
 
     def perform_create(self, serializer):
         course = serializer.validated_data['course']
@@ -234,16 +591,98 @@ class EnrollmentCreateView(generics.CreateAPIView):
             progress_pct=0
         )
         
-        # Создаем платёж
-        Payment.objects.create(
-            user=user,
-            course=course,
-            amount=course.price,
-            status='completed'
-        )
+        # Платёж создаётся фоновой задачей; она в той же транзакции, что и запись
+        enqueue('enrollment.create_payment', enrollment_id=enrollment.id)
         
         return enrollment
 
+# ===== ОЧЕРЕДЬ ПРОВЕРКИ РЕШЕНИЙ =====
+class GradingClaimView(generics.GenericAPIView):
+    serializer_class = GradingClaimSerializer
+    permission_classes = [IsAuthenticated, IsInstructor]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        submissions = claim_submissions(request.user, serializer.validated_data['limit'])
+        return Response(GradingSubmissionSerializer(submissions, many=True).data)
+
+class GradingBulkGradeView(generics.GenericAPIView):
+    serializer_class = BulkGradeSerializer
+    permission_classes = [IsAuthenticated, IsInstructor]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = grade_submissions(request.user, serializer.validated_data['grades'])
+        return Response(result)
+
+# ===== ПРОВЕРКА СЕРТИФИКАТА =====
+class CertificateVerifyView(generics.GenericAPIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request, code):
+        data = verify_certificate(code)
+        if data is None:
+            return Response({'detail': "Сертификат не найден"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+
+# ===== ФОНОВЫЕ ЗАДАЧИ =====
+class JobStatsView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return Response(queue_stats())
+
+# ===== ПРОФИЛИРОВАНИЕ ЗАПРОСОВ =====
+class ProfilingTokenView(generics.GenericAPIView):
+    """Токен для заголовка X-Profile-Token или параметра ?_profile=."""
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def post(self, request):
+        return Response({
+            'token': issue_token(request.user.id),
+            'expires_in': settings.PROFILING_TOKEN_MAX_AGE,
+        })
+
+class ProfileListView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
+    summary_fields = ('id', 'method', 'path', 'status', 'user_id', 'started_at', 'duration_ms', 'phases_ms')
+
+    def get(self, request):
+        results = []
+        for profile_id in list_profile_ids():
+            profile = load_profile(profile_id)
+            if profile is not None:
+                summary = {name: profile.get(name) for name in self.summary_fields}
+                summary['sql_count'] = profile['sql']['count']
+                results.append(summary)
+        return Response(results)
+
+class ProfileDetailView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request, profile_id):
+        profile = load_profile(profile_id)
+        if profile is None:
+            return Response({'detail': "Профиль не найден"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(profile)
+
+class ProfileFlamegraphView(generics.GenericAPIView):
+    """Свёрнутые стеки: flamegraph.pl, speedscope.app, inferno."""
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request, profile_id):
+        try:
+            with open(profile_path(profile_id, '.folded'), encoding='utf-8') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return Response({'detail': "Профиль не найден"}, status=status.HTTP_404_NOT_FOUND)
+        response = HttpResponse(content, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{profile_id}.folded"'
+        return response
+
 # ===== ADMIN-ЭНДПОИНТЫ =====
 class AdminUserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
@@ -0,0 +1,138 @@
+# courses/warmup.py
+# Прогрев процесса при загрузке wsgi/asgi, до первого живого запроса:
+# резолвер URL, поля сериализаторов, хешеры паролей, кэши, индекс подсказок
+# и «холостые» запросы к горячим эндпоинтам. Соединения с базой после прогрева закрываются, чтобы
+# при gunicorn --preload воркеры не унаследовали общий сокет; каждый воркер
+# открывает своё соединение сразу после fork.
+import inspect
+import io
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def build_resolver():
+    from django.urls import get_resolver
+    # reverse_dict компилирует регулярные выражения всех маршрутов
+    get_resolver().reverse_dict
+    return len(get_resolver().url_patterns)
+
+
+def build_serializers():
+    from rest_framework.serializers import BaseSerializer
+    from courses import serializers
+
+    built = 0
+    for _, cls in inspect.getmembers(serializers, inspect.isclass):
+        if not issubclass(cls, BaseSerializer) or cls.__module__ != serializers.__name__:
+            continue
+        cls().fields
+        built += 1
+    return built
+
+
+def prime_caches():
+    from django.contrib.auth.hashers import get_hashers
+    from django.contrib.contenttypes.models import ContentType
+    from django.apps import apps
+    from rest_framework.settings import api_settings
+    from rest_framework_simplejwt.settings import api_settings as jwt_settings
+    from courses.throttling import get_store
+
+    get_hashers()
+    get_store()
+    # Ленивые настройки DRF/simplejwt импортируют классы при первом обращении
+    for name in ('DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES',
+                 'DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES'):
+        getattr(api_settings, name)
+    jwt_settings.AUTH_TOKEN_CLASSES
+    ContentType.objects.get_for_models(*apps.get_models())
+
+
+def build_typeahead():
+    # Индекс строится до fork: воркеры получают его готовым
+    from courses.typeahead import typeahead_index
+    return typeahead_index.ensure_built()
+
+
+def warm_requests():
+    # WSGIRequest собирается вручную: django.test тянет за собой лишние импорты
+    from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+
+    host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+    handler = WSGIHandler()
+    statuses = {}
+    for url in settings.WARMUP_URLS:
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': url,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': '',
+            'SERVER_NAME': host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': host,
+            'wsgi.input': io.BytesIO(),
+            'wsgi.url_scheme': 'http',
+        })
+        statuses[url] = handler.get_response(request).status_code
+    return statuses
+
+
+def connect_databases():
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def _after_fork_in_child():
+    try:
+        connect_databases()
+    except Exception:
+        logger.warning("Не удалось открыть соединение с базой после fork", exc_info=True)
+
+
+PHASES = [
+    ('resolver', build_resolver),
+    ('serializers', build_serializers),
+    ('caches', prime_caches),
+    ('typeahead', build_typeahead),
+    ('requests', warm_requests),
+]
+
+_registered_fork_hook = False
+
+
+def warmup():
+    """Прогревает процесс; возвращает {фаза: (мс, результат)}.
+
+    Ошибки фаз только логируются: недоступная при старте база не должна
+    мешать воркеру подняться.
+    """
+    global _registered_fork_hook
+    if not settings.WARMUP_ENABLED:
+        return {}
+
+    timings = {}
+    for name, phase in PHASES:
+        started = time.perf_counter()
+        try:
+            result = phase()
+        except Exception as error:
+            logger.warning("Прогрев: фаза %s завершилась ошибкой", name, exc_info=True)
+            result = repr(error)
+        timings[name] = (round((time.perf_counter() - started) * 1000, 1), result)
+    connections.close_all()
+
+    if not _registered_fork_hook:
+        # Хук срабатывает и при multiprocessing-fork, поэтому регистрируется только
+        # из wsgi/asgi, а не в management-командах
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+        _registered_fork_hook = True
+
+    logger.info("Прогрев завершён: %s", timings)
+    return timings
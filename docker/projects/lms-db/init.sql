@@ -1,6 +1,9 @@
 -- Кодировка (обязательно для русского текста)
 SET client_encoding = 'UTF8';
 
+-- Триграммные индексы для поиска подстрок (админка)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- =============================
 -- 1. ПОЛЬЗОВАТЕЛИ
 -- =============================
@@ -13,6 +16,7 @@ CREATE TABLE users (
     phone VARCHAR(20) NOT NULL,
     avatar_url VARCHAR(500),
     is_active BOOLEAN DEFAULT true,
+    token_version INT NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -60,6 +64,7 @@ CREATE TABLE courses (
     price DECIMAL(10,2) NOT NULL CHECK (price >= 0),
     is_published BOOLEAN DEFAULT true,
     is_deleted BOOLEAN DEFAULT false,
+    deleted_at TIMESTAMP,
     thumbnail_url VARCHAR(500),
     duration_hours INT CHECK (duration_hours >= 0),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -75,7 +80,9 @@ CREATE TABLE modules (
     title VARCHAR(255) NOT NULL,
     description TEXT,
     is_deleted BOOLEAN DEFAULT false,
+    deleted_at TIMESTAMP,
     order_num INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE (course_id, order_num)
 );
 
@@ -89,17 +96,19 @@ CREATE TABLE lessons (
     content TEXT,
     video_url VARCHAR(500),
     is_deleted BOOLEAN DEFAULT false,
+    deleted_at TIMESTAMP,
     order_num INT NOT NULL DEFAULT 0,
     is_locked BOOLEAN DEFAULT false,
     duration_min INT CHECK (duration_min >= 0),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE (module_id, order_num)
 );
 
 -- =============================
--- 8. ПЛАТЕЖИ
+-- 8. ПЛАТЕЖИ (секции по месяцам paid_at, см. раздел 18)
 -- =============================
 CREATE TABLE payments (
-    id BIGSERIAL PRIMARY KEY,
+    id BIGSERIAL,
     user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     course_id BIGINT NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
     amount DECIMAL(10,2) NOT NULL CHECK (amount > 0),
@@ -107,8 +116,10 @@ CREATE TABLE payments (
     payment_method VARCHAR(50) NOT NULL,
     status VARCHAR(20) NOT NULL DEFAULT 'completed' CHECK (status IN ('pending', 'completed', 'failed', 'refunded')),
     transaction_id VARCHAR(255),
-    paid_at TIMESTAMP
-);
+    paid_at TIMESTAMP,
+    -- Уникальный ключ секционированной таблицы обязан включать ключ секционирования
+    UNIQUE (id, paid_at)
+) PARTITION BY RANGE (paid_at);
 
 -- =============================
 -- 9. ЗАПИСИ НА КУРСЫ
@@ -117,7 +128,9 @@ CREATE TABLE enrollments (
     id BIGSERIAL PRIMARY KEY,
     user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     course_id BIGINT NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
-    payment_id BIGINT REFERENCES payments(id) ON DELETE SET NULL,
+    -- Внешний ключ на секционированную payments(id) невозможен,
+    -- ON DELETE SET NULL выполняет триггер clear_enrollment_payment
+    payment_id BIGINT,
     enrolled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     completed_at TIMESTAMP,
     progress_pct SMALLINT DEFAULT 0 CHECK (progress_pct BETWEEN 0 AND 100),
@@ -135,6 +148,7 @@ CREATE TABLE ratings (
     rating SMALLINT NOT NULL CHECK (rating BETWEEN 1 AND 5),
     comment TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE (user_id, course_id)
 );
 
@@ -148,14 +162,15 @@ CREATE TABLE assignments (
     description TEXT,
     due_date TIMESTAMP,
     max_score INT NOT NULL CHECK (max_score > 0),
-    is_required BOOLEAN DEFAULT true
+    is_required BOOLEAN DEFAULT true,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- =============================
--- 12. РЕШЕНИЯ
+-- 12. РЕШЕНИЯ (секции по месяцам submitted_at, см. раздел 18)
 -- =============================
 CREATE TABLE submissions (
-    id BIGSERIAL PRIMARY KEY,
+    id BIGSERIAL,
     assignment_id BIGINT NOT NULL REFERENCES assignments(id) ON DELETE CASCADE,
     user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -164,8 +179,11 @@ CREATE TABLE submissions (
     score INT CHECK (score >= 0),
     feedback TEXT,
     is_graded BOOLEAN DEFAULT false,
-    UNIQUE (assignment_id, user_id)
-);
+    grader_id BIGINT REFERENCES users(id) ON DELETE SET NULL,
+    lease_expires_at TIMESTAMP,
+    -- Одно решение на задание проверяет триггер check_submission_unique
+    UNIQUE (id, submitted_at)
+) PARTITION BY RANGE (submitted_at);
 
 -- =============================
 -- 13. СЕРТИФИКАТЫ
@@ -192,6 +210,7 @@ CREATE TABLE comments (
     content TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     is_deleted BOOLEAN DEFAULT false,
+    deleted_at TIMESTAMP,
     CONSTRAINT chk_comment_target
         CHECK (
             (lesson_id IS NOT NULL AND course_id IS NOT NULL) OR
@@ -199,6 +218,132 @@ CREATE TABLE comments (
         )
 );
 
+-- =============================
+-- 15. ФОНОВЫЕ ЗАДАЧИ (transactional outbox)
+-- =============================
+CREATE TABLE jobs (
+    id BIGSERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'failed')),
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 5,
+    run_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_until TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- =============================
+-- 16. АРХИВ УДАЛЁННЫХ СТРОК (manage.py archive_deleted)
+-- =============================
+CREATE TABLE courses_archive (LIKE courses INCLUDING DEFAULTS, archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE modules_archive (LIKE modules INCLUDING DEFAULTS, archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE lessons_archive (LIKE lessons INCLUDING DEFAULTS, archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE comments_archive (LIKE comments INCLUDING DEFAULTS, archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP);
+
+-- =============================
+-- 17. ПРОГРЕСС ПРОСМОТРА УРОКОВ (heartbeat, пишется пачками)
+-- =============================
+CREATE TABLE lesson_progress (
+    id BIGSERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    lesson_id BIGINT NOT NULL REFERENCES lessons(id) ON DELETE CASCADE,
+    enrollment_id BIGINT NOT NULL REFERENCES enrollments(id) ON DELETE CASCADE,
+    position_sec INT NOT NULL DEFAULT 0 CHECK (position_sec >= 0),
+    max_position_sec INT NOT NULL DEFAULT 0 CHECK (max_position_sec >= 0),
+    heartbeats INT NOT NULL DEFAULT 0,
+    last_seen_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, lesson_id)
+);
+
+-- =============================
+-- 18. ПОМЕСЯЧНЫЕ СЕКЦИИ payments И submissions
+-- Новые месяцы добавляет manage.py partitions ensure (раз в месяц по cron),
+-- старые отсоединяет manage.py partitions detach
+-- =============================
+DO $$
+DECLARE
+    parent TEXT;
+    month DATE;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['payments', 'submissions'] LOOP
+        -- Строки без даты и вне созданных месяцев
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', parent || '_default', parent);
+        FOR month IN
+            SELECT generate_series(DATE '2025-01-01', date_trunc('month', now()) + INTERVAL '3 months', INTERVAL '1 month')
+        LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                parent || to_char(month, '"_y"YYYY"m"MM'), parent, month, month + INTERVAL '1 month'
+            );
+        END LOOP;
+    END LOOP;
+END $$;
+
+-- =============================
+-- 19. СВОДКА ОЦЕНОК КУРСА (для фильтра каталога по рейтингу, ведёт триггер на ratings)
+-- =============================
+CREATE TABLE course_rating_stats (
+    course_id BIGINT PRIMARY KEY REFERENCES courses(id) ON DELETE CASCADE,
+    ratings_count INT NOT NULL DEFAULT 0 CHECK (ratings_count >= 0),
+    ratings_sum INT NOT NULL DEFAULT 0 CHECK (ratings_sum >= 0),
+    rating_avg NUMERIC(3,2) GENERATED ALWAYS AS (
+        CASE WHEN ratings_count > 0 THEN ROUND(ratings_sum::numeric / ratings_count, 2) END
+    ) STORED
+);
+
+-- =============================
+-- 20. РЕЙТИНГ СТУДЕНТОВ КУРСА (баллы за проверенные решения, ведут триггеры на submissions)
+-- =============================
+CREATE TABLE course_scores (
+    id BIGSERIAL PRIMARY KEY,
+    course_id BIGINT NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    total_score INT NOT NULL DEFAULT 0,
+    graded_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (course_id, user_id)
+);
+
+-- Сколько студентов курса набрали ровно total_score: место = 1 + студенты с баллом выше,
+-- сумма по различным баллам, а не по всем студентам
+CREATE TABLE course_score_counts (
+    id BIGSERIAL PRIMARY KEY,
+    course_id BIGINT NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    total_score INT NOT NULL,
+    students INT NOT NULL DEFAULT 0 CHECK (students >= 0),
+    UNIQUE (course_id, total_score)
+);
+
+-- =============================
+-- 21. УВЕДОМЛЕНИЯ (рассылка по курсу пачками INSERT ... SELECT из enrollments)
+-- =============================
+CREATE TABLE notifications (
+    id BIGSERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    course_id BIGINT REFERENCES courses(id) ON DELETE CASCADE,
+    kind VARCHAR(30) NOT NULL CHECK (kind IN ('lesson_published', 'assignment_published', 'submission_graded')),
+    object_id BIGINT NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    read_at TIMESTAMP,
+    -- Повтор задачи рассылки или оценки не создаёт второе уведомление
+    UNIQUE (user_id, kind, object_id)
+);
+
+-- =============================
+-- 22. СКОМПИЛИРОВАННЫЕ ДОКУМЕНТЫ КУРСОВ (готовый JSON страницы курса, courses/documents.py)
+-- =============================
+CREATE TABLE course_documents (
+    course_id BIGINT PRIMARY KEY REFERENCES courses(id) ON DELETE CASCADE,
+    version INT NOT NULL DEFAULT 1,
+    source_state VARCHAR(32) NOT NULL,
+    body TEXT NOT NULL,
+    compiled_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
 -- =============================
 -- ФУНКЦИЯ И ТРИГГЕРЫ ДЛЯ updated_at
 -- =============================
@@ -218,6 +363,219 @@ CREATE TRIGGER update_courses_updated_at
     BEFORE UPDATE ON courses
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_modules_updated_at
+    BEFORE UPDATE ON modules
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_lessons_updated_at
+    BEFORE UPDATE ON lessons
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_ratings_updated_at
+    BEFORE UPDATE ON ratings
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- updated_at заданий входит в ETag курса: правка через QuerySet.update() или SQL тоже его меняет
+CREATE TRIGGER update_assignments_updated_at
+    BEFORE UPDATE ON assignments
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- =============================
+-- ФУНКЦИЯ И ТРИГГЕРЫ ДЛЯ deleted_at
+-- =============================
+CREATE OR REPLACE FUNCTION set_deleted_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NOT COALESCE(NEW.is_deleted, false) THEN
+        NEW.deleted_at = NULL;
+    ELSIF TG_OP = 'UPDATE' AND OLD.is_deleted THEN
+        NEW.deleted_at = COALESCE(OLD.deleted_at, NOW());
+    ELSE
+        NEW.deleted_at = COALESCE(NEW.deleted_at, NOW());
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER set_courses_deleted_at
+    BEFORE INSERT OR UPDATE ON courses
+    FOR EACH ROW EXECUTE FUNCTION set_deleted_at_column();
+
+CREATE TRIGGER set_modules_deleted_at
+    BEFORE INSERT OR UPDATE ON modules
+    FOR EACH ROW EXECUTE FUNCTION set_deleted_at_column();
+
+CREATE TRIGGER set_lessons_deleted_at
+    BEFORE INSERT OR UPDATE ON lessons
+    FOR EACH ROW EXECUTE FUNCTION set_deleted_at_column();
+
+CREATE TRIGGER set_comments_deleted_at
+    BEFORE INSERT OR UPDATE ON comments
+    FOR EACH ROW EXECUTE FUNCTION set_deleted_at_column();
+
+-- =============================
+-- ЦЕЛОСТНОСТЬ СЕКЦИОНИРОВАННЫХ ТАБЛИЦ (то же создаёт courses/partitioning.py)
+-- =============================
+CREATE OR REPLACE FUNCTION clear_enrollment_payment()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE enrollments SET payment_id = NULL WHERE payment_id = OLD.id;
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER clear_enrollment_payment_on_delete
+    AFTER DELETE ON payments
+    FOR EACH ROW EXECUTE FUNCTION clear_enrollment_payment();
+
+CREATE OR REPLACE FUNCTION check_submission_unique()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('submissions'), hashtext(NEW.assignment_id || ':' || NEW.user_id));
+    IF EXISTS (
+        SELECT 1 FROM submissions
+        WHERE assignment_id = NEW.assignment_id AND user_id = NEW.user_id
+          AND (TG_OP = 'INSERT' OR id <> NEW.id)
+    ) THEN
+        RAISE EXCEPTION 'Решение по этому заданию уже отправлено'
+            USING ERRCODE = 'unique_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER check_submission_unique_on_write
+    BEFORE INSERT OR UPDATE OF assignment_id, user_id ON submissions
+    FOR EACH ROW EXECUTE FUNCTION check_submission_unique();
+
+-- =============================
+-- СВОДКА ОЦЕНОК КУРСА (course_rating_stats)
+-- =============================
+CREATE OR REPLACE FUNCTION refresh_course_rating_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE course_rating_stats
+        SET ratings_count = ratings_count - 1, ratings_sum = ratings_sum - OLD.rating
+        WHERE course_id = OLD.course_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO course_rating_stats AS s (course_id, ratings_count, ratings_sum)
+        VALUES (NEW.course_id, 1, NEW.rating)
+        ON CONFLICT (course_id) DO UPDATE SET
+            ratings_count = s.ratings_count + 1,
+            ratings_sum = s.ratings_sum + EXCLUDED.ratings_sum;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER refresh_course_rating_stats_on_write
+    AFTER INSERT OR UPDATE OF course_id, rating OR DELETE ON ratings
+    FOR EACH ROW EXECUTE FUNCTION refresh_course_rating_stats();
+
+-- =============================
+-- РЕЙТИНГ СТУДЕНТОВ КУРСА (course_scores, course_score_counts)
+-- Триггер на submissions создаёт и courses/partitioning.py при переводе таблицы в секции
+-- =============================
+CREATE OR REPLACE FUNCTION add_course_score(p_assignment BIGINT, p_user BIGINT, p_points INT, p_graded INT)
+RETURNS VOID AS $$
+DECLARE
+    v_course BIGINT;
+BEGIN
+    IF p_points = 0 AND p_graded = 0 THEN
+        RETURN;
+    END IF;
+    -- При каскадном удалении курса или пользователя их строки уже не видны:
+    -- рейтинг удаляется вместе с ними, пересчитывать нечего
+    SELECT m.course_id INTO v_course
+    FROM assignments a
+    JOIN lessons l ON l.id = a.lesson_id
+    JOIN modules m ON m.id = l.module_id
+    JOIN courses c ON c.id = m.course_id
+    JOIN users u ON u.id = p_user
+    WHERE a.id = p_assignment;
+    IF v_course IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO course_scores AS cs (course_id, user_id, total_score, graded_count)
+    VALUES (v_course, p_user, p_points, p_graded)
+    ON CONFLICT (course_id, user_id) DO UPDATE SET
+        total_score = cs.total_score + EXCLUDED.total_score,
+        graded_count = cs.graded_count + EXCLUDED.graded_count,
+        updated_at = NOW();
+    IF p_graded < 0 THEN
+        DELETE FROM course_scores WHERE course_id = v_course AND user_id = p_user AND graded_count <= 0;
+    END IF;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION refresh_course_scores()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_points INT := 0;
+    old_graded INT := 0;
+    new_points INT := 0;
+    new_graded INT := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.is_graded THEN
+        old_points := COALESCE(OLD.score, 0);
+        old_graded := 1;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.is_graded THEN
+        new_points := COALESCE(NEW.score, 0);
+        new_graded := 1;
+    END IF;
+
+    -- Переоценка того же решения — одна поправка на разницу
+    IF TG_OP = 'UPDATE' AND OLD.assignment_id = NEW.assignment_id AND OLD.user_id = NEW.user_id THEN
+        PERFORM add_course_score(NEW.assignment_id, NEW.user_id, new_points - old_points, new_graded - old_graded);
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM add_course_score(OLD.assignment_id, OLD.user_id, -old_points, -old_graded);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM add_course_score(NEW.assignment_id, NEW.user_id, new_points, new_graded);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER refresh_course_scores_on_write
+    AFTER INSERT OR UPDATE OF assignment_id, user_id, score, is_graded OR DELETE ON submissions
+    FOR EACH ROW EXECUTE FUNCTION refresh_course_scores();
+
+CREATE OR REPLACE FUNCTION refresh_course_score_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.total_score = NEW.total_score THEN
+        RETURN NULL;
+    END IF;
+    -- Строки гистограммы блокируются по возрастанию балла: встречные
+    -- переоценки в параллельных транзакциях не взаимоблокируются
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.total_score < NEW.total_score) THEN
+        UPDATE course_score_counts SET students = students - 1
+        WHERE course_id = OLD.course_id AND total_score = OLD.total_score;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO course_score_counts AS h (course_id, total_score, students)
+        VALUES (NEW.course_id, NEW.total_score, 1)
+        ON CONFLICT (course_id, total_score) DO UPDATE SET students = h.students + 1;
+    END IF;
+    IF TG_OP = 'UPDATE' AND OLD.total_score > NEW.total_score THEN
+        UPDATE course_score_counts SET students = students - 1
+        WHERE course_id = OLD.course_id AND total_score = OLD.total_score;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER refresh_course_score_counts_on_write
+    AFTER INSERT OR UPDATE OF total_score OR DELETE ON course_scores
+    FOR EACH ROW EXECUTE FUNCTION refresh_course_score_counts();
+
 -- =============================
 -- ИНДЕКСЫ
 -- =============================
@@ -232,7 +590,69 @@ CREATE INDEX idx_payments_status ON payments(status);
 CREATE INDEX idx_comments_course ON comments(course_id);
 CREATE INDEX idx_comments_lesson ON comments(lesson_id);
 CREATE INDEX idx_comments_parent ON comments(parent_id);
+CREATE INDEX idx_assignments_lesson ON assignments(lesson_id);
 CREATE INDEX idx_categories_slug ON categories(slug);
+CREATE INDEX idx_ratings_course_created ON ratings(course_id, created_at DESC, id DESC);
+CREATE INDEX idx_submissions_user ON submissions(user_id, submitted_at);
+CREATE INDEX idx_submissions_assignment_user ON submissions(assignment_id, user_id);
+CREATE INDEX idx_submissions_ungraded ON submissions(submitted_at, id) WHERE is_graded = false;
+CREATE INDEX idx_jobs_ready ON jobs(run_at, id) WHERE status IN ('pending', 'running');
+CREATE INDEX idx_lesson_progress_enrollment ON lesson_progress(enrollment_id);
+
+-- Частичные индексы только по живым строкам (is_deleted = false)
+CREATE INDEX idx_courses_live_created ON courses(created_at DESC) WHERE is_deleted = false AND is_published = true;
+CREATE INDEX idx_courses_live_category ON courses(category_id) WHERE is_deleted = false;
+CREATE INDEX idx_courses_live_instructor ON courses(instructor_id) WHERE is_deleted = false;
+CREATE INDEX idx_modules_live_course ON modules(course_id, order_num) WHERE is_deleted = false;
+CREATE INDEX idx_lessons_live_module ON lessons(module_id, order_num) WHERE is_deleted = false;
+CREATE INDEX idx_comments_live_course ON comments(course_id, created_at) WHERE is_deleted = false;
+CREATE INDEX idx_comments_live_lesson ON comments(lesson_id, created_at) WHERE is_deleted = false;
+
+-- Для архивации: только удалённые строки, по времени удаления
+CREATE INDEX idx_courses_deleted_at ON courses(deleted_at) WHERE is_deleted = true;
+CREATE INDEX idx_modules_deleted_at ON modules(deleted_at) WHERE is_deleted = true;
+CREATE INDEX idx_lessons_deleted_at ON lessons(deleted_at) WHERE is_deleted = true;
+CREATE INDEX idx_comments_deleted_at ON comments(deleted_at) WHERE is_deleted = true;
+
+-- Для админки: сортировка списков по дате (+ id для устойчивого порядка)
+CREATE INDEX idx_payments_paid ON payments(paid_at, id);
+CREATE INDEX idx_enrollments_enrolled ON enrollments(enrolled_at, id);
+CREATE INDEX idx_ratings_created ON ratings(created_at, id);
+CREATE INDEX idx_submissions_submitted ON submissions(submitted_at, id);
+CREATE INDEX idx_certificates_issued ON certificates(issued_at, id);
+CREATE INDEX idx_comments_created ON comments(created_at, id);
+
+-- Для поиска в админке: Django ищет через UPPER(col::text) LIKE UPPER('%...%')
+CREATE INDEX idx_users_email_trgm ON users USING gin (UPPER(email::text) gin_trgm_ops);
+CREATE INDEX idx_users_first_name_trgm ON users USING gin (UPPER(first_name::text) gin_trgm_ops);
+CREATE INDEX idx_users_last_name_trgm ON users USING gin (UPPER(last_name::text) gin_trgm_ops);
+CREATE INDEX idx_courses_title_trgm ON courses USING gin (UPPER(title::text) gin_trgm_ops);
+CREATE INDEX idx_courses_short_desc_trgm ON courses USING gin (UPPER(short_desc::text) gin_trgm_ops);
+CREATE INDEX idx_modules_title_trgm ON modules USING gin (UPPER(title::text) gin_trgm_ops);
+CREATE INDEX idx_lessons_title_trgm ON lessons USING gin (UPPER(title::text) gin_trgm_ops);
+CREATE INDEX idx_assignments_title_trgm ON assignments USING gin (UPPER(title::text) gin_trgm_ops);
+CREATE INDEX idx_comments_content_trgm ON comments USING gin (UPPER(content::text) gin_trgm_ops);
+-- ...и через UPPER(col::text) = UPPER('...') для точного поиска (=transaction_id)
+CREATE INDEX idx_payments_transaction ON payments(UPPER(transaction_id::text));
+
+-- Для каталога (courses/catalog.py): только опубликованные живые курсы
+CREATE INDEX idx_courses_catalog_price ON courses(price, id) WHERE is_published = true AND is_deleted = false;
+CREATE INDEX idx_courses_catalog_category_price ON courses(category_id, price) WHERE is_published = true AND is_deleted = false;
+CREATE INDEX idx_courses_catalog_duration ON courses(duration_hours) WHERE is_published = true AND is_deleted = false;
+-- Все столбцы подсчёта фасетов: index-only scan вместо чтения широких строк courses
+CREATE INDEX idx_courses_catalog_facets ON courses(category_id, instructor_id, price, duration_hours, id)
+    WHERE is_published = true AND is_deleted = false;
+CREATE INDEX idx_course_rating_stats_avg ON course_rating_stats(rating_avg DESC, course_id);
+
+-- Для рейтинга студентов курса: top-N одним проходом по индексу
+CREATE INDEX idx_course_scores_rank ON course_scores(course_id, total_score DESC, user_id);
+
+-- Для уведомлений: пачки рассылки по активным записям курса (index-only scan по id),
+-- лента пользователя и счётчик непрочитанных
+CREATE INDEX idx_enrollments_course_active ON enrollments(course_id, id) INCLUDE (user_id)
+    WHERE status = 'active';
+CREATE INDEX idx_notifications_user ON notifications(user_id, id DESC);
+CREATE INDEX idx_notifications_unread ON notifications(user_id, id DESC) WHERE read_at IS NULL;
 
 -- =============================
 -- ДАННЫЕ